@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of writing an animated GIF of a mostly static scene
+
+A typical spill animation: a cloud of particles moving over a static
+map. Only a small part of each frame changes, so only the rectangle
+that has changed is encoded for each frame. The frames all have the
+same palette, so they are copied row by row into reused frame Images.
+
+Times Animation.add_frame() (including the encoding) and reports the
+file size.
+
+For comparison with an older version, run this with that version of
+py_gd installed.
+
+run as:
+
+python bench_animation.py [num_frames]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from py_gd import Image, Animation
+
+WIDTH, HEIGHT = 1000, 800
+
+
+def draw_map(img, rng):
+    """
+    a "coastline" and some land
+    """
+    x = np.linspace(0, WIDTH, 400)
+    y = HEIGHT / 2 + 100 * np.sin(x / 70) + rng.normal(0, 5, x.shape)
+    land = np.vstack([np.c_[x, y], [(WIDTH, HEIGHT), (0, HEIGHT)]])
+    img.draw_polygon(land, line_color='black', fill_color='olive')
+    for lon in range(0, WIDTH, 100):
+        img.draw_line((lon, 0), (lon, HEIGHT), 'gray')
+    for lat in range(0, HEIGHT, 100):
+        img.draw_line((0, lat), (WIDTH, lat), 'gray')
+
+
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    rng = np.random.default_rng(0)
+    background = Image(WIDTH, HEIGHT)
+    draw_map(background, rng)
+
+    particles = rng.normal((300, 200), 10, (5000, 2))
+    frame = Image(WIDTH, HEIGHT)
+
+    filename = os.path.join(tempfile.mkdtemp(), "spill.gif")
+    anim = Animation(filename, delay=10)
+    frame.copy(background)
+    anim.begin(frame)
+
+    elapsed = 0.0
+    for i in range(num_frames):
+        particles += rng.normal((1, 0.5), 1, particles.shape)
+        frame.copy(background)
+        frame.draw_dots(particles.astype(np.intc), color='red', diameter=2)
+
+        start = time.perf_counter()
+        anim.add_frame(frame)
+        elapsed += time.perf_counter() - start
+    start = time.perf_counter()
+    anim.close()
+    elapsed += time.perf_counter() - start
+
+    print(f"{num_frames} frames of {WIDTH}x{HEIGHT}:")
+    print(f"   add_frame: {elapsed / num_frames * 1e3:.2f}ms per frame")
+    print(f"   file size: {os.path.getsize(filename) / 1024:.1f}kB")
+    os.remove(filename)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of encoding an animated GIF in parallel
+
+Every frame is a different field (so the whole frame is encoded each
+time), and the frames are encoded with different numbers of threads.
+The output is the same for all of them.
+
+run as:
+
+python bench_animation_threads.py [num_frames] [image_size]
+"""
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image, Animation
+
+
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    x, y = np.meshgrid(np.linspace(0, 10, size), np.linspace(0, 10, size), indexing='ij')
+    frames = []
+    for i in range(num_frames):
+        img = Image(size, size)
+        field = np.sin(x + i / 10) * np.cos(y - i / 7)
+        img.set_data(((field + 1) * 8).astype(np.uint8) + 2)
+        frames.append(img)
+
+    results = {}
+    for threads in sorted({1, 2, 4, os.cpu_count() or 1}):
+        out = io.BytesIO()
+        start = time.perf_counter()
+        anim = Animation(out, threads=threads)
+        anim.begin(frames[0])
+        for img in frames[1:]:
+            anim.add_frame(img)
+        anim.close()
+        t = time.perf_counter() - start
+        results[threads] = out.getvalue()
+        print(f"{threads:>3} threads: {t / num_frames * 1e3:7.2f}ms per frame")
+
+    assert len(set(results.values())) == 1, "outputs differ!"
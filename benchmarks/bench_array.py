@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of getting the pixels of an Image as a numpy array
+
+np.array(img) makes a copy, np.asarray(img) is a view on the pixels
+
+run as:
+
+python bench_array.py [image_size]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from py_gd import Image
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    number = 20
+
+    img = Image(size, size)
+
+    t_copy = timeit.timeit(lambda: np.array(img), number=number) / number
+    t_view = timeit.timeit(lambda: np.asarray(img), number=number) / number
+
+    print(f"{size}x{size} image:")
+    print(f"   np.array (copy): {t_copy * 1e3:.3f}ms")
+    print(f"   np.asarray (view): {t_view * 1e3:.3f}ms")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of clearing an Image
+
+Times Image.clear() of the whole image, and of a part of it, for a
+paletted and a truecolor image. Paletted images are cleared a row
+(or the whole buffer) at a time with memset.
+
+For comparison with the older code (which used gdImageFilledRectangle),
+run this with an older version of py_gd installed -- it will skip
+the partial clear.
+
+run as:
+
+python bench_clear.py [image_size]
+"""
+
+import sys
+import time
+
+from py_gd import Image
+
+
+def timeit(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8192
+    half = size // 2
+
+    for truecolor in (False, True):
+        try:
+            img = Image(size, size, truecolor=truecolor)
+        except TypeError:  # older py_gd: no truecolor
+            if truecolor:
+                continue
+            img = Image(size, size)
+        line = f"{size} x {size} {'truecolor' if truecolor else 'palette'}:"
+        line += f"   whole: {timeit(lambda: img.clear('white')) * 1e3:8.2f}ms"
+        try:
+            t = timeit(lambda: img.clear('white', rect=((half // 2, half // 2),
+                                                        (half // 2 + half, half // 2 + half))))
+            line += f"   quarter: {t * 1e3:8.2f}ms"
+        except TypeError:  # older py_gd: no rect
+            pass
+        print(line)
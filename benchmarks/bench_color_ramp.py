@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of mapping values to color indices with a ColorRamp
+
+Times ColorRamp.get_color_indices() for float64 and float32 values,
+with a new array for the result, and with an ``out`` array. Then for
+the log, power and boundary norms, compared with the linear one.
+
+For comparison with the older (all numpy) code, run this
+with an older version of py_gd installed -- it will skip ``out``.
+
+run as:
+
+python bench_color_ramp.py [num_values]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd.color_ramp import ColorRamp
+
+
+def timeit(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 7
+
+    ramp = ColorRamp('viridis', 0.0, 100.0, base_colorscheme='web')
+    rng = np.random.default_rng(0)
+    out = np.empty(num, dtype=np.uint8)
+
+    for dtype in (np.float64, np.float32):
+        values = rng.uniform(-10, 110, num).astype(dtype)
+        line = f"{num} {np.dtype(dtype).name} values:"
+        line += f"   new array: {timeit(lambda: ramp.get_color_indices(values)) * 1e3:8.2f}ms"
+        try:
+            t = timeit(lambda: ramp.get_color_indices(values, out=out))
+            line += f"   out=: {t * 1e3:8.2f}ms"
+        except TypeError:  # older py_gd: no out
+            pass
+        print(line)
+
+    values = 10 ** rng.uniform(-3, 3, num)
+    for kwargs in ({}, {'norm': 'log'}, {'norm': 'power', 'gamma': 0.5},
+                   {'boundaries': [0, 0.01, 0.1, 1, 10, 100, 1000]}):
+        try:
+            ramp = ColorRamp('viridis', 1e-3, 1e3, base_colorscheme='web', **kwargs)
+        except TypeError:  # older py_gd: linear only
+            continue
+        t = timeit(lambda: ramp.get_color_indices(values, out=out))
+        print(f"{ramp.norm if kwargs else 'linear':>10} norm: {t * 1e3:8.2f}ms")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing lots of dots (particles)
+
+Times Image.draw_dots() for various numbers of points and diameters.
+Diameters of 1-3 are drawn with precomputed stamps written straight
+into the pixel rows; larger ones go through libgd.
+
+Each is compared with a Python loop over Image.draw_dot(), which sets
+each pixel of each dot with gdImageSetPixel, as draw_dots() did before
+(only up to 10**6 points -- the loop is slow).
+
+Then coloring the dots by value with a ColorRamp: mapping the values
+with get_color_indices() and passing the indices as the colors, vs.
+passing values= and ramp= so they are mapped as the dots are drawn.
+
+run as:
+
+python bench_draw_dots.py [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+from py_gd.color_ramp import ColorRamp
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    rng = np.random.default_rng(0)
+    img = Image(size, size)
+
+    for exp in range(3, 8):
+        num = 10 ** exp
+        # some off the edges, to exercise the clipping
+        points = rng.integers(-10, size + 10, (num, 2)).astype(np.intc)
+        colors = rng.integers(1, 16, num).astype(np.uint8)
+        line = f"{num:>10} points:"
+        for diameter in (1, 2, 3):
+            if num <= 10 ** 6:
+                start = time.perf_counter()
+                for pt, c in zip(points.tolist(), colors.tolist()):
+                    img.draw_dot(pt, c, diameter)
+                t_loop = f"{(time.perf_counter() - start) * 1e3:8.2f}"
+            else:
+                t_loop = f"{'-':>8}"
+
+            start = time.perf_counter()
+            img.draw_dots(points, color=colors, diameter=diameter)
+            t = time.perf_counter() - start
+            line += f"   d={diameter}: {t_loop} -> {t * 1e3:8.2f}ms"
+        print(line)
+
+    print("\ncolored by value, d=2:")
+    ramp = ColorRamp('viridis', 0, 1, base_colorscheme='web')
+    img.add_colors(ramp.colorlist)
+    for exp in range(3, 8):
+        num = 10 ** exp
+        points = rng.integers(-10, size + 10, (num, 2)).astype(np.intc)
+        values = rng.random(num)
+
+        start = time.perf_counter()
+        img.draw_dots(points, color=ramp.get_color_indices(values), diameter=2)
+        t_indices = time.perf_counter() - start
+
+        start = time.perf_counter()
+        img.draw_dots(points, values=values, ramp=ramp, diameter=2)
+        t_values = time.perf_counter() - start
+
+        print(f"{num:>10} points:   get_color_indices: {t_indices * 1e3:9.2f}ms"
+              f"   values=: {t_values * 1e3:9.2f}ms")
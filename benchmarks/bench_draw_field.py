@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing a 2-d field of values with a ColorRamp
+
+Compares Image.draw_field() with mapping the values with
+ColorRamp.get_color_indices(), and copying them in with Image.set_data(),
+for a field stored as [row, column] (so it needs transposing), and for a
+field that is half the size of the image (so it needs resampling).
+
+run as:
+
+python bench_draw_field.py [width height]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+from py_gd.color_ramp import ColorRamp
+
+
+def timeit(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    width, height = (int(a) for a in sys.argv[1:3]) if len(sys.argv) > 2 else (2000, 1500)
+
+    img = Image(width, height, preset_colors='web')
+    ramp = ColorRamp('viridis', 0.0, 1.0, base_colorscheme='web')
+    img.add_colors(ramp.colorlist)
+    rng = np.random.default_rng(0)
+
+    for dtype in (np.float64, np.float32):
+        field = rng.random((height, width)).astype(dtype)
+        small = rng.random((height // 2, width // 2)).astype(dtype)
+
+        def set_data():
+            img.set_data(ramp.get_color_indices(field.T))
+
+        def set_data_resampled():
+            inds = ramp.get_color_indices(small.T)
+            img.set_data(np.repeat(np.repeat(inds, 2, axis=0), 2, axis=1))
+
+        print(f"{width} x {height} {np.dtype(dtype).name} field:")
+        print(f"    get_color_indices + set_data: {timeit(set_data) * 1e3:8.2f}ms"
+              f"   draw_field: {timeit(lambda: img.draw_field(field.T, ramp)) * 1e3:8.2f}ms")
+        print(f"    half size, np.repeat + set_data: {timeit(set_data_resampled) * 1e3:8.2f}ms"
+              f"   draw_field: {timeit(lambda: img.draw_field(small.T, ramp)) * 1e3:8.2f}ms")
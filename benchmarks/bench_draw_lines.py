@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing many line segments
+
+Compares a Python loop over Image.draw_line() with a single call
+to Image.draw_lines()
+
+run as:
+
+python bench_draw_lines.py [num_lines] [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, size, (num, 2))
+    ends = starts + rng.integers(-10, 11, (num, 2))
+    colors = rng.integers(1, 16, num).astype(np.uint8)
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    for pt1, pt2, c in zip(starts.tolist(), ends.tolist(), colors.tolist()):
+        img.draw_line(pt1, pt2, c, line_width=2)
+    t_loop = time.perf_counter() - start
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    img.draw_lines(starts, ends, color=colors, line_width=2)
+    t_batch = time.perf_counter() - start
+
+    print(f"{num} line segments:")
+    print(f"   draw_line loop: {t_loop:.3f}s")
+    print(f"   draw_lines: {t_batch:.3f}s  ({t_loop / t_batch:.1f}x)")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing many small polygons
+
+Compares a Python loop over Image.draw_polygon() with a single call
+to Image.draw_polygons()
+
+run as:
+
+python bench_draw_polygons.py [num_polygons] [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+
+
+def make_polygons(num, size):
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(3, 12, num)
+    offsets = np.r_[0, np.cumsum(lengths)]
+    centers = np.repeat(rng.integers(0, size, (num, 2)), lengths, axis=0)
+    points = centers + rng.integers(-5, 6, (offsets[-1], 2))
+    return points, offsets
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    points, offsets = make_polygons(num, size)
+    polygons = [points[offsets[i]:offsets[i + 1]] for i in range(num)]
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    for poly in polygons:
+        img.draw_polygon(poly, line_color='black', fill_color='red')
+    t_loop = time.perf_counter() - start
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    img.draw_polygons(points, offsets, line_color='black', fill_color='red')
+    t_batch = time.perf_counter() - start
+
+    print(f"{num} polygons:")
+    print(f"   draw_polygon loop: {t_loop:.3f}s")
+    print(f"   draw_polygons: {t_batch:.3f}s  ({t_loop / t_batch:.1f}x)")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing many short polylines (e.g. particle tracks)
+
+Compares a Python loop over Image.draw_polyline() with a single call
+to Image.draw_polylines()
+
+run as:
+
+python bench_draw_polylines.py [num_tracks] [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(2, 10, num)
+    offsets = np.r_[0, np.cumsum(lengths)]
+    starts = np.repeat(rng.integers(0, size, (num, 2)), lengths, axis=0)
+    points = starts + rng.integers(-3, 4, (offsets[-1], 2)).cumsum(axis=0) % 20
+
+    tracks = [points[offsets[i]:offsets[i + 1]] for i in range(num)]
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    for track in tracks:
+        img.draw_polyline(track, 'blue')
+    t_loop = time.perf_counter() - start
+
+    img = Image(size, size)
+    start = time.perf_counter()
+    img.draw_polylines(points, offsets, line_color='blue')
+    t_batch = time.perf_counter() - start
+
+    print(f"{num} polylines:")
+    print(f"   draw_polyline loop: {t_loop:.3f}s")
+    print(f"   draw_polylines: {t_batch:.3f}s  ({t_loop / t_batch:.1f}x)")
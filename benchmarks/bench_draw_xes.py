@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing lots of Xes, with a color per point
+
+Times Image.draw_xes() for various numbers of points and diameters,
+with the colors given as indices and as names. One pixel wide Xes are
+drawn as stamps written straight into the pixel rows, and color names
+are looked up in bulk.
+
+For comparison with the older per-point code, run this
+with an older version of py_gd installed.
+
+run as:
+
+python bench_draw_xes.py [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    rng = np.random.default_rng(0)
+    img = Image(size, size, preset_colors='web')
+    names = np.array(img.get_color_names()[1:])
+
+    for exp in range(3, 7):
+        num = 10 ** exp
+        points = rng.integers(-10, size + 10, (num, 2)).astype(np.intc)
+        colors = rng.integers(1, len(names), num).astype(np.uint8)
+        color_names = list(names[colors - 1])
+        line = f"{num:>10} points:"
+        for diameter in (2, 5, 9):
+            start = time.perf_counter()
+            img.draw_xes(points, color=colors, diameter=diameter)
+            t = time.perf_counter() - start
+            line += f"   d={diameter}: {t * 1e3:9.2f}ms"
+        start = time.perf_counter()
+        img.draw_xes(points, color=color_names, diameter=5)
+        t = time.perf_counter() - start
+        line += f"   names: {t * 1e3:9.2f}ms"
+        print(line)
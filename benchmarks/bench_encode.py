@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of in-memory image encoding
+
+Compares Image.to_bytes() and Image.save() to a BytesIO with the
+"old" way of getting an encoded image: save to a temp file and
+read it back.
+
+run as:
+
+python bench_encode.py [image_size] [num_repeats]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from py_gd import Image
+
+
+def make_image(size):
+    rng = np.random.default_rng(42)
+    img = Image(size, size)
+    for _ in range(50):
+        img.draw_polygon(rng.integers(0, size, (10, 2)),
+                         line_color='black', fill_color='red')
+    img.draw_dots(rng.integers(0, size, (5000, 2)), color='blue', diameter=3)
+    return img
+
+
+def temp_file_round_trip(img, file_type):
+    fd, path = tempfile.mkstemp(suffix="." + file_type)
+    os.close(fd)
+    try:
+        img.save(path, file_type)
+        with open(path, 'rb') as infile:
+            return infile.read()
+    finally:
+        os.remove(path)
+
+
+def bytes_io(img, file_type):
+    buf = io.BytesIO()
+    img.save(buf, file_type)
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    img = make_image(size)
+
+    print(f"Encoding a {size}x{size} image {number} times")
+    for file_type in ("png", "gif", "bmp", "jpeg"):
+        t_file = timeit.timeit(lambda: temp_file_round_trip(img, file_type), number=number)
+        t_bytes = timeit.timeit(lambda: img.to_bytes(file_type), number=number)
+        t_bio = timeit.timeit(lambda: bytes_io(img, file_type), number=number)
+        print(f"{file_type:>5}: temp file: {t_file / number * 1e3:.3f}ms  "
+              f"to_bytes: {t_bytes / number * 1e3:.3f}ms  "
+              f"BytesIO: {t_bio / number * 1e3:.3f}ms  "
+              f"({t_file / t_bytes:.2f}x)")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of creating a new Image for every frame vs. reusing them
+from an ImagePool
+
+Each "frame" gets an Image, draws a few things on it, and drops it
+(or releases it back to the pool).
+
+run as:
+
+python bench_image_pool.py [width height [num_frames]]
+"""
+
+import sys
+import time
+
+from py_gd import Image, ImagePool
+
+
+def render(img):
+    img.draw_rectangle((10, 10), (100, 100), fill_color='red')
+    img.draw_line((0, 0), (img.width - 1, img.height - 1), 'blue')
+
+
+if __name__ == "__main__":
+    width, height = (int(a) for a in sys.argv[1:3]) if len(sys.argv) > 2 else (1000, 800)
+    num_frames = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    for preset in ('web', 'css4', 'xkcd'):
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            img = Image(width, height, preset_colors=preset)
+            render(img)
+        t_new = (time.perf_counter() - start) / num_frames
+
+        pool = ImagePool(max_images=4)
+        start = time.perf_counter()
+        for _ in range(num_frames):
+            img = pool.get(width, height, preset_colors=preset)
+            render(img)
+            pool.release(img)
+        t_pool = (time.perf_counter() - start) / num_frames
+
+        print(f"{preset:>6}: new Image: {t_new * 1e3:7.3f}ms   pooled: {t_pool * 1e3:7.3f}ms"
+              f"   ({pool.hits} hits, {pool.misses} misses)")
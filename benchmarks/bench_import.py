@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of start up time: importing py_gd and creating a first Image,
+importing py_gd.colors, and building each colorscheme the first time
+it is used. Also shows the import time of each py_gd module, as
+reported by ``python -X importtime``.
+
+Each import is timed in a fresh Python process (the best of several runs),
+so it is the cold start time, as seen by a short-lived script.
+
+For comparison with the older (eager) version, run this
+with an older version of py_gd installed.
+
+run as (from outside the source dir, so that the installed py_gd is used):
+
+python bench_import.py [num_runs]
+"""
+
+import subprocess
+import sys
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+{setup}
+setup = time.perf_counter() - start
+start = time.perf_counter()
+{stmt}
+print(setup, time.perf_counter() - start)
+"""
+
+
+def cold_time(setup, stmt="pass", num_runs=5):
+    """
+    best time of setup, then of stmt, each in a new python process
+    """
+    times = []
+    for _ in range(num_runs):
+        out = subprocess.run([sys.executable, "-c", SCRIPT.format(setup=setup, stmt=stmt)],
+                             check=True, capture_output=True, text=True).stdout
+        times.append([float(t) for t in out.split()])
+    return min(t[0] for t in times), min(t[1] for t in times)
+
+
+def py_gd_import_times(code):
+    """
+    the import times of the py_gd modules, from python -X importtime
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            check=True, capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "py_gd" in line:
+            self_time, cumulative, name = line[len("import time:"):].split("|")
+            times.append((name.strip(), int(self_time), int(cumulative)))
+    return times
+
+
+if __name__ == "__main__":
+    num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    t_import, t_image = cold_time("import py_gd", "py_gd.Image(100, 100)", num_runs=num_runs)
+    print(f"import py_gd: {t_import * 1e3:8.2f}ms   first Image: {t_image * 1e3:8.2f}ms")
+    for name, self_time, cumulative in py_gd_import_times("import py_gd; py_gd.Image(100, 100)"):
+        print(f"    {name:>16}: {self_time / 1e3:8.2f}ms  (cumulative: {cumulative / 1e3:8.2f}ms)")
+
+    # numpy is imported first, so that it's not counted
+    t_import, _ = cold_time("import numpy; import py_gd.colors", num_runs=num_runs)
+    print(f"import py_gd.colors: {t_import * 1e3:8.2f}ms")
+
+    for name in ('web', 'tableau', 'css4', 'xkcd', 'viridis'):
+        _, t_build = cold_time("import numpy; from py_gd.colors import colorschemes",
+                               f"colorschemes['{name}']", num_runs=num_runs)
+        print(f"    first use of {name!r:>10}: {t_build * 1e3:8.2f}ms")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of Image.set_data() and from_array()
+
+Times setting the image from C-ordered, Fortran-ordered and strided
+uint8 arrays of various sizes.
+
+run as:
+
+python bench_set_data.py [size1 size2 ...]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from py_gd import Image, from_array
+
+
+def bench(func, number=5):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [500, 1000, 2000, 4000]
+
+    for size in sizes:
+        arr = np.random.default_rng(0).integers(0, 256, (size, size), dtype=np.uint8)
+        inputs = {"C order": np.ascontiguousarray(arr),
+                  "F order": np.asfortranarray(arr),
+                  "strided": np.asfortranarray(np.repeat(arr, 2, axis=1))[:, ::2],
+                  }
+        img = Image(size, size)
+
+        print(f"{size}x{size}:")
+        for name, a in inputs.items():
+            t = bench(lambda: img.set_data(a))
+            print(f"   set_data, {name}: {t * 1e3:8.3f}ms  ({size * size / t / 1e6:8.1f} Mpix/s)")
+        t = bench(lambda: from_array(inputs["C order"]))
+        print(f"   from_array, C order: {t * 1e3:8.3f}ms")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of rendering independent Images from a thread pool
+
+libgd does its work with the GIL released, so rendering N separate
+frames in N threads should scale close to linearly with the number
+of cores.
+
+run as:
+
+python bench_threading.py [num_frames] [image_size]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from py_gd import Image
+
+
+def render_frame(seed, size):
+    rng = np.random.default_rng(seed)
+    img = Image(size, size)
+
+    for _ in range(20):
+        img.draw_polygon(rng.integers(0, size, (20, 2)),
+                         line_color='black', fill_color='red', line_width=3)
+    for _ in range(20):
+        img.draw_polyline(rng.integers(0, size, (50, 2)), 'blue', line_width=3)
+    img.draw_dots(rng.integers(0, size, (20000, 2)), color='purple', diameter=5)
+    img.draw_circle((size // 2, size // 2), size // 2, fill_color='teal')
+
+    return img
+
+
+def run(num_frames, size, num_threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        list(pool.map(render_frame, range(num_frames), [size] * num_frames))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    max_threads = os.cpu_count() or 1
+
+    print(f"Rendering {num_frames} {size}x{size} frames")
+    base = run(num_frames, size, 1)
+    print(f"threads:  1  time: {base:.3f}s")
+
+    num_threads = 2
+    while num_threads <= max_threads:
+        t = run(num_frames, size, num_threads)
+        print(f"threads: {num_threads:2d}  time: {t:.3f}s  speedup: {base / t:.2f}x")
+        num_threads *= 2
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""
+Benchmark of drawing in world coordinates
+
+Times drawing points and polylines given in world (lon, lat) coordinates:
+
+ - transforming them to pixels with numpy first, and passing those in
+ - setting the Image's viewport, and passing the world coordinates in
+   directly, so they are transformed as they are drawn.
+
+The polylines are random walk "tracks" of 100 points each.
+
+run as:
+
+python bench_viewport.py [image_size]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from py_gd import Image, Viewport
+
+BOUNDS = ((-125.0, 30.0), (-115.0, 40.0))
+
+
+def timeit(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    rng = np.random.default_rng(0)
+    img = Image(size, size)
+    viewport = Viewport.from_bounds(BOUNDS, img.size)
+    (x_scale, y_scale), (x_offset, y_offset) = viewport.scale, viewport.offset
+    scale = np.array([x_scale, y_scale])
+    offset = np.array([x_offset, y_offset])
+
+    def numpy_pixels(points):
+        return np.floor(points * scale + offset)
+
+    for exp in range(3, 8):
+        num = 10 ** exp
+        points = np.c_[rng.uniform(-126, -114, num), rng.uniform(29, 41, num)]
+        # tracks of 100 points each: random walks, a few pixels a step
+        steps = rng.normal(0, 0.002, (num // 100, 100, 2))
+        steps[:, 0] = points[::100]
+        tracks = steps.cumsum(axis=1).reshape(num, 2)
+        offsets = np.arange(0, num + 1, 100)
+
+        img.viewport = None
+        t_numpy = timeit(lambda: img.draw_dots(numpy_pixels(points), diameter=2))
+        t_numpy_lines = timeit(lambda: img.draw_polylines(numpy_pixels(tracks), offsets))
+
+        img.viewport = viewport
+        t_viewport = timeit(lambda: img.draw_dots(points, diameter=2))
+        t_viewport_lines = timeit(lambda: img.draw_polylines(tracks, offsets))
+
+        print(f"{num:>10} points:"
+              f"   dots: numpy {t_numpy * 1e3:8.2f}ms  viewport {t_viewport * 1e3:8.2f}ms"
+              f"   polylines: numpy {t_numpy_lines * 1e3:8.2f}ms"
+              f"  viewport {t_viewport_lines * 1e3:8.2f}ms")
@@ -1,40 +1,51 @@
 """
 Drawing a Madelbrot set
 
-Draws a Madelbrot by setting colors pixel by pixel
+Computes the number of iterations for every pixel with numpy, then
+colors them with a ColorRamp, using Image.draw_field
 """
 
 import numpy as np
 import py_gd as gd
-
-
-def Mandelbrot_iter(c):
-    z = 0
-    for iters in range(200):
-        if abs(z) >= 2:
-            return iters
-        z = z ** 2 + c
+from py_gd.color_ramp import ColorRamp
+
+MAX_ITERS = 200
+
+
+def Mandelbrot_iters(c):
+    """
+    number of iterations before each point of c escapes
+    """
+    z = np.zeros_like(c)
+    iters = np.full(c.shape, MAX_ITERS - 1)
+    escaped = np.zeros(c.shape, dtype=bool)
+    for i in range(MAX_ITERS):
+        z[~escaped] = z[~escaped] ** 2 + c[~escaped]
+        new = ~escaped & (abs(z) >= 2)
+        iters[new] = i
+        escaped |= new
     return iters
 
 
 def Mandelbrot(size):
-    image = gd.Image(size, size, preset_colors='turbo')
+    image = gd.Image(size, size, preset_colors='transparent')
+    ramp = ColorRamp('turbo', 0, MAX_ITERS - 1, base_colorscheme='transparent')
+    image.add_colors(ramp.colorlist)
 
     scale = size / 2
     x_shift = 1.5
     y_shift = 1.0
 
-    v_max = 0
-    for i in range(image.width):
-        for j in range(image.height):
-            x = (i / scale) - x_shift
-            y = (j / scale) - y_shift
-            v = Mandelbrot_iter( x + (y * 1j))
-            print("i: %d, j: %d, v: %3d" % (i, j, v))
-            image.set_pixel_value((i, j), v)
-            v_max = max(v_max, v)
+    # indexed [x, y], like the image
+    x = (np.arange(size) / scale) - x_shift
+    y = (np.arange(size) / scale) - y_shift
+    c = x[:, None] + (y[None, :] * 1j)
+
+    image.draw_field(Mandelbrot_iters(c), ramp)
+
     return image
 
+
 im = Mandelbrot(400)
 
-im.save ("mandelbrot.png", file_type="png")
+im.save("mandelbrot.png", file_type="png")
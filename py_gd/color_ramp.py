@@ -4,8 +4,15 @@ coloramp (or heatmap)
 When you want to use a continuos color map
 """
 
+import operator
+
 import numpy as np
 from .colors import colorschemes
+from .py_gd import _color_ramp_indices
+
+# number of buckets in the table used to look up values in the edges
+# of the nonlinear norms
+EDGE_TABLE_SIZE = 4096
 
 
 class ColorRamp():
@@ -15,14 +22,21 @@ class ColorRamp():
                  max_value,
                  num_colors=None,
                  reversed=False,
-                 base_colorscheme='BW'):
+                 base_colorscheme='BW',
+                 nodata_index=0,
+                 norm='linear',
+                 gamma=1.0,
+                 boundaries=None):
         """
         :param colors: named color scheme supplied with py_gd
                        or a list of RGB triples. Note that this only
                        makes sense with a "continuous" colorscheme
 
         :param min_value: value to map to the first color in the scheme
-        :param max_value: value to map to the last color in the scheme
+        :param max_value: value to map to the last color in the scheme.
+                          It can be less than min_value, to run the
+                          colors the other way (but not for the 'log'
+                          and 'power' norms).
 
         :param num_colors=None: Number of distinct colors to use. By default,
                           It will be scaled to how may colors are used by the
@@ -32,9 +46,53 @@ class ColorRamp():
         :param base_colorscheme='BW': base colorscheme to use -- this reserves
                space for basic drawing. Or simply and integer specifying how many
                colors to reserve.
+
+        :param nodata_index=0: color index to use for NaN or masked values,
+                               from 0 to 255. The default is the
+                               background color.
+
+        :param norm='linear': how values are mapped to the colors between
+                              min_value and max_value:
+
+                              'linear' - evenly spaced
+
+                              'log' - evenly spaced in log(value). min_value
+                                      must be positive -- values of zero or
+                                      less get the first color.
+
+                              'power' - evenly spaced in
+                                        ((value - min_value) / (max_value - min_value)) ** gamma
+
+        :param gamma=1.0: the exponent for the 'power' norm
+
+        :param boundaries=None: the edges of bins of values, in increasing
+                                order: values from boundaries[i] up to
+                                boundaries[i + 1] get color i. If given,
+                                min_value, max_value, num_colors and norm
+                                are set from them. (min_value and max_value
+                                can be passed as None)
+
+        Values below min_value or above max_value get the first or last color.
         """
+        if boundaries is not None:
+            boundaries = np.asarray(boundaries, dtype=np.float64)
+            if boundaries.ndim != 1 or len(boundaries) < 2:
+                raise ValueError("boundaries must be a sequence of at least two values")
+            if np.any(np.diff(boundaries) <= 0):
+                raise ValueError("boundaries must be increasing")
+            min_value, max_value = boundaries[0], boundaries[-1]
+            num_colors = len(boundaries) - 1
+            norm = 'boundary'
+        elif norm not in ('linear', 'log', 'power'):
+            raise ValueError("norm must be one of 'linear', 'log' or 'power'")
+        if min_value == max_value or np.isnan(min_value) or np.isnan(max_value):
+            raise ValueError("min_value and max_value must be different numbers")
+
         self.min_value = min_value
         self.max_value = max_value
+        self.nodata_index = nodata_index
+        self.norm = norm
+        self.gamma = gamma
 
         if isinstance(base_colorscheme, str):
             base_colorscheme = colorschemes[base_colorscheme]
@@ -45,6 +103,9 @@ class ColorRamp():
 
         self._num_colors = 256 - self.start_index if num_colors is None else num_colors
         self._delta = (self.max_value - self.min_value) / self._num_colors
+        self._edges = self._build_edges(boundaries)
+        if self._edges is not None and len(self._edges) > 0:
+            self._build_edge_table()
 
         self.name = 'custom'
         if isinstance(colors, str):
@@ -55,6 +116,90 @@ class ColorRamp():
             colors = reversed(colors)
         self.create_color_index(colors)
 
+    @property
+    def nodata_index(self):
+        """
+        color index used for NaN or masked values, from 0 to 255
+        """
+        return self._nodata_index
+
+    @nodata_index.setter
+    def nodata_index(self, index):
+        index = operator.index(index)
+        if not 0 <= index <= 255:
+            raise ValueError(f"nodata_index must be from 0 to 255, not {index}")
+        self._nodata_index = index
+
+    def _build_edges(self, boundaries):
+        """
+        the values where the color index steps up by one, for the nonlinear
+        norms -- the values are mapped by searching these.
+
+        They are where the norm is halfway between two colors, so a value
+        gets the nearest color, as for the linear norm.
+
+        :returns: array of num_colors - 1 increasing float64 values, or None
+                  for the linear norm
+        """
+        if self.norm == 'linear':
+            return None
+        if self.norm == 'boundary':
+            return np.ascontiguousarray(boundaries[1:-1])
+
+        if self.min_value > self.max_value:
+            raise ValueError("max_value must be greater than min_value for the "
+                             f"{self.norm!r} norm")
+        steps = (np.arange(self._num_colors - 1) + 0.5) / self._num_colors
+        if self.norm == 'log':
+            if self.min_value <= 0 or self.max_value <= 0:
+                raise ValueError("min_value and max_value must be positive for the log norm")
+            return self.min_value * (self.max_value / self.min_value) ** steps
+        # power
+        if self.gamma <= 0:
+            raise ValueError("gamma must be positive")
+        return self.min_value + (self.max_value - self.min_value) * steps ** (1.0 / self.gamma)
+
+    def _build_edge_table(self):
+        """
+        builds a table to find which edges a value is between without
+        searching them all: the value is put in one of EDGE_TABLE_SIZE
+        buckets, and the table has the number of edges in the buckets
+        before it -- so only the edges in its own bucket are checked.
+
+        The buckets are either evenly spaced in value, or in the bits of
+        the value as a float64 (roughly log spaced), whichever puts fewer
+        edges in a bucket. The bucket of a value is computed the same way
+        in the kernel (py_gd.pyx: ramp_edges_index).
+        """
+        edges = self._edges
+        num_buckets = EDGE_TABLE_SIZE
+
+        # evenly spaced
+        lo, hi = edges[0], edges[-1]
+        scale = (num_buckets - 1) / (hi - lo) if hi > lo else 0.0
+        linear = np.clip((edges - lo) * scale, 0, num_buckets - 1).astype(np.intp)
+
+        # float64 bits, flipped so they sort like the values
+        bits = edges.view(np.uint64)
+        keys = np.where(bits >> np.uint64(63), ~bits, bits | np.uint64(1 << 63))
+        key_range = int(keys[-1] - keys[0])
+        shift = 0
+        while key_range >> shift >= num_buckets:
+            shift += 1
+        by_bits = np.minimum((keys - keys[0]) >> np.uint64(shift), num_buckets - 1).astype(np.intp)
+
+        linear_max, by_bits_max = np.bincount(linear).max(), np.bincount(by_bits).max()
+        if linear_max < by_bits_max:
+            self._table_mode, self._table_offset, self._table_scale = 0, lo, scale
+            buckets, self._table_steps = linear, linear_max
+        else:
+            self._table_mode, self._table_offset, self._table_scale = 1, int(keys[0]), shift
+            buckets, self._table_steps = by_bits, by_bits_max
+        self._table = np.searchsorted(buckets, np.arange(num_buckets), side='left').astype(np.uint16)
+        # the edges are checked a fixed number of steps past the table
+        # index, so they are padded to be able to step past the end
+        self._table_edges = np.concatenate((edges, np.full(self._table_steps, np.inf)))
+
     def create_color_index(self, colors):
         # interpolate to the specific colors:
         num_colors = self._num_colors
@@ -68,24 +213,21 @@ class ColorRamp():
 
         self.color_index = index
 
-    def get_color_indices(self, values):
+    def get_color_indices(self, values, out=None):
         """
         returns the color indices that correspond to the values
 
-        :param values: 1D list/array of (usually float) values
-
-        :returns: 1D array of dtype uint8
-        """
-        values = np.asarray(values)
+        :param values: list/array of (usually float) values. float32 and
+                       float64 arrays are used as they are -- other types
+                       are converted to float64. NaN, and masked values
+                       of a masked array, get the nodata_index.
 
-        inds = np.round((values - self.min_value) / self._delta) + self.start_index
-        inds = np.clip(inds,
-                       self.start_index,
-                       self._num_colors + self.start_index - 1,
-                       out=inds)
-        inds = inds.astype(np.uint8)
+        :param out=None: uint8 array, the same shape as values, to put the
+                         indices in -- so no new array is needed.
 
-        return inds
+        :returns: array of dtype uint8, the same shape as values
+        """
+        return _color_ramp_indices(self, values, out)
 
     def get_colors(self, values):
         """
@@ -93,11 +235,17 @@ class ColorRamp():
 
         :param values: 1D list/array of (usually float) values
 
-        :returns: (Nx3) array of uint8 dtype ``[(R, G, B), (R, G, B), ...]```
+        :returns: (Nx3) masked array of uint8 dtype
+                  ``[(R, G, B), (R, G, B), ...]``. The rows for NaN, or
+                  masked, values are masked -- the nodata_index is not
+                  one of the ramp's colors.
         """
-        inds = self.get_color_indices(values)
+        nodata = np.ma.getmaskarray(values) | np.isnan(np.ma.getdata(values))
+        offsets = self.get_color_indices(values).astype(np.intp) - self.start_index
+        offsets[nodata] = 0
 
-        return self.color_index[inds - self.start_index, :]
+        colors = self.color_index[offsets, :]
+        return np.ma.array(colors, mask=np.repeat(nodata[..., np.newaxis], 3, axis=-1))
 
     @property
     def colorlist(self):
@@ -68,11 +68,16 @@ To Do: a function to create a py_gd colormap from MPL colormaps
 # agrees to be bound by the terms and conditions of this License
 # Agreement.
 
+import threading
+from collections.abc import MutableMapping
 from itertools import islice
-import numpy as np
 
-from . import _cm_listed
-from . import _color_data
+# NOTE: the color data modules are big -- they are only imported when
+#       a colorscheme that needs them is first used.
+
+# the continuous colormaps in _cm_listed (as _{name}_data)
+CONTINUOUS_SCHEMES = ('cividis', 'inferno', 'magma', 'plasma', 'turbo',
+                      'twilight', 'viridis')
 
 
 def hex_to_rgb(hex_value):
@@ -91,7 +96,109 @@ def build_from_named_colors(named_colors):
     return [(name, hex_to_rgb(hex_color)) for name, hex_color in named_colors.items()]
 
 
-colorschemes = {}
+class Colorschemes(MutableMapping):
+    """
+    The colorschemes, by name.
+
+    A colorscheme is a list of (name, (r, g, b)) or (name, (r, g, b, a))
+    tuples. Some are only built the first time they are used, so that
+    importing py_gd doesn't have to build (or even load) them all.
+
+    It works like a dict -- you can add your own.
+
+    It is safe to use from more than one thread: a colorscheme is only
+    built once, and the others wait for it.
+    """
+
+    def __init__(self):
+        self._schemes = {}
+        # name: function to build the colorscheme, for the ones not built yet
+        self._builders = {}
+        # held while building -- reentrant, as a builder can use
+        # another colorscheme that needs building
+        self._lock = threading.RLock()
+
+    def add_builder(self, name, builder):
+        """
+        add a colorscheme that will be built when it is first used
+
+        :param name: name of the colorscheme
+        :param builder: function, with no arguments, that returns the
+                        colorscheme
+        """
+        with self._lock:
+            self._schemes[name] = None
+            self._builders[name] = builder
+
+    def __getitem__(self, name):
+        scheme = self._schemes[name]
+        if scheme is None:
+            with self._lock:
+                # (another thread may have built it while this one waited)
+                scheme = self._schemes[name]
+                builder = self._builders.get(name)
+                if scheme is None and builder is not None:
+                    # the builder is only removed once the colorscheme is
+                    # there, so no one can find neither
+                    scheme = self._schemes[name] = builder()
+                    del self._builders[name]
+        return scheme
+
+    def __setitem__(self, name, scheme):
+        with self._lock:
+            self._builders.pop(name, None)
+            self._schemes[name] = scheme
+
+    def __delitem__(self, name):
+        with self._lock:
+            self._builders.pop(name, None)
+            del self._schemes[name]
+
+    def __contains__(self, name):
+        # without building it
+        return name in self._schemes
+
+    def __iter__(self):
+        return iter(self._schemes)
+
+    def __len__(self):
+        return len(self._schemes)
+
+    def __repr__(self):
+        return 'Colorschemes({})'.format(list(self._schemes))
+
+
+def _build_named(base, data_name, num_colors=None):
+    """
+    returns a function that builds a colorscheme from the base
+    colorscheme and named colors in _color_data
+    """
+    def builder():
+        from . import _color_data
+
+        named_colors = getattr(_color_data, data_name)
+        if num_colors is not None:
+            named_colors = dict(islice(named_colors.items(), 0, num_colors))
+        return colorschemes[base] + build_from_named_colors(named_colors)
+    return builder
+
+
+def _build_continuous(name):
+    """
+    returns a function that builds a continuous colorscheme from the
+    data in _cm_listed
+    """
+    def builder():
+        import numpy as np
+        from . import _cm_listed
+
+        scheme = getattr(_cm_listed, "_{}_data".format(name))
+        scheme = (np.array(scheme) * 255).round().astype(np.uint8).tolist()
+        return [(str(i), tuple(c)) for i, c in enumerate(scheme)]
+    return builder
+
+
+colorschemes = Colorschemes()
 
 # just for transparent background, no other colors
 colorschemes['transparent'] = [('transparent', (0, 0, 0, 127))]
@@ -118,23 +225,27 @@ colorschemes['web'] = (colorschemes["BW"] + [('silver', (191, 191, 191)),
                                              ('purple', (127, 0, 127))])
 
 
-colorschemes['tableau'] = colorschemes['BW'] + build_from_named_colors(_color_data.TABLEAU_COLORS)
-colorschemes['css4'] = colorschemes['transparent'] + build_from_named_colors(_color_data.CSS4_COLORS)
+colorschemes.add_builder('tableau', _build_named('BW', 'TABLEAU_COLORS'))
+colorschemes.add_builder('css4', _build_named('transparent', 'CSS4_COLORS'))
 # XKCD has 954 colors -- we're using the first 255
 # maybe the most popular?
-XKCD = dict(islice(_color_data.XKCD_COLORS.items(), 0, 255))
-colorschemes['xkcd'] = colorschemes['transparent'] + build_from_named_colors(XKCD)
+colorschemes.add_builder('xkcd', _build_named('transparent', 'XKCD_COLORS', 255))
 
 colorscheme_names = [(name, 'discrete') for name in colorschemes.keys()]
 
-# build continuous colormaps
-for dataname in dir(_cm_listed):
-    if dataname.endswith("_data"):
-        name = dataname[:-5].lstrip("_")
-        scheme = getattr(_cm_listed, dataname)
-        scheme = (np.array(scheme) * 255).round().astype(np.uint8).tolist()
-        colorschemes[name] = [(str(i), tuple(c)) for i, c in enumerate(scheme)]
-        colorscheme_names.append((name, 'continuous'))
+# continuous colormaps
+for name in CONTINUOUS_SCHEMES:
+    colorschemes.add_builder(name, _build_continuous(name))
+    colorscheme_names.append((name, 'continuous'))
 
 # clean up the namespace
-del dataname, scheme, np
+del name
+
+
+def __getattr__(name):
+    # the XKCD colors used for the 'xkcd' colorscheme, built when asked for
+    if name == 'XKCD':
+        from . import _color_data
+
+        return dict(islice(_color_data.XKCD_COLORS.items(), 0, 255))
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
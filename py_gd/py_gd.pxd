@@ -15,12 +15,25 @@ IF UNAME_SYSNAME == "Windows":
         FILE *_wfopen(const wchar_t *filename, const wchar_t *mode)
 
 ## access the gd header files:
-cdef extern from "gd.h":
+## all of these are pure C, so they can be called without the GIL
+cdef extern from "gd.h" nogil:
 
     cdef struct gdImageStruct:
         pass  # for now, all I need is to know it exists to pass along...
         # Palette-based image pixels
         unsigned char **pixels
+        # Truecolor image pixels (when trueColor is set)
+        # the palette
+        int colorsTotal
+        int red[256]
+        int green[256]
+        int blue[256]
+        int alpha[256]
+        int open[256]
+        int transparent
+        int trueColor
+        int **tpixels
+        int alphaBlendingFlag
         # lots more we might want here, but for now...
     ctypedef gdImageStruct *gdImagePtr
 
@@ -40,11 +53,13 @@ cdef extern from "gd.h":
 
     # utilities for creating, etc, images
     gdImagePtr gdImageCreatePalette(int width, int height)
+    gdImagePtr gdImageCreateTrueColor(int width, int height)
 
     void gdImageDestroy (gdImagePtr im)
 
     int gdImageColorAllocate (gdImagePtr im, int r, int g, int b)
     int gdImageColorAllocateAlpha(gdImagePtr im, int r, int g, int b, int a)
+    int gdImageColorClosestAlpha(gdImagePtr im, int r, int g, int b, int a)
     int gdImageGetPixel(gdImagePtr im, int x, int y)
 
     void gdImageSetClip(gdImagePtr im, int x1, int y1, int x2, int y2)
@@ -53,6 +68,9 @@ cdef extern from "gd.h":
     # drawing functions
     ## to set up line drawing
     void gdImageSetThickness(gdImagePtr im, int thickness)
+    ## alpha handling (truecolor images only)
+    void gdImageAlphaBlending(gdImagePtr im, int alphaBlendingArg)
+    void gdImageSaveAlpha(gdImagePtr im, int saveAlphaArg)
 
     void gdImageSetPixel (gdImagePtr im, int x, int y, int color)
 
@@ -74,6 +92,7 @@ cdef extern from "gd.h":
 
     #copying, etc.
     void gdImageCopy(gdImagePtr dst, gdImagePtr src, int dstX, int dstY, int srcX, int srcY, int w, int h)
+    gdImagePtr gdImageCreatePaletteFromTrueColor(gdImagePtr im, int ditherFlag, int colorsWanted)
 
     # text drawing, etc.
     void gdImageString(gdImagePtr im, gdFontPtr font, int x, int y, unsigned char *s, int color)
@@ -84,9 +103,18 @@ cdef extern from "gd.h":
     void gdImageGif  (gdImagePtr im, FILE *outFile)
     void gdImagePng  (gdImagePtr im, FILE *outFile)
 
+    # in-memory image encoders -- the returned buffer must be freed with gdFree
+    void *gdImageBmpPtr  (gdImagePtr im, int *size, int compression)
+    void *gdImageJpegPtr (gdImagePtr im, int *size, int quality)
+    void *gdImageGifPtr  (gdImagePtr im, int *size)
+    void *gdImagePngPtr  (gdImagePtr im, int *size)
+
+    void gdFree(void *m)
+
     # query functions
     int gdImageSX(gdImagePtr im) # MACRO
     int gdImageSY(gdImagePtr im) # MACRO
+    int gdImageTrueColor(gdImagePtr im) # MACRO
     int gdImageCompare (gdImagePtr im1, gdImagePtr im2);
 
     # constants (these are #define in gd.h)
@@ -111,6 +139,11 @@ cdef extern from "gd.h":
     void gdImageGifAnimBegin(gdImagePtr im, FILE *outFile, int GlobalCM, int Loops);
     void gdImageGifAnimAdd(gdImagePtr im, FILE *outFile, int LocalCM, int LeftOfs, int TopOfs, int Delay, int Disposal, gdImagePtr previm);
     void gdImageGifAnimEnd(FILE *outFile);
+    # in-memory versions -- each returns the chunk of the GIF it encodes,
+    # which must be freed with gdFree
+    void *gdImageGifAnimBeginPtr(gdImagePtr im, int *size, int GlobalCM, int Loops)
+    void *gdImageGifAnimAddPtr(gdImagePtr im, int *size, int LocalCM, int LeftOfs, int TopOfs, int Delay, int Disposal, gdImagePtr previm)
+    void *gdImageGifAnimEndPtr(int *size)
 
 # fonts are in extra headers:
 cdef extern from "gdfontt.h":
@@ -6,10 +6,17 @@ Provides an OO interface -- at least to the limited functionality wrapped
 NOTE: pixel coordinates are defined as c ints -- if you pass in values
       larger than a c int can take (usually ~ 2**31 - 1), it will overflow,
       and who knows what you'll get.
+
+NOTE: The GIL is released while libgd is drawing or saving, so separate
+      Images can be rendered in parallel from multiple threads. A single
+      Image is not thread safe -- don't draw on the same one from more
+      than one thread at a time.
 """
 import os
 import sys
 import operator
+# (underscored, so "from .py_gd import *" in __init__ does not export them)
+from collections import deque as _deque, OrderedDict as _OrderedDict
 
 import cython
 from cython cimport view
@@ -17,9 +24,11 @@ from cython cimport view
 from py_gd cimport *
 
 from cpython.mem cimport PyMem_Free
-from libc.stdio cimport FILE, fopen, fclose, fread
-from libc.string cimport memcpy, strlen
-from libc.stdlib cimport malloc, free
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.buffer cimport PyBUF_FORMAT, PyBUF_STRIDES, PyBUF_C_CONTIGUOUS
+from libc.stdio cimport FILE, fopen, fclose, fread, fwrite
+from libc.string cimport memcpy, memcmp, memset, strlen
+from libc.stdlib cimport malloc, calloc, free
 from libc.stddef cimport wchar_t
 
 cdef extern from "Python.h":
@@ -28,7 +37,10 @@ cdef extern from "Python.h":
 import numpy as np
 cimport numpy as cnp
 from py_gd.colors import colorschemes
-from py_gd.spline import find_control_points, polygon_from_ctrl_points, polyline_from_ctrl_points
+# NOTE: to keep import (and start up) fast, modules that are only needed
+#       for some things (py_gd.spline, the big color tables in py_gd.colors,
+#       concurrent.futures) are only imported when they are first used.
+#       test_import.py checks what is imported.
 
 __gd_version__ = gdVersionString().decode('ascii')
 
@@ -64,6 +76,53 @@ cpdef cnp.ndarray[int, ndim=2, mode='c'] asn2array(obj, dtype):
     return arr
 
 
+cdef check_offsets(offsets, Py_ssize_t num_points, Py_ssize_t min_points, str what):
+    """
+    checks and converts the offsets for a ragged array of points
+
+    item ``i`` is ``points[offsets[i]:offsets[i + 1]]``
+
+    :param offsets: sequence of N + 1 integers
+    :param num_points: total number of points
+    :param min_points: minimum number of points in each item
+    :param what: what the items are -- used in the error messages
+
+    :returns: offsets as a contiguous array of np.intp
+
+    raises ValueError if the offsets don't make sense
+    """
+    offsets = np.asarray(offsets)
+
+    if offsets.ndim != 1 or offsets.shape[0] < 1:
+        raise ValueError("offsets must be a 1-d sequence of at least one index")
+    if offsets.dtype.kind not in 'iu':
+        raise ValueError("offsets must be integers")
+    offsets = np.ascontiguousarray(offsets, dtype=np.intp)
+    if offsets[0] < 0 or offsets[-1] > num_points:
+        raise ValueError("offsets must be within the points array")
+    if np.any(np.diff(offsets) < min_points):
+        raise ValueError('There must be at least {} points specified '
+                         'for each {}'.format(min_points, what))
+    return offsets
+
+
+cdef get_width_array(line_width, Py_ssize_t n, str what):
+    """
+    returns a length n array of line widths (np.intc)
+
+    :param line_width: a single width, or a sequence of n of them
+    :param n: number of widths needed
+    :param what: what the widths are for -- used in the error message
+    """
+    widths = np.asarray(line_width, dtype=np.intc)
+    if widths.ndim == 0:
+        return np.full((n,), widths, dtype=np.intc)
+    elif widths.shape != (n,):
+        raise ValueError("number of line widths must match number of {}, "
+                         "or be only one width".format(what))
+    return np.ascontiguousarray(widths)
+
+
 cdef FILE* open_file(file_path, str mode) except *:
     """
     opens a file for writing
@@ -150,12 +209,264 @@ def _read_text_file(filepath, encoding="utf-8"):
     return ustring
 
 
-cdef draw_single_dot(gdImagePtr image,
-                     int x,
-                     int y,
-                     int diameter,
-                     cnp.uint8_t c):
+# Precomputed "stamps" for the small dots: the (dx, dy) offsets of the
+# pixels that make up a dot of each diameter -- the same pixels that
+# draw_single_dot() sets. The stamp for diameter d is entries:
+#   DOT_STAMP_START[d] to DOT_STAMP_START[d] + DOT_STAMP_LEN[d]
+cdef enum:
+    MAX_STAMP_DIAMETER = 3
+cdef int DOT_STAMP_DX[10]
+cdef int DOT_STAMP_DY[10]
+cdef int DOT_STAMP_START[MAX_STAMP_DIAMETER + 1]
+cdef int DOT_STAMP_LEN[MAX_STAMP_DIAMETER + 1]
+DOT_STAMP_DX[:] = [0,  0, 1, 0, 1,  0, 0, 0, -1, 1]
+DOT_STAMP_DY[:] = [0,  0, 0, 1, 1,  -1, 0, 1, 0, 0]
+DOT_STAMP_START[:] = [0, 0, 1, 5]
+DOT_STAMP_LEN[:] = [0, 1, 4, 5]
+
+
+# The affine map from world coordinates to pixels (see Viewport)
+cdef struct Transform:
+    double x_scale
+    double x_offset
+    double y_scale
+    double y_offset
+
+# pixel coordinates from world coordinates are clamped to +- this: far
+# outside any image, but small enough that libgd's line clipping can't
+# overflow a C int (see test_overflow.py)
+cdef double PIXEL_LIMIT = 2.0 ** 29
+
+
+cdef inline int world_to_pixel(double value, double scale, double offset) noexcept nogil:
+    """
+    the pixel a world coordinate is in: floor(value * scale + offset)
+
+    clamped to +- PIXEL_LIMIT (NaN becomes -PIXEL_LIMIT)
+    """
+    cdef double p = value * scale + offset
+    # (NaN fails the comparison)
+    p = p if p >= -PIXEL_LIMIT else -PIXEL_LIMIT
+    p = p if p <= PIXEL_LIMIT else PIXEL_LIMIT
+    cdef int i = <int> p
+    # (the cast truncates towards zero)
+    return i - (i > p)
+
+
+# The coordinates of a set of points: either pixel coordinates, or world
+# coordinates, transformed to pixels as the points are drawn
+cdef struct Points:
+    # C-contiguous Nx2 pixel coordinates, or NULL to use the world coordinates
+    const int *pixels
+    # the world coordinates: float32 or float64, with any strides
+    const char *world
+    Py_ssize_t stride0
+    Py_ssize_t stride1
+    bint world_float32
+    Transform transform
+
+
+cdef const int *points_block(const Points *points,
+                             Py_ssize_t start,
+                             Py_ssize_t end,
+                             int *buffer) noexcept nogil:
+    """
+    the pixel coordinates of points start to end, as (x, y) pairs
+
+    :param buffer: room for end - start points, used if the points
+                   need to be transformed
+    :returns: pointer to the coordinates
+    """
+    cdef Py_ssize_t i
+    cdef Transform t = points.transform
+    cdef Py_ssize_t stride0 = points.stride0
+    cdef Py_ssize_t stride1 = points.stride1
+    cdef const char *world
+
+    if points.pixels is not NULL:
+        return points.pixels + 2 * start
+
+    world = points.world + start * stride0
+    if points.world_float32:
+        for i in range(end - start):
+            buffer[2 * i] = world_to_pixel((<const float *> (world + i * stride0))[0],
+                                           t.x_scale, t.x_offset)
+            buffer[2 * i + 1] = world_to_pixel((<const float *> (world + i * stride0 + stride1))[0],
+                                               t.y_scale, t.y_offset)
+    else:
+        for i in range(end - start):
+            buffer[2 * i] = world_to_pixel((<const double *> (world + i * stride0))[0],
+                                           t.x_scale, t.x_offset)
+            buffer[2 * i + 1] = world_to_pixel((<const double *> (world + i * stride0 + stride1))[0],
+                                               t.y_scale, t.y_offset)
+    return buffer
+
 
+cdef cnp.ndarray points_scratch(const Points *points, Py_ssize_t n):
+    """
+    room to transform n points into (see points_block), for polygons and
+    polylines, which need all their points at once
+
+    :returns: a Nx2 C int array, or None if the points are pixel
+              coordinates already
+    """
+    if points.pixels is not NULL:
+        return None
+    return np.empty((n, 2), dtype=np.intc)
+
+
+cdef inline int *scratch_ptr(cnp.ndarray scratch):
+    return NULL if scratch is None else <int *> scratch.data
+
+
+# The colors of a set of points: either one color for each point, or a
+# value for each point, mapped through a ColorRamp as the points are drawn
+cdef struct PointColors:
+    # the colors, or NULL to use the values
+    const int *colors
+    # the values: float32 or float64, every values_stride bytes
+    const char *values
+    Py_ssize_t values_stride
+    bint values_float32
+    # where set (if not NULL), the ramp's nodata_index is used
+    const unsigned char *mask
+    Py_ssize_t mask_stride
+    const RampParams *params
+    # the pixel value for each color index
+    const int *lut
+
+
+# the points' colors and pixel coordinates are computed this many points
+# at a time, as they are drawn: a separate tight loop computes them much
+# faster than doing it for each point in the drawing loop, and the block
+# stays in cache.
+cdef enum:
+    POINT_BLOCK = 1024
+
+
+cdef const int *point_colors_block(const PointColors *colors,
+                                   Py_ssize_t start,
+                                   Py_ssize_t end,
+                                   int *buffer) noexcept nogil:
+    """
+    the colors (palette indexes or truecolor values) of points start to end
+
+    :param buffer: room for POINT_BLOCK colors, used if the
+                   values need to be mapped
+    :returns: pointer to the colors
+    """
+    cdef Py_ssize_t i
+    cdef const RampParams *params = colors.params
+    cdef Py_ssize_t stride = colors.values_stride
+    cdef const char *values
+
+    if colors.colors is not NULL:
+        return colors.colors + start
+
+    values = colors.values + start * stride
+    if colors.values_float32:
+        for i in range(end - start):
+            buffer[i] = colors.lut[ramp_index(params, (<const float *> (values + i * stride))[0])]
+    else:
+        for i in range(end - start):
+            buffer[i] = colors.lut[ramp_index(params, (<const double *> (values + i * stride))[0])]
+
+    if colors.mask is not NULL:
+        for i in range(start, end):
+            if colors.mask[i * colors.mask_stride]:
+                buffer[i - start] = colors.lut[params.nodata_index]
+    return buffer
+
+
+cdef void stamp_pixels(gdImagePtr image,
+                       const Points *points,
+                       const PointColors *colors,
+                       Py_ssize_t n,
+                       const int *stamp_dx,
+                       const int *stamp_dy,
+                       int stamp_len) noexcept nogil:
+    """
+    draw a "stamp" (a fixed set of pixels) centered on each point, by
+    writing straight into the pixel rows of a palette image
+
+    This is equivalent to calling gdImageSetPixel for each pixel, but the
+    clipping is done once per point: stamps entirely inside the clip
+    rectangle need no per-pixel checks.
+
+    Truecolor images may need alpha blending, so those go through
+    gdImageSetPixel.
+
+    :param points: the centers of the stamps (see Points)
+    :param colors: the colors of the points (see PointColors)
+    :param stamp_dx, stamp_dy: the offsets of the pixels in the stamp
+    :param stamp_len: the number of pixels in the stamp
+    """
+    cdef int cx1, cy1, cx2, cy2
+    cdef int min_dx = 0, max_dx = 0, min_dy = 0, max_dy = 0
+    cdef int x, y, px, py, k
+    cdef cnp.uint8_t c
+    cdef Py_ssize_t i, start, end
+    cdef unsigned char **rows = image.pixels
+    cdef int color_buffer[POINT_BLOCK]
+    cdef int xy_buffer[2 * POINT_BLOCK]
+    cdef const int *block_colors
+    cdef const int *xy
+
+    if gdImageTrueColor(image):
+        start = 0
+        while start < n:
+            end = min(start + POINT_BLOCK, n)
+            block_colors = point_colors_block(colors, start, end, color_buffer)
+            xy = points_block(points, start, end, xy_buffer)
+            for i in range(end - start):
+                for k in range(stamp_len):
+                    gdImageSetPixel(image,
+                                    xy[2 * i] + stamp_dx[k],
+                                    xy[2 * i + 1] + stamp_dy[k],
+                                    block_colors[i])
+            start = end
+        return
+
+    gdImageGetClip(image, &cx1, &cy1, &cx2, &cy2)
+
+    for k in range(stamp_len):
+        min_dx = min(min_dx, stamp_dx[k])
+        max_dx = max(max_dx, stamp_dx[k])
+        min_dy = min(min_dy, stamp_dy[k])
+        max_dy = max(max_dy, stamp_dy[k])
+
+    start = 0
+    while start < n:
+        end = min(start + POINT_BLOCK, n)
+        block_colors = point_colors_block(colors, start, end, color_buffer)
+        xy = points_block(points, start, end, xy_buffer)
+        for i in range(end - start):
+            x = xy[2 * i]
+            y = xy[2 * i + 1]
+            c = block_colors[i]
+            if (x >= cx1 - min_dx and x <= cx2 - max_dx and
+                    y >= cy1 - min_dy and y <= cy2 - max_dy):
+                # entirely inside the clip rect
+                for k in range(stamp_len):
+                    rows[y + stamp_dy[k]][x + stamp_dx[k]] = c
+            elif (x >= cx1 - max_dx and x <= cx2 - min_dx and
+                    y >= cy1 - max_dy and y <= cy2 - min_dy):
+                # partly inside -- check each pixel
+                for k in range(stamp_len):
+                    px = x + stamp_dx[k]
+                    py = y + stamp_dy[k]
+                    if px >= cx1 and px <= cx2 and py >= cy1 and py <= cy2:
+                        rows[py][px] = c
+        start = end
+
+
+cdef void draw_single_dot(gdImagePtr image,
+                          int x,
+                          int y,
+                          int diameter,
+                          int c) noexcept nogil:
+    # NOTE: diameters < 1 are checked for by the callers,
+    #       so that this can be called without the GIL
     if diameter == 1:
         gdImageSetPixel(image, x, y, c)
     elif diameter == 2:  # draw four pixels
@@ -175,8 +486,654 @@ cdef draw_single_dot(gdImagePtr image,
                          diameter, diameter,
                          0, 360,
                          c, gdArc)
+
+
+cdef enum:
+    # block size (in pixels) for the blocked transpose in copy_array_to_rows
+    TRANSPOSE_BLOCK = 64
+
+# the pixel types: palette indices, and truecolor ARGB values
+ctypedef fused pixel_t:
+    unsigned char
+    unsigned int
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void copy_array_to_rows(const pixel_t[:, :] arr,
+                             pixel_t **rows) noexcept nogil:
+    """
+    copy a (width, height) array into the rows of an image
+
+    If the columns of the array are contiguous (Fortran order), each image
+    row is a single memcpy. Otherwise (C order, or arbitrary strides), it is
+    a blocked transpose, to keep both the reads and writes cache-friendly.
+    """
+    cdef Py_ssize_t width = arr.shape[0]
+    cdef Py_ssize_t height = arr.shape[1]
+    cdef Py_ssize_t stride0 = arr.strides[0]
+    cdef Py_ssize_t stride1 = arr.strides[1]
+    cdef Py_ssize_t row, col, r0, c0, r_end, c_end, r_block, c_block
+    cdef const char *src
+    cdef pixel_t *dst
+
+    if width == 0 or height == 0:
+        return
+
+    if stride0 == sizeof(pixel_t):
+        for row in range(height):
+            memcpy(rows[row], &arr[0, row], width * sizeof(pixel_t))
     else:
-        raise NotImplementedError("only diameters >= 1 are supported.")
+        for r_block in range((height + TRANSPOSE_BLOCK - 1) // TRANSPOSE_BLOCK):
+            r0 = r_block * TRANSPOSE_BLOCK
+            r_end = min(r0 + TRANSPOSE_BLOCK, height)
+            for c_block in range((width + TRANSPOSE_BLOCK - 1) // TRANSPOSE_BLOCK):
+                c0 = c_block * TRANSPOSE_BLOCK
+                c_end = min(c0 + TRANSPOSE_BLOCK, width)
+                for row in range(r0, r_end):
+                    src = <const char *> &arr[c0, row]
+                    dst = rows[row]
+                    for col in range(c0, c_end):
+                        dst[col] = (<const pixel_t *> src)[0]
+                        src += stride0
+
+
+# The mapping of values to color indices for a ColorRamp (see color_ramp.py)
+cdef struct RampParams:
+    double min_value
+    double delta
+    int start_index
+    int num_colors
+    int nodata_index
+    # the highest index offset, num_colors - 1, as a double
+    double max_offset
+    # for the nonlinear norms: the values where the index steps up
+    # (ColorRamp._edges), or NULL for linear
+    const double *edges
+    int num_edges
+    # and the table for looking values up in them (see
+    # ColorRamp._build_edge_table): the number of edges before each bucket
+    const unsigned short *table
+    int table_size
+    # table_size - 1, as a double
+    double table_last
+    # buckets evenly spaced in the value (0), or in the float64 bits (1)
+    int table_mode
+    double table_lo
+    double table_scale
+    unsigned long long table_key_min
+    int table_shift
+    # the most edges in a bucket
+    int table_steps
+
+cdef double ROUND_MAGIC = 6755399441055744.0
+
+# the types of values mapped directly -- others are converted to float64
+ctypedef fused ramp_value_t:
+    float
+    double
+
+
+cdef get_ramp_params(ramp, RampParams *params):
+    """
+    fills in the RampParams from a ColorRamp
+
+    The indices are checked here, so the kernels can look them up in a
+    256 entry table without bounds checks.
+    """
+    params.min_value = ramp.min_value
+    params.delta = ramp._delta
+    params.start_index = ramp.start_index
+    params.num_colors = ramp._num_colors
+    params.nodata_index = ramp.nodata_index
+    if not 0 <= params.nodata_index <= 255:
+        raise ValueError(f"nodata_index must be from 0 to 255, not {params.nodata_index}")
+    if (params.start_index < 0 or params.num_colors < 1
+            or params.start_index + params.num_colors > 256):
+        raise ValueError(f"the ramp's color indices, {params.start_index} to "
+                         f"{params.start_index + params.num_colors - 1}, must be from 0 to 255")
+    params.max_offset = params.num_colors - 1
+    params.edges = NULL
+    params.num_edges = 0
+
+    cdef const double[::1] edges
+    cdef const unsigned short[::1] table
+    if ramp._edges is not None and len(ramp._edges) > 0:
+        # (the ramp holds on to the arrays)
+        edges = ramp._table_edges
+        params.edges = &edges[0]
+        params.num_edges = len(ramp._edges)
+        params.table_steps = ramp._table_steps
+        table = ramp._table
+        params.table = &table[0]
+        params.table_size = table.shape[0]
+        params.table_last = params.table_size - 1
+        params.table_mode = ramp._table_mode
+        if params.table_mode == 0:
+            params.table_lo = ramp._table_offset
+            params.table_scale = ramp._table_scale
+        else:
+            params.table_key_min = ramp._table_offset
+            params.table_shift = ramp._table_scale
+
+
+cdef inline int ramp_edges_index(const RampParams *params, double value) noexcept nogil:
+    """
+    the color index for a value with a nonlinear norm: the number of edges
+    at or below it (like np.searchsorted(side='right'))
+
+    The table gives the edges before the value's bucket, so only the edges
+    in the bucket are checked. That is always table_steps checks (the
+    edges are padded with inf), so there are no unpredictable branches.
+    """
+    cdef double f
+    cdef unsigned long long key
+    cdef int bucket, i, step
+
+    if value != value:
+        return params.nodata_index
+
+    if params.table_mode == 0:
+        f = (value - params.table_lo) * params.table_scale
+        f = f if f >= 0.0 else 0.0
+        f = f if f <= params.table_last else params.table_last
+        bucket = <int> f
+    else:
+        # the float64 bits, flipped so they sort like the values
+        memcpy(&key, &value, sizeof(double))
+        key ^= (0 - (key >> 63)) | 0x8000000000000000ULL
+        key = key if key > params.table_key_min else params.table_key_min
+        key = (key - params.table_key_min) >> params.table_shift
+        key = key if key < <unsigned long long> params.table_size else params.table_size - 1
+        bucket = <int> key
+
+    i = params.table[bucket]
+    for step in range(params.table_steps):
+        i += params.edges[i] <= value
+    # (inf is past all the edges -- and the padding)
+    i = i if i <= params.num_edges else params.num_edges
+    return params.start_index + i
+
+
+@cython.cdivision(True)
+cdef inline int ramp_index(const RampParams *params, double value) noexcept nogil:
+    """
+    the color index for a value: the nearest color, clipped to the ramp
+
+    NaN is mapped to the nodata_index
+
+    (delta is never zero -- ColorRamp requires max_value != min_value. It
+    is negative for an inverted ramp, which works the same way)
+    """
+    if params.edges is not NULL:
+        return ramp_edges_index(params, value)
+
+    cdef double x = (value - params.min_value) / params.delta
+
+    cdef bint nan = x != x
+    # (NaN fails the comparison, so becomes 0.0 here)
+    x = x if x >= 0.0 else 0.0
+    x = x if x <= params.max_offset else params.max_offset
+    # adding and subtracting 1.5 * 2**52 rounds half to even, like np.round
+    # (and nearbyint, but without a call into libm)
+    cdef int index = params.start_index + <int> ((x + ROUND_MAGIC) - ROUND_MAGIC)
+    return params.nodata_index if nan else index
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void ramp_indices(const ramp_value_t[::1] values,
+                       const unsigned char *mask,
+                       unsigned char[::1] out,
+                       const RampParams *params) noexcept nogil:
+    """
+    maps the values to color indices, in one pass
+
+    where mask is set (if it is not NULL), the nodata_index is used
+    """
+    cdef Py_ssize_t i
+
+    if mask is NULL:
+        for i in range(values.shape[0]):
+            out[i] = ramp_index(params, values[i])
+    else:
+        for i in range(values.shape[0]):
+            out[i] = params.nodata_index if mask[i] else ramp_index(params, values[i])
+
+
+def _color_ramp_indices(ramp, values, out=None):
+    """
+    maps the values to color indices of the ColorRamp
+
+    see ColorRamp.get_color_indices
+    """
+    cdef RampParams params
+    cdef cnp.ndarray mask_arr = None
+    cdef const unsigned char *mask = NULL
+    cdef unsigned char[::1] out_view
+    cdef const float[::1] values32
+    cdef const double[::1] values64
+
+    get_ramp_params(ramp, &params)
+
+    mask_obj = np.ma.getmask(values)
+    values = np.ma.getdata(values)
+    if values.dtype not in (np.float32, np.float64):
+        values = values.astype(np.float64)
+    shape = values.shape
+
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif not isinstance(out, np.ndarray) or out.dtype != np.uint8 or out.shape != shape:
+        raise ValueError("out must be a uint8 array the same shape as values")
+    elif not out.flags.c_contiguous:
+        raise ValueError("out must be C contiguous")
+
+    out_view = out.reshape(-1)
+    values = np.ascontiguousarray(values).reshape(-1)
+    if mask_obj is not np.ma.nomask:
+        mask_arr = np.ascontiguousarray(np.broadcast_to(mask_obj, shape), dtype=np.uint8).reshape(-1)
+        mask = <const unsigned char *> mask_arr.data
+
+    if values.dtype == np.float32:
+        values32 = values
+        with nogil:
+            ramp_indices(values32, mask, out_view, &params)
+    else:
+        values64 = values
+        with nogil:
+            ramp_indices(values64, mask, out_view, &params)
+
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void draw_field_rows(const ramp_value_t[:, :] values,
+                          const unsigned char[:, :] mask,
+                          bint has_mask,
+                          gdImagePtr image,
+                          int x1, int y1, int x2, int y2,
+                          int ey1, int ey_height,
+                          const RampParams *params,
+                          const int *lut,
+                          const Py_ssize_t *cols) noexcept nogil:
+    """
+    maps the values through the ramp, and writes them into the pixel rows
+    x1 to x2, y1 to y2 of the image.
+
+    The values are resampled to the extent they are drawn in (starting
+    at row ey1, ey_height rows high) with the nearest value to each pixel
+    center. cols is the index of the column of values for each pixel x1 to x2.
+
+    lut is the pixel value for each color index.
+    """
+    cdef Py_ssize_t ny = values.shape[1]
+    cdef Py_ssize_t stride = values.strides[0]
+    cdef Py_ssize_t mask_stride = mask.strides[0]
+    cdef Py_ssize_t row, prev_row = -1
+    cdef int x, y, c
+    cdef int width = x2 - x1 + 1
+    cdef bint truecolor = gdImageTrueColor(image)
+    cdef const char *src
+    cdef const char *mask_src = NULL
+    cdef unsigned char *dst8
+    cdef int *dst32
+
+    for y in range(y1, y2 + 1):
+        row = ((2 * <Py_ssize_t> (y - ey1) + 1) * ny) // (2 * <Py_ssize_t> ey_height)
+        if row == prev_row:
+            # same values as the row above
+            if truecolor:
+                memcpy(image.tpixels[y] + x1, image.tpixels[y - 1] + x1, width * sizeof(int))
+            else:
+                memcpy(image.pixels[y] + x1, image.pixels[y - 1] + x1, width)
+            continue
+        prev_row = row
+
+        src = <const char *> &values[0, row]
+        if has_mask:
+            mask_src = <const char *> &mask[0, row]
+        if truecolor:
+            dst32 = image.tpixels[y] + x1
+            for x in range(width):
+                if has_mask and mask_src[cols[x] * mask_stride]:
+                    dst32[x] = lut[params.nodata_index]
+                else:
+                    dst32[x] = lut[ramp_index(params, (<const ramp_value_t *> (src + cols[x] * stride))[0])]
+        else:
+            dst8 = image.pixels[y] + x1
+            for x in range(width):
+                if has_mask and mask_src[cols[x] * mask_stride]:
+                    dst8[x] = lut[params.nodata_index]
+                else:
+                    dst8[x] = lut[ramp_index(params, (<const ramp_value_t *> (src + cols[x] * stride))[0])]
+
+
+# The XXH64 hash (https://github.com/Cyan4973/xxHash) -- a fast
+# non-cryptographic hash, used for the content digest of Images.
+cdef unsigned long long XXH_PRIME64_1 = 0x9E3779B185EBCA87
+cdef unsigned long long XXH_PRIME64_2 = 0xC2B2AE3D27D4EB4F
+cdef unsigned long long XXH_PRIME64_3 = 0x165667B19E3779F9
+cdef unsigned long long XXH_PRIME64_4 = 0x85EBCA77C2B2AE63
+cdef unsigned long long XXH_PRIME64_5 = 0x27D4EB2F165667C5
+
+
+cdef inline unsigned long long xxh_rotl64(unsigned long long x, int r) noexcept nogil:
+    return (x << r) | (x >> (64 - r))
+
+
+cdef inline unsigned long long xxh64_round(unsigned long long acc,
+                                           unsigned long long value) noexcept nogil:
+    acc += value * XXH_PRIME64_2
+    acc = xxh_rotl64(acc, 31)
+    return acc * XXH_PRIME64_1
+
+
+cdef inline unsigned long long xxh64_merge_round(unsigned long long acc,
+                                                 unsigned long long value) noexcept nogil:
+    acc ^= xxh64_round(0, value)
+    return acc * XXH_PRIME64_1 + XXH_PRIME64_4
+
+
+cdef unsigned long long xxh64(const void *data, size_t length,
+                              unsigned long long seed) noexcept nogil:
+    """
+    the XXH64 hash of length bytes of data
+    (the words are read in native byte order)
+    """
+    cdef const unsigned char *p = <const unsigned char *> data
+    cdef const unsigned char *end = p + length
+    cdef unsigned long long v1, v2, v3, v4, h64, word
+    cdef unsigned int word32
+
+    if length >= 32:
+        v1 = seed + XXH_PRIME64_1 + XXH_PRIME64_2
+        v2 = seed + XXH_PRIME64_2
+        v3 = seed
+        v4 = seed - XXH_PRIME64_1
+        while p + 32 <= end:
+            memcpy(&word, p, 8)
+            v1 = xxh64_round(v1, word)
+            memcpy(&word, p + 8, 8)
+            v2 = xxh64_round(v2, word)
+            memcpy(&word, p + 16, 8)
+            v3 = xxh64_round(v3, word)
+            memcpy(&word, p + 24, 8)
+            v4 = xxh64_round(v4, word)
+            p += 32
+        h64 = (xxh_rotl64(v1, 1) + xxh_rotl64(v2, 7)
+               + xxh_rotl64(v3, 12) + xxh_rotl64(v4, 18))
+        h64 = xxh64_merge_round(h64, v1)
+        h64 = xxh64_merge_round(h64, v2)
+        h64 = xxh64_merge_round(h64, v3)
+        h64 = xxh64_merge_round(h64, v4)
+    else:
+        h64 = seed + XXH_PRIME64_5
+
+    h64 += length
+
+    while p + 8 <= end:
+        memcpy(&word, p, 8)
+        h64 ^= xxh64_round(0, word)
+        h64 = xxh_rotl64(h64, 27) * XXH_PRIME64_1 + XXH_PRIME64_4
+        p += 8
+    if p + 4 <= end:
+        memcpy(&word32, p, 4)
+        h64 ^= word32 * XXH_PRIME64_1
+        h64 = xxh_rotl64(h64, 23) * XXH_PRIME64_2 + XXH_PRIME64_3
+        p += 4
+    while p < end:
+        h64 ^= p[0] * XXH_PRIME64_5
+        h64 = xxh_rotl64(h64, 11) * XXH_PRIME64_1
+        p += 1
+
+    h64 ^= h64 >> 33
+    h64 *= XXH_PRIME64_2
+    h64 ^= h64 >> 29
+    h64 *= XXH_PRIME64_3
+    h64 ^= h64 >> 32
+    return h64
+
+
+cdef class Palette:
+    """
+    A set of named colors, ready to be used for new Images
+
+    The palette is built once from a list of colors -- an Image created
+    with it gets the colors with a copy, and shares the name -> index
+    mapping until a color is added to it.
+
+    The Palettes for the colorschemes in ``py_gd.colors.colorschemes``
+    are built the first time they are used, and cached (see get_palette()).
+    """
+    cdef int num_colors
+    cdef int red[256]
+    cdef int green[256]
+    cdef int blue[256]
+    cdef int alpha[256]
+    cdef list names
+    cdef dict colors_rgb
+    # the indices of the colors in a paletted image, and the pixel values
+    # in a truecolor image
+    cdef dict colors
+    cdef dict truecolors
+    # cached (sorted names, indices) arrays (see Image._build_color_lookup)
+    cdef object _lookup
+    cdef object _truecolor_lookup
+
+    def __init__(self, color_list):
+        """
+        :param color_list: list of colors - each element of the list
+                           is a 2-tuple: ('color_name', (r, g, b))
+                           or ('color_name', (r, g, b, a))
+        """
+        cdef int r, g, b, a
+        cdef int i = 0
+
+        self.names = []
+        self.colors_rgb = {}
+        self.colors = {}
+        self.truecolors = {}
+
+        for name, color in color_list:
+            if name in self.colors:
+                raise ValueError('{} is already in the palette'.format(name))
+            if len(color) == 4:
+                r, g, b, a = color
+            elif len(color) == 3:
+                r, g, b = color
+                a = 0  # opaque
+            else:
+                raise ValueError('color must be an (r,g,b) triple '
+                                 'or (r,g,b,a) quad')
+            if i == 256:
+                raise ValueError('there are no more colors available to allocate')
+
+            self.red[i] = r
+            self.green[i] = g
+            self.blue[i] = b
+            self.alpha[i] = a
+            self.names.append(name)
+            self.colors_rgb[name] = color
+            self.colors[name] = i
+            # gd's packed ARGB value
+            self.truecolors[name] = (a << 24) + (r << 16) + (g << 8) + b
+            i += 1
+
+        self.num_colors = i
+
+    def __len__(self):
+        return self.num_colors
+
+    def __repr__(self):
+        return 'Palette({} colors)'.format(self.num_colors)
+
+    property names:
+        def __get__(self):
+            """
+            The names of the colors, in palette order
+            """
+            return list(self.names)
+
+
+# the Palettes of the colorschemes, as (colorscheme, Palette), built when
+# first used (and rebuilt if the colorscheme is replaced)
+cdef dict _palettes = {}
+
+
+def get_palette(name):
+    """
+    Get the Palette for one of the colorschemes in py_gd.colors.colorschemes
+
+    It is built the first time it is asked for, and cached.
+
+    :param name: name of the colorscheme
+
+    :returns palette: a Palette
+    """
+    scheme = colorschemes[name]
+    cached = _palettes.get(name)
+    if cached is not None and cached[0] is scheme:
+        return cached[1]
+
+    palette = Palette(scheme)
+    _palettes[name] = (scheme, palette)
+
+    return palette
+
+
+cdef cnp.ndarray get_world_points(obj, Points *points, const Transform *transform):
+    """
+    fills in the Points for world coordinates
+
+    float32 and float64 arrays are used in place, with any strides -- other
+    types are converted to float64.
+
+    :param obj: the points: something that can be turned into an Nx2 array
+    :returns: the array the Points point into -- keep it until the drawing
+              is done
+    """
+    cdef cnp.ndarray arr = np.asarray(obj)
+
+    if arr.ndim != 2 or arr.shape[1] != 2:
+        raise ValueError("input  must be convertible to a Nx2 array")
+    if arr.dtype not in (np.float32, np.float64):
+        arr = arr.astype(np.float64)
+
+    points.pixels = NULL
+    points.world = arr.data
+    points.stride0 = arr.strides[0]
+    points.stride1 = arr.strides[1]
+    points.world_float32 = arr.dtype == np.float32
+    points.transform = transform[0]
+
+    return arr
+
+
+cdef class Viewport:
+    """
+    The map from "world" coordinates (longitude and latitude, projected
+    meters, ...) to the pixels of an Image: a scale and offset in x and y.
+
+    A point (x, y) is in the pixel::
+
+        (floor(x * x_scale + x_offset), floor(y * y_scale + y_offset))
+
+    A negative y_scale flips the image, so that y increases up.
+
+    When an Image has a viewport, the points passed to its drawing methods
+    are in world coordinates. They are transformed to pixels as they are
+    drawn, so float32 and float64 arrays are used as they are, with no
+    copies. Sizes (line widths, diameters, the width and height of arcs
+    and ellipses) are still in pixels, as are clip_rect and the extent of
+    draw_field().
+    """
+    cdef Transform _transform
+
+    def __init__(self, scale=1.0, offset=(0.0, 0.0)):
+        """
+        :param scale=1.0: The number of pixels per world unit: a number,
+                          or (x_scale, y_scale)
+        :type scale: float, or 2-tuple of floats
+
+        :param offset=(0.0, 0.0): The pixel coordinates of the world origin
+        :type offset: 2-tuple of floats
+        """
+        if np.ndim(scale) == 0:
+            scale = (scale, scale)
+        self._transform.x_scale, self._transform.y_scale = scale
+        self._transform.x_offset, self._transform.y_offset = offset
+
+    @classmethod
+    def from_bounds(cls, bounds, size, flip_y=True):
+        """
+        A Viewport that maps a box in world coordinates onto an image
+
+        :param bounds: The box: ((x_min, y_min), (x_max, y_max))
+        :type bounds: 2-tuple of (x, y) pairs
+
+        :param size: The size of the image: (width, height) in pixels
+        :type size: 2-tuple of integers
+
+        :param flip_y=True: If True, y increases up: y_max is at the top
+                            of the image.
+        :type flip_y: bool
+
+        The x and y scales are set separately, so if the box has a
+        different aspect ratio than the image, it will be stretched.
+        """
+        (x_min, y_min), (x_max, y_max) = bounds
+        width, height = size
+        if x_max <= x_min or y_max <= y_min:
+            raise ValueError("bounds must be ((x_min, y_min), (x_max, y_max)), "
+                             "with max > min")
+
+        x_scale = width / (x_max - x_min)
+        y_scale = height / (y_max - y_min)
+        if flip_y:
+            return cls((x_scale, -y_scale), (-x_min * x_scale, y_max * y_scale))
+        return cls((x_scale, y_scale), (-x_min * x_scale, -y_min * y_scale))
+
+    def __repr__(self):
+        return 'Viewport(scale={}, offset={})'.format(self.scale, self.offset)
+
+    property scale:
+        def __get__(self):
+            """
+            The number of pixels per world unit, as (x_scale, y_scale)
+            """
+            return (self._transform.x_scale, self._transform.y_scale)
+
+    property offset:
+        def __get__(self):
+            """
+            The pixel coordinates of the world origin, as (x_offset, y_offset)
+            """
+            return (self._transform.x_offset, self._transform.y_offset)
+
+    def to_pixels(self, points):
+        """
+        The pixel coordinates of points in world coordinates
+
+        The same pixels the drawing methods use.
+
+        :param points: the (x, y) coordinates of the points
+        :type points: a Nx2 numpy array, or something that can be
+                      turned in to one
+
+        :returns: Nx2 array of C int pixel coordinates
+        """
+        cdef Points world_points
+        cdef cnp.ndarray[int, ndim=2, mode='c'] pixels
+
+        arr = get_world_points(points, &world_points, &self._transform)
+        pixels = np.empty((arr.shape[0], 2), dtype=np.intc)
+        if pixels.shape[0] > 0:
+            with nogil:
+                points_block(&world_points, 0, pixels.shape[0], &pixels[0, 0])
+        return pixels
 
 
 cdef class Image:
@@ -186,27 +1143,70 @@ cdef class Image:
     # cdef readonly unsigned int _width, _height
 
     cdef gdImagePtr _image
+    # contiguous block holding all the pixels -- the gdImage rows point into it
+    # (one byte per pixel for palette images, 4 for truecolor)
     cdef unsigned char * _buffer_array
+    cdef Py_ssize_t _itemsize
+    cdef Py_ssize_t _buffer_shape[2]
+    cdef Py_ssize_t _buffer_strides[2]
 
     cdef list color_names
     cdef dict colors_rgb
     cdef dict colors
-
-    def __cinit__(self, int width, int height, preset_colors='web'):
+    # cached (sorted names, indices) arrays for looking up names in bulk
+    cdef object _color_lookup
+    # the preset colors the Image was created with (see ImagePool)
+    cdef object _preset_colors
+    cdef Palette _palette
+    # whether the color containers are the palette's -- they are
+    # copied before a color is added
+    cdef bint _shared_colors
+    # if set, the drawing methods take world coordinates
+    cdef Viewport _viewport
+
+    def __cinit__(self, int width, int height, preset_colors='web',
+                  truecolor=False):
         # self._width  = width
         # self._height = height
 
-        if width * height > MAX_IMAGE_SIZE:
+        self._itemsize = 4 if truecolor else 1
+
+        if <Py_ssize_t> width * height * self._itemsize > MAX_IMAGE_SIZE:
             raise MemoryError("Can't create a byte image larger than {} "
                               "(arbitrary...)\n"
                               "This limit can be changed by setting "
                               "MAX_IMAGE_SIZE"
                               .format(MAX_IMAGE_SIZE))
 
-        self._image = gdImageCreatePalette(width, height)
+        cdef int row
+
+        if truecolor:
+            self._image = gdImageCreateTrueColor(width, height)
+        else:
+            self._image = gdImageCreatePalette(width, height)
         if self._image is NULL:
             raise MemoryError("could not create a gdImage")
 
+        # replace the rows allocated by libgd with one contiguous block,
+        # so that the pixels can be shared with numpy, etc (see __getbuffer__)
+        self._buffer_array = <unsigned char *> calloc(<size_t> width * height,
+                                                      self._itemsize)
+        if self._buffer_array is NULL:
+            raise MemoryError("could not allocate the image buffer")
+
+        for row in range(height):
+            if truecolor:
+                gdFree(self._image.tpixels[row])
+                self._image.tpixels[row] = <int *> (self._buffer_array +
+                                                    <size_t> row * width * 4)
+            else:
+                gdFree(self._image.pixels[row])
+                self._image.pixels[row] = self._buffer_array + <size_t> row * width
+
+        if truecolor:
+            # keep the alpha channel when saving as PNG
+            gdImageSaveAlpha(self._image, 1)
+
         # set the default clipping to the image
         gdImageSetClip(self._image, 0, 0, width - 1, height - 1)
 
@@ -214,11 +1214,24 @@ cdef class Image:
         """
         deallocate the image
         """
+        cdef int row
+
         if self._image is not NULL:
+            if self._buffer_array is not NULL:
+                # the rows belong to the buffer -- don't let libgd free them
+                for row in range(gdImageSY(self._image)):
+                    if gdImageTrueColor(self._image):
+                        self._image.tpixels[row] = NULL
+                    else:
+                        self._image.pixels[row] = NULL
             gdImageDestroy(self._image)
             self._image = NULL
 
-    def __init__(self, width, height, preset_colors='web'):
+        if self._buffer_array is not NULL:
+            free(self._buffer_array)
+            self._buffer_array = NULL
+
+    def __init__(self, width, height, preset_colors='web', truecolor=False):
         """
         create a new Image object
 
@@ -249,26 +1262,42 @@ cdef class Image:
                                             the background color or any of
                                             the colors in py_gd.colors
 
-        :type preset_colors: string or None
+                                     or a Palette
+
+        :type preset_colors: string, Palette or None
 
-        The Image is created as a 8-bit Paletted Image.
+        :param truecolor=False: If True, create a 32-bit truecolor image,
+                                rather than an 8-bit paletted one.
+        :type truecolor: bool
+
+        The Image is created as a 8-bit Paletted Image by default. A
+        truecolor Image can have any number of colors, and alpha blends
+        when drawing with partly transparent colors. Its pixel values are
+        gd's packed ARGB ints: 0x7FFFFFFF & (alpha << 24 | r << 16 | g << 8 | b),
+        with alpha from 0 (opaque) to 127 (transparent). Colors can still be
+        added by name -- the "index" of a color is its pixel value.
 
         """
         # NOTE: the initialization of the C structs is happening in the __cinit__
 
-        # set first color (background) to transparent
-        # initialize the colors
-        self.colors = {}
-        self.colors_rgb = {}
-        self.color_names = []
-
-        if preset_colors is not None:
+        if preset_colors is None:
+            palette = None
+        elif isinstance(preset_colors, Palette):
+            palette = preset_colors
+        else:
             try:
-                self.add_colors(colorschemes[preset_colors])
+                palette = get_palette(preset_colors)
             except KeyError:
                 raise ValueError("preset_colors needs to one of None, 'web', "
                                  "'BW', 'transparent', or any of the colors in "
                                  "py_gd.colors")
+        self._preset_colors = preset_colors
+        self._palette = palette
+        self._set_palette()
+
+        if truecolor and self.color_names:
+            # the background is the first color, as for a palette image
+            self.clear()
 
         # elif preset_colors == 'transparent':
         #     self.add_colors(transparent_colors)
@@ -285,6 +1314,9 @@ cdef class Image:
                 .format(self.width, self.height))
 
     def __repr__(self):
+        if self.truecolor:
+            return ('Image(width={}, height={}, truecolor=True)'
+                    .format(self.width, self.height))
         return ('Image(width={}, height={})'.format(self.width, self.height))
 
     property size:
@@ -308,11 +1340,19 @@ cdef class Image:
         def __get__(self):
             return gdImageSY(self._image)
 
+    property truecolor:
+        def __get__(self):
+            """
+            True if this is a 32-bit truecolor image, False if paletted
+            """
+            return bool(gdImageTrueColor(self._image))
+
     def __richcmp__(Image self, Image other not None, int op):
         # Thanks for this madness, cython!
         cdef int retval = -1
 
-        retval = gdImageCompare(self._image, other._image)
+        with nogil:
+            retval = gdImageCompare(self._image, other._image)
 
         if op == 2:  # ==
             return retval == 0
@@ -321,21 +1361,151 @@ cdef class Image:
         else:
             return NotImplemented
 
-    def clear(self, color=None):
+    def digest(self):
+        """
+        A digest (hash) of the contents of the image: the size, the pixels,
+        and the palette.
+
+        Images with the same digest can be assumed to be identical --
+        so it is a fast way to find duplicate images, without comparing
+        them pixel by pixel.
+
+        Note that it is the pixel values that are hashed: images that look
+        the same, but with the colors in a different order in the
+        palette, will have different digests.
+
+        :returns digest: 64 bit integer (the XXH64 hash of the contents)
+        """
+        cdef unsigned long long h
+        cdef int header[5]
+        cdef int palette[4 * 256]
+        cdef int i, n = 0
+
+        header[0] = gdImageSX(self._image)
+        header[1] = gdImageSY(self._image)
+        header[2] = gdImageTrueColor(self._image)
+        header[3] = 0 if header[2] else self._image.colorsTotal
+        header[4] = -1 if header[2] else self._image.transparent
+
+        with nogil:
+            h = xxh64(self._buffer_array,
+                      <size_t> header[0] * header[1] * self._itemsize, 0)
+            h = xxh64(header, sizeof(header), h)
+            for i in range(header[3]):
+                palette[n] = self._image.red[i]
+                palette[n + 1] = self._image.green[i]
+                palette[n + 2] = self._image.blue[i]
+                palette[n + 3] = self._image.alpha[i]
+                n += 4
+            h = xxh64(palette, n * sizeof(int), h)
+        return h
+
+    def clear(self, color=None, rect=None):
         """
         clear the image
 
         :param color=None: color to set the image to if None, it will be set
                            to the first color set (index 0)
+
+        :param rect=None: the part of the image to clear, defined by two
+                          corners: ((x1, y1), (x2, y2)), as for clip_rect.
+                          If None, the whole image is cleared.
+
+        Only the part of the image within the clip_rect is cleared.
+        The pixels are replaced -- they are not alpha blended, even for
+        a truecolor image.
         """
-        # Note: is there a call in gd for this?
+        cdef int c
+        cdef int x1, y1, x2, y2
+        cdef int cx1, cy1, cx2, cy2
+        cdef int row, col, width
+        cdef int *tpixels
+
         if color is None:
-            color = 0
+            if self.truecolor and self.color_names:
+                color = self.color_names[0]
+            else:
+                color = 0
+
+        c = self.get_color_index(color)
+
+        if rect is None:
+            x1, y1 = 0, 0
+            x2, y2 = gdImageSX(self._image) - 1, gdImageSY(self._image) - 1
+        else:
+            (x1, y1), (x2, y2) = rect
+            if x1 > x2:
+                x1, x2 = x2, x1
+            if y1 > y2:
+                y1, y2 = y2, y1
+
+        gdImageGetClip(self._image, &cx1, &cy1, &cx2, &cy2)
+        x1 = max(x1, cx1)
+        y1 = max(y1, cy1)
+        x2 = min(x2, cx2)
+        y2 = min(y2, cy2)
+        if x1 > x2 or y1 > y2:
+            return
+        width = x2 - x1 + 1
+
+        with nogil:
+            if gdImageTrueColor(self._image):
+                # fill the first row, then copy it to the rest
+                tpixels = self._image.tpixels[y1] + x1
+                for col in range(width):
+                    tpixels[col] = c
+                for row in range(y1 + 1, y2 + 1):
+                    memcpy(self._image.tpixels[row] + x1, tpixels,
+                           <size_t> width * sizeof(int))
+            elif width == gdImageSX(self._image):
+                # whole rows are one contiguous block in the buffer
+                memset(self._image.pixels[y1], c, <size_t> width * (y2 - y1 + 1))
+            else:
+                for row in range(y1, y2 + 1):
+                    memset(self._image.pixels[row] + x1, c, width)
 
-        gdImageFilledRectangle(self._image,
-                               0, 0,  # upper left
-                               self.width, self.height,  # lower right
-                               self.get_color_index(color))
+    cdef _set_palette(self):
+        """
+        sets the colors to the preset colors only
+        """
+        cdef Palette palette = self._palette
+        cdef int i, n = 0
+
+        if palette is None:
+            self.colors = {}
+            self.colors_rgb = {}
+            self.color_names = []
+            self._shared_colors = False
+        else:
+            n = palette.num_colors
+            self.colors = palette.truecolors if self._itemsize == 4 else palette.colors
+            self.colors_rgb = palette.colors_rgb
+            self.color_names = palette.names
+            self._shared_colors = True
+        self._color_lookup = None
+
+        if not gdImageTrueColor(self._image):
+            if n:
+                memcpy(self._image.red, palette.red, n * sizeof(int))
+                memcpy(self._image.green, palette.green, n * sizeof(int))
+                memcpy(self._image.blue, palette.blue, n * sizeof(int))
+                memcpy(self._image.alpha, palette.alpha, n * sizeof(int))
+            for i in range(256):
+                self._image.open[i] = i >= n
+            self._image.colorsTotal = n
+            self._image.transparent = -1
+
+    cdef _recycle(self):
+        """
+        puts the image back in the state it was created in: the preset
+        colors only, no clipping or viewport, and cleared to the background
+        color
+        """
+        self._set_palette()
+        gdImageSetClip(self._image, 0, 0,
+                       gdImageSX(self._image) - 1, gdImageSY(self._image) - 1)
+        self._viewport = None
+        self.clear()
 
     def add_color(self, name, color):
         """
@@ -373,9 +1543,15 @@ cdef class Image:
         if color_index == -1:
             raise ValueError('there are no more colors available to allocate')
 
+        if self._shared_colors:
+            self.colors = dict(self.colors)
+            self.colors_rgb = dict(self.colors_rgb)
+            self.color_names = list(self.color_names)
+            self._shared_colors = False
         self.colors[name] = color_index
         self.colors_rgb[name] = color
         self.color_names.append(name)
+        self._color_lookup = None
 
         return color_index
 
@@ -395,57 +1571,203 @@ cdef class Image:
 
         return indexes
 
-    @cython.boundscheck(False)
     def __array__(self, dtype=None, copy=None):
         """
-        :returns arr: numpy array object with a copy of the data
+        :returns arr: numpy array object with the image data
 
         Note that the array is (width, height) in size, in keeping
         with image conventions, but not array conventions. data is
         in Fortran order
-        """
-        if copy is False:
-            raise ValueError("A py_gd.Image cannot be made into an array without copying")
 
-        cdef cnp.ndarray[cnp.uint8_t, ndim=2, mode='fortran'] arr
-        arr = np.zeros((self.width, self.height), dtype=np.uint8, order='F')
+        The array is uint8 palette indices, or uint32 ARGB values for a
+        truecolor image.
 
-        cdef unsigned int row, col
+        With copy=False, the array is a view onto the image pixels:
+        drawing on the image will change the array, and setting values
+        in the array will change the image.
+        (``np.asarray(image)`` does the same thing via the buffer protocol)
+        """
+        pixel_dtype = np.uint32 if self.truecolor else np.uint8
 
-        # copy the data, item by item (copying into columns)
-        for col in range(self.height):
-            memcpy(&arr[0, col], self._image.pixels[col], self.width)
+        if copy is False:
+            if dtype is not None and np.dtype(dtype) != pixel_dtype:
+                raise ValueError("A py_gd.Image can only be viewed as a {} array "
+                                 "-- other dtypes require a copy"
+                                 .format(np.dtype(pixel_dtype).name))
+            return np.asarray(memoryview(self))
 
         if dtype is None:
-            return arr
-        else:
-            # maybe not the most efficient -- but not bad
-            #  -- if we do it any other way, we can't memcpy
-            return np.asarray(arr, dtype=dtype)
+            dtype = pixel_dtype
+
+        return np.array(memoryview(self), dtype=dtype, order='F')
 
+    def __getbuffer__(self, Py_buffer *buffer, int flags):
+        """
+        PEP 3118 buffer interface: exposes the pixels without copying
 
-    def set_data(self, char[:, :] arr not None):
+        The buffer is (width, height), Fortran ordered, uint8 ('B'),
+        or uint32 ('I') for a truecolor image
+        """
+        cdef Py_ssize_t width = gdImageSX(self._image)
+        cdef Py_ssize_t height = gdImageSY(self._image)
+
+        if width > 1 and height > 1:
+            if ((flags & PyBUF_STRIDES) != PyBUF_STRIDES
+                    or (flags & PyBUF_C_CONTIGUOUS) == PyBUF_C_CONTIGUOUS):
+                raise BufferError("A py_gd.Image buffer is Fortran ordered "
+                                  "(width, height) -- it must be accessed with strides")
+
+        self._buffer_shape[0] = width
+        self._buffer_shape[1] = height
+        self._buffer_strides[0] = self._itemsize
+        self._buffer_strides[1] = width * self._itemsize
+
+        buffer.buf = <char *> self._buffer_array
+        buffer.obj = self
+        buffer.len = width * height * self._itemsize
+        buffer.readonly = 0
+        buffer.format = NULL
+        if flags & PyBUF_FORMAT:
+            buffer.format = "I" if self._itemsize == 4 else "B"
+        buffer.ndim = 2
+        buffer.shape = self._buffer_shape
+        buffer.strides = self._buffer_strides
+        buffer.suboffsets = NULL
+        buffer.itemsize = self._itemsize
+        buffer.internal = NULL
+
+
+    def set_data(self, object arr not None):
         """
         Set the contents of the image from the input array.
 
-        array must be the right size and data type (np.uint8)
+        array must be the right size and data type (np.uint8 or np.int8,
+        or np.uint32 or np.int32 for a truecolor image)
 
         Note that the array is (width, height) in size.
 
+        Fortran ordered arrays (like ``np.array(image)``) are the fastest
+        to copy, but any memory layout will work.
         """
-        # print "f-contig:", arr.is_f_contig()
-        # print "c-contig:", arr.is_c_contig()
-        # print "memview flags are:", arr.flags
-        if arr.shape[0] != self.width or arr.shape[1] != self.height:
+        cdef const unsigned char[:, :] arr8
+        cdef const unsigned int[:, :] arr32
+
+        if self.truecolor:
+            if isinstance(arr, np.ndarray) and arr.dtype == np.int32:
+                arr = arr.view(np.uint32)
+            arr32 = arr
+            shape = (arr32.shape[0], arr32.shape[1])
+        else:
+            if isinstance(arr, np.ndarray) and arr.dtype == np.int8:
+                arr = arr.view(np.uint8)
+            arr8 = arr
+            shape = (arr8.shape[0], arr8.shape[1])
+
+        if shape != self.size:
             raise ValueError('input array must be of shape: (width, height), '
                              'and the same size as image')
 
-        cdef unsigned int row, col
+        with nogil:
+            if self._itemsize == 4:
+                copy_array_to_rows(arr32, <unsigned int **> self._image.tpixels)
+            else:
+                copy_array_to_rows(arr8, self._image.pixels)
 
-        # copy the data, item by item
-        for row in range(self.height):
-            for col in range(self.width):
-                self._image.pixels[row][col] = arr[col, row]
+    def draw_field(self, values, ramp, extent=None):
+        """
+        Draw a 2-d field of values (concentration, depth, ...), colored with
+        a ColorRamp
+
+        The values are mapped to colors and written into the image in one
+        pass. If the field is a different size than the area it is drawn
+        in, it is resampled: each pixel gets the value nearest its center.
+
+        :param values: 2-d array of values, (nx, ny) in size -- indexed
+                       as [x, y] like the image, with y = 0 at the top.
+                       (for a field stored as [row, column], pass ``values.T``
+                       -- any memory layout works without a copy).
+                       float32 and float64 are used as they are, other types
+                       are converted to float64. NaN, and masked values of
+                       a masked array, get the ramp's nodata_index.
+
+        :param ramp: The ColorRamp to map the values to colors.
+                     For a paletted image, the ramp's colors need to have been
+                     added to the image (``img.add_colors(ramp.colorlist)``).
+                     For a truecolor image the ramp's colors are used directly.
+        :type ramp: ColorRamp
+
+        :param extent=None: The area of the image to draw the field in, defined
+                            by two corners: ((x1, y1), (x2, y2)), as for
+                            clip_rect. If None, the whole image.
+
+        Drawing stays within the clip_rect. The pixels are replaced,
+        not alpha blended.
+        """
+        cdef RampParams params
+        cdef int ex1, ey1, ex2, ey2
+        cdef int x1, y1, x2, y2
+        cdef int cx1, cy1, cx2, cy2
+        cdef int ex_width, ey_height
+        cdef Py_ssize_t nx
+        cdef const float[:, :] values32
+        cdef const double[:, :] values64
+        cdef const unsigned char[:, :] mask
+        cdef bint has_mask = False
+        cdef int[::1] lut
+        cdef Py_ssize_t[::1] cols
+
+        get_ramp_params(ramp, &params)
+
+        mask_obj = np.ma.getmask(values)
+        values = np.ma.getdata(values)
+        if values.ndim != 2:
+            raise ValueError("values must be a 2-d array")
+        if values.dtype not in (np.float32, np.float64):
+            values = values.astype(np.float64)
+        if values.shape[0] == 0 or values.shape[1] == 0:
+            raise ValueError("values can not be empty")
+        if mask_obj is not np.ma.nomask:
+            mask = np.broadcast_to(mask_obj, values.shape).view(np.uint8)
+            has_mask = True
+        else:
+            mask = np.zeros((1, 1), dtype=np.uint8)  # not used
+
+        if extent is None:
+            ex1, ey1 = 0, 0
+            ex2, ey2 = self.width - 1, self.height - 1
+        else:
+            (ex1, ey1), (ex2, ey2) = extent
+            if ex1 > ex2:
+                ex1, ex2 = ex2, ex1
+            if ey1 > ey2:
+                ey1, ey2 = ey2, ey1
+        ex_width = ex2 - ex1 + 1
+        ey_height = ey2 - ey1 + 1
+
+        gdImageGetClip(self._image, &cx1, &cy1, &cx2, &cy2)
+        x1, y1 = max(ex1, cx1), max(ey1, cy1)
+        x2, y2 = min(ex2, cx2), min(ey2, cy2)
+        if x1 > x2 or y1 > y2:
+            return
+
+        lut = self._get_ramp_lut(ramp, &params)
+
+        # the column of values for each pixel
+        nx = values.shape[0]
+        cols = ((2 * (np.arange(x1, x2 + 1, dtype=np.intp) - ex1) + 1) * nx) // (2 * ex_width)
+
+        if values.dtype == np.float32:
+            values32 = values
+            with nogil:
+                draw_field_rows(values32, mask, has_mask, self._image,
+                                x1, y1, x2, y2, ey1, ey_height,
+                                &params, &lut[0], &cols[0])
+        else:
+            values64 = values
+            with nogil:
+                draw_field_rows(values64, mask, has_mask, self._image,
+                                x1, y1, x2, y2, ey1, ey_height,
+                                &params, &lut[0], &cols[0])
 
     def copy(self, Image src_img,
              dst_corner=(0, 0),
@@ -468,49 +1790,86 @@ cdef class Image:
         :param size: size of recatngle to copy (width, height)
         :type size: (w, h) tuple of integers
         """
-        size = (self.width, self.height) if size is None else size
+        cdef int dst_x, dst_y, src_x, src_y, w, h
 
-        gdImageCopy(self._image, src_img._image,
-                    dst_corner[0], dst_corner[1],
-                    src_corner[0], src_corner[1],
-                    size[0], size[1])
-
-    # def __getbuffer__(self, Py_buffer* buffer, int flags):
-    #     # attempt to use buffer interface instaed of numpy arrays...
-    #     # didn't quite work
-    #     print "__getbuffer__ called"
+        size = (self.width, self.height) if size is None else size
 
-    #     #allocate the array:
-    #     self._buffer_array = <unsigned char*> malloc(self.width*self.height)
+        dst_x, dst_y = dst_corner[0], dst_corner[1]
+        src_x, src_y = src_corner[0], src_corner[1]
+        w, h = size[0], size[1]
 
-    #     cdef unsigned char i
-    #     for i in range(self.width*self.height):
-    #         self._buffer_array[i] = i
+        with nogil:
+            gdImageCopy(self._image, src_img._image,
+                        dst_x, dst_y,
+                        src_x, src_y,
+                        w, h)
 
-    #     cdef Py_ssize_t shape[2]
-    #     shape[0] = 5
-    #     shape[1] = 10
+    def to_palette(self, int colors_wanted=256, dither=False):
+        """
+        Create an 8-bit paletted copy of this truecolor image
 
-    #     print "shape is:", shape[0], shape[1]
-    #     #shape[0] = <Py_ssize_t> self.width
-    #     #shape[1] = <Py_ssize_t> self.height
+        The colors are quantized to a palette of at most colors_wanted
+        colors -- so you can render in truecolor, and convert once for
+        output as GIF, etc.
 
-    #     buffer.buf = <char*> self._buffer_array
-    #     buffer.obj = self
-    #     buffer.len = self.width*self.height
-    #     buffer.readonly = 0
-    #     buffer.format = "B"
-    #     buffer.ndim = 2
-    #     buffer.shape = &shape[0]
-    #     buffer.strides =  NULL # NULL for c-contiguous
-    #     buffer.suboffsets = NULL # NULL for C-contiguous
-    #     buffer.itemsize = 1
-    #     buffer.internal = NULL # NULL for the ordinary case
+        :param colors_wanted=256: maximum number of colors in the palette
+        :type colors_wanted: integer from 1 to 256
 
-    # def __releasebuffer__(self, Py_buffer* buffer):
-    #     print "releasing buffer!"
+        :param dither=False: whether to dither the quantized colors
+        :type dither: bool
 
-    #     free(self._buffer_array)
+        :returns image: a new paletted Image. The named colors of this image
+                        are mapped to the matching colors in the new
+                        palette, or the closest ones if they are not in it.
+        """
+        cdef gdImagePtr quantized
+        cdef int row, width, height
+        cdef int dither_flag = bool(dither)
+        cdef Image img
+
+        if not self.truecolor:
+            raise ValueError("only a truecolor image can be converted to a palette")
+        if not 1 <= colors_wanted <= 256:
+            raise ValueError("colors_wanted must be between 1 and 256")
+
+        width, height = self.width, self.height
+        img = Image(width, height, preset_colors=None)
+
+        with nogil:
+            quantized = gdImageCreatePaletteFromTrueColor(self._image, dither_flag,
+                                                          colors_wanted)
+        if quantized is NULL:
+            raise MemoryError("could not create the paletted gdImage")
+
+        with nogil:
+            # the palette is copied as it is -- gdImagePaletteCopy would
+            # remap the pixels as well, which are overwritten here anyway
+            img._image.colorsTotal = quantized.colorsTotal
+            memcpy(img._image.red, quantized.red, sizeof(quantized.red))
+            memcpy(img._image.green, quantized.green, sizeof(quantized.green))
+            memcpy(img._image.blue, quantized.blue, sizeof(quantized.blue))
+            memcpy(img._image.alpha, quantized.alpha, sizeof(quantized.alpha))
+            memcpy(img._image.open, quantized.open, sizeof(quantized.open))
+            for row in range(height):
+                memcpy(img._image.pixels[row], quantized.pixels[row], width)
+            gdImageDestroy(quantized)
+
+        # the names are ordered by how close their colors are to the
+        # palette colors, so that get_pixel_color() finds the best match
+        distances = {}
+        for name in self.color_names:
+            color = self.colors_rgb[name]
+            alpha = color[3] if len(color) == 4 else 0
+            index = gdImageColorClosestAlpha(img._image, color[0], color[1], color[2], alpha)
+            img.colors[name] = index
+            img.colors_rgb[name] = color
+            distances[name] = ((color[0] - img._image.red[index]) ** 2
+                               + (color[1] - img._image.green[index]) ** 2
+                               + (color[2] - img._image.blue[index]) ** 2
+                               + (alpha - img._image.alpha[index]) ** 2)
+        img.color_names.extend(sorted(self.color_names, key=distances.__getitem__))
+
+        return img
 
     property clip_rect:
         """
@@ -548,7 +1907,130 @@ cdef class Image:
                            gdImageSX(self._image) - 1,
                            gdImageSY(self._image) - 1)
 
+    property viewport:
+        """
+        The Viewport that maps world coordinates to the pixels of the image,
+        or None.
+
+        When it is set, the points passed to the drawing methods are in
+        world coordinates (see Viewport).
+        """
+        def __get__(self):
+            return self._viewport
+
+        def __set__(self, Viewport value):
+            self._viewport = value
+
+        def __del__(self):
+            self._viewport = None
+
+    cdef cnp.ndarray _get_points(self, Points *points, obj):
+        """
+        fills in the Points for a set of points passed to a drawing method:
+        pixel coordinates, or world coordinates if there is a viewport
+
+        :param obj: the points: something that can be turned into an Nx2 array
+        :returns: the array the Points point into -- keep it until the
+                  drawing is done
+        """
+        cdef cnp.ndarray arr
+
+        if self._viewport is not None:
+            return get_world_points(obj, points, &self._viewport._transform)
+
+        arr = asn2array(obj, dtype=np.intc)
+        points.pixels = <const int *> arr.data
+        return arr
+
+    cdef tuple _get_pixel(self, point):
+        """
+        the pixel (x, y) of a point passed to a drawing method: the point
+        itself, or transformed by the viewport, if there is one
+        """
+        cdef Transform *t
+
+        if self._viewport is None:
+            return (point[0], point[1])
+        t = &self._viewport._transform
+        return (world_to_pixel(point[0], t.x_scale, t.x_offset),
+                world_to_pixel(point[1], t.y_scale, t.y_offset))
+
+    cdef cnp.ndarray _spline_pixels(self, cnp.ndarray points):
+        """
+        the points of a spline in the pixels of the viewport, not rounded
+
+        The spline is built on these, so it is smooth (and as finely
+        divided) in pixels, as it is without a viewport.
+        """
+        cdef Transform *t = &self._viewport._transform
+
+        return np.ascontiguousarray(points * (t.x_scale, t.y_scale)
+                                    + (t.x_offset, t.y_offset))
+
+    cdef cnp.ndarray _spline_to_pixels(self, cnp.ndarray points):
+        """
+        the pixels the points of a spline built by _spline_pixels are in:
+        floored and clamped as world_to_pixel does
+        """
+        points = np.nan_to_num(points, nan=-PIXEL_LIMIT)
+        return np.floor(np.clip(points, -PIXEL_LIMIT, PIXEL_LIMIT)).astype(np.intc)
+
     # Saving images
+    cdef void* _encode(self, file_type, compression, int *size) except NULL:
+        """
+        encode the image into a memory buffer allocated by libgd
+
+        The caller is responsible for freeing the buffer with gdFree()
+        """
+        cdef void *data = NULL
+        cdef int compression_level = 80
+
+        if compression is not None:
+            compression_level = compression
+
+        if file_type in ("bmp", "BMP"):
+            with nogil:
+                data = gdImageBmpPtr(self._image, size, 0)
+        elif file_type in ("jpg", "jpeg"):
+            with nogil:
+                data = gdImageJpegPtr(self._image, size, compression_level)
+        elif file_type in ("gif", "GIF"):
+            with nogil:
+                data = gdImageGifPtr(self._image, size)
+        elif file_type in ("png", "PNG"):
+            with nogil:
+                data = gdImagePngPtr(self._image, size)
+        else:
+            raise ValueError('"bmp", "gif", "png", and "jpeg" are the only '
+                             'valid values for file_type')
+
+        if data is NULL:
+            raise OSError('libgd could not encode the image as: {}'
+                          .format(file_type))
+
+        return data
+
+    def to_bytes(self, file_type="bmp", compression=None):
+        """
+        encode the image in memory -- no file is written
+
+        :param file_type: type of file you want encoded.
+                          One of "bmp", "gif", "png", "jpeg"
+        :type file_type: string
+
+        :param compression=None: quality for jpeg files (default 80)
+        :type compression: integer
+
+        :returns: bytes object with the encoded image file
+        """
+        cdef int size = 0
+        cdef void *data = self._encode(file_type, compression, &size)
+
+        try:
+            return PyBytes_FromStringAndSize(<char *> data, size)
+        finally:
+            gdFree(data)
+
     def save(self, file_name, file_type="bmp", compression=None):
         """
         save the image to disk file format options are:
@@ -560,14 +2042,18 @@ cdef class Image:
         NOTE: these may not always be available, depending on how libgd
               was compiled. But bmp and gif should always be there.
 
-        :param file_name: full or relative path to file you want created
-        :type file_name: str or PathLike
+        :param file_name: full or relative path to file you want created,
+                          or a writable binary file-like object
+                          (anything with a ``write()`` method)
+        :type file_name: str or PathLike or file-like
 
         :param file_type: type of file you want written
         :type file_type: string
         """
         cdef FILE *fp
-        cdef int compression_level
+        cdef int compression_level = 80
+        cdef int size = 0
+        cdef void *data
 
         file_type_codes = {"bmp", "jpg", "jpeg", "gif", "GIF", "png", "PNG"}
 
@@ -575,20 +2061,37 @@ cdef class Image:
             raise ValueError('file_type must be one of: {}'
                              .format(file_type_codes))
 
+        if hasattr(file_name, "write"):
+            # a file-like object: encode in memory, and pass it a copy --
+            # the writer may hold on to what it is given, and the libgd
+            # buffer is freed here
+            data = self._encode(file_type, compression, &size)
+            try:
+                if size > 0:
+                    file_name.write(PyBytes_FromStringAndSize(<char *> data, size))
+            finally:
+                gdFree(data)
+            return None
+
+        if compression is not None:
+            compression_level = compression
+
         fp = open_file(file_name, "wb")
         # open the file here:
 
         # then call the right writer:
         if file_type in ["bmp", "BMP"]:
-            gdImageBmp(self._image, fp, 0)
+            with nogil:
+                gdImageBmp(self._image, fp, 0)
         elif file_type in ("jpg", "jpeg"):
-            compression_level = 80 if compression is None else compression
-
-            gdImageJpeg(self._image, fp, compression_level)
+            with nogil:
+                gdImageJpeg(self._image, fp, compression_level)
         elif file_type in ("gif", "GIF"):
-            gdImageGif(self._image, fp)
+            with nogil:
+                gdImageGif(self._image, fp)
         elif file_type in ("png", "PNG"):
-            gdImagePng(self._image, fp)
+            with nogil:
+                gdImagePng(self._image, fp)
         else:
             raise ValueError('"bmp", "gif", "png", and "jpeg" are the only '
                              'valid values for file_type')
@@ -601,13 +2104,13 @@ cdef class Image:
         """
         :returns color_names: a list of all color names and RGB values
         """
-        return self.colors_rgb
+        return dict(self.colors_rgb)
 
     def get_color_names(self):
         """
         :returns color_names: a list of all color names in use
         """
-        return self.color_names
+        return list(self.color_names)
 
     def get_color_index(self, color):
         """
@@ -615,6 +2118,8 @@ cdef class Image:
 
         If passed and index, the index is returned.
 
+        For a truecolor image, the "index" is the ARGB pixel value.
+
         Usually used internally for drawing.
         """
         cdef int c = 0
@@ -626,39 +2131,216 @@ cdef class Image:
                 color = int(color)
             except ValueError:
                 raise ValueError('you must provide an existing named color or integer color index')
-            if 0 <= color <= 255:
+            if 0 <= color <= self._max_color_index():
                 c = color
             else:
-                raise ValueError('you must provide an integer between 0 and 255')
+                raise ValueError(self._color_range_message())
         return c
 
-    def get_color_indices(self, colors):
+    cdef int _max_color_index(self):
+        return 0x7FFFFFFF if self._itemsize == 4 else 255
+
+    cdef str _color_range_message(self):
+        if self._itemsize == 4:
+            return 'you must provide an ARGB integer between 0 and 0x7FFFFFFF'
+        return 'you must provide an integer between 0 and 255'
+
+    def get_color_indices(self, colors):
+        """
+        returns a numpy array color indices: one element for each color in colors
+
+        :param colors: Sequence of color names or indexes
+
+        if colors is an numpy ndarray of dtype uint8, this will be a pass-through.
+
+        For a truecolor image, the result is an array of uint32 pixel values
+        (and uint32 arrays are passed through).
+
+        Arrays (or lists) of numbers or of names are resolved in bulk with
+        numpy, rather than one by one.
+        """
+        cdef Py_ssize_t i
+        cdef cnp.ndarray color_inds
+
+        dtype = np.uint32 if self._itemsize == 4 else np.uint8
+
+        if isinstance(colors, np.ndarray) and colors.dtype == dtype and colors.ndim == 1:
+            if self._itemsize == 4 and not np.all(colors <= self._max_color_index()):
+                raise ValueError(self._color_range_message())
+            return np.ascontiguousarray(colors)
+
+        try:
+            arr = np.asarray(colors)
+        except ValueError:  # ragged, or otherwise odd
+            arr = None
+
+        if arr is not None and arr.ndim == 1:
+            if arr.dtype.kind == 'f':
+                raise ValueError("color indices must be integers")
+            if arr.dtype.kind in 'biu':  # numbers
+                if not np.all((arr >= 0) & (arr <= self._max_color_index())):
+                    raise ValueError(self._color_range_message())
+                return arr.astype(dtype)
+
+            if arr.dtype.kind == 'U':  # strings
+                if self._color_lookup is None:
+                    self._build_color_lookup()
+                names, indices = self._color_lookup
+                if len(names) > 0:
+                    pos = np.searchsorted(names, arr)
+                    np.clip(pos, 0, len(names) - 1, out=pos)
+                    found = names[pos] == arr
+                    color_inds = indices[pos]
+                else:
+                    found = np.zeros(arr.shape, dtype=bool)
+                    color_inds = np.zeros(arr.shape, dtype=dtype)
+                # anything not found (e.g. integers in a list with names)
+                # is handled one by one
+                for i in np.flatnonzero(~found):
+                    color_inds[i] = self._color_item_index(colors[i])
+                return color_inds
+
+        color_inds = np.zeros(len(colors), dtype=dtype)
+
+        for i in range(len(colors)):
+            color_inds[i] = self._color_item_index(colors[i])
+        return color_inds
+
+    cdef int _color_item_index(self, color) except -1:
+        """
+        the color index for one item of a sequence passed to get_color_indices
+        """
+        try:
+            return self.colors[color]
+        except KeyError:
+            try:
+                if 0 <= color <= self._max_color_index():
+                    return color
+                else:
+                    raise ValueError(self._color_range_message())
+            except TypeError:  # not an int
+                raise ValueError('you must provide an existing named color')
+
+    cdef _build_color_lookup(self):
+        """
+        builds the sorted array of the color names, and their indices,
+        for looking up names in bulk with searchsorted
+
+        If the names are not all strings, the lookup is empty, and all
+        names are looked up one by one.
+        """
+        if self._shared_colors:
+            self._color_lookup = (self._palette._truecolor_lookup if self._itemsize == 4
+                                  else self._palette._lookup)
+            if self._color_lookup is not None:
+                return
+
+        names = [name for name in self.colors if isinstance(name, str)]
+        if len(names) != len(self.colors):
+            names = []
+        names_arr = np.array(names, dtype=str)
+        indices = np.array([self.colors[name] for name in names],
+                           dtype=np.uint32 if self._itemsize == 4 else np.uint8)
+        order = np.argsort(names_arr)
+        self._color_lookup = (names_arr[order], indices[order])
+
+        # the palette's images can all use it
+        if self._shared_colors:
+            if self._itemsize == 4:
+                self._palette._truecolor_lookup = self._color_lookup
+            else:
+                self._palette._lookup = self._color_lookup
+
+
+    cdef cnp.ndarray _get_ramp_lut(self, ramp, const RampParams *params):
+        """
+        returns the pixel value for each color index of a ColorRamp,
+        as a length 256 C int array
+
+        For a paletted image that is the index itself. For a truecolor
+        image the ramp's colors are used directly.
+        """
+        if not self.truecolor:
+            return np.arange(256, dtype=np.intc)
+
+        lut = np.zeros(256, dtype=np.intc)
+        for i, name in enumerate(self.color_names[:256]):
+            lut[i] = self.colors[name]
+        rgb = np.asarray(ramp.color_index, dtype=np.intc)
+        lut[params.start_index:params.start_index + params.num_colors] = (
+            (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2])[:256 - params.start_index]
+        return lut
+
+    cdef tuple _get_point_colors(self, PointColors *point_colors, RampParams *params,
+                                 color, values, ramp, Py_ssize_t n, str what):
+        """
+        fills in the PointColors for n points: from color, or if values
+        is not None, from the values mapped through the ramp
+
+        The values are used in place (float32 or float64 of any stride --
+        other types are converted to float64), and mapped to colors as the
+        points are drawn.
+
+        :returns: the arrays the PointColors point into -- keep them
+                  until the drawing is done.
         """
-        returns a numpy array color indices: one element for each color in colors
+        cdef cnp.ndarray colors, values_arr, mask_arr, lut
+
+        point_colors.colors = NULL
+        point_colors.mask = NULL
+        point_colors.params = params
+
+        if values is None:
+            if ramp is not None:
+                raise ValueError("values are needed to color with a ramp")
+            colors = self._get_color_array(color, n, what)
+            point_colors.colors = <const int *> colors.data
+            return (colors,)
+
+        if ramp is None:
+            raise ValueError("a ramp is needed to color by values")
+        get_ramp_params(ramp, params)
+
+        mask_obj = np.ma.getmask(values)
+        values_arr = np.ma.getdata(values)
+        if values_arr.ndim != 1 or values_arr.shape[0] != n:
+            raise ValueError("number of values must match number of {}".format(what))
+        if values_arr.dtype not in (np.float32, np.float64):
+            values_arr = values_arr.astype(np.float64)
+        point_colors.values = values_arr.data
+        point_colors.values_stride = values_arr.strides[0]
+        point_colors.values_float32 = values_arr.dtype == np.float32
+
+        if mask_obj is not np.ma.nomask:
+            mask_arr = np.broadcast_to(mask_obj, (n,)).view(np.uint8)
+            point_colors.mask = <const unsigned char *> mask_arr.data
+            point_colors.mask_stride = mask_arr.strides[0]
+        else:
+            mask_arr = None
 
-        :param colors: Sequence of color names or indexes
+        lut = self._get_ramp_lut(ramp, params)
+        point_colors.lut = <const int *> lut.data
+        return (values_arr, mask_arr, lut)
 
-        if colors is an numpy ndarray of dtype uint8, this will be a pass-through.
+    cdef cnp.ndarray _get_color_array(self, color, Py_ssize_t n, str what):
         """
-        # cdef cnp.uint8_t c
-        cdef cnp.uint32_t i
-        cdef cnp.ndarray[cnp.uint8_t, ndim=1, mode='c'] color_inds
-        color_inds = np.zeros(len(colors), dtype=np.uint8)
+        returns a length n C int array of color indices (or truecolor values)
 
-        for i in range(len(colors)):
-            color = colors[i]
-            try:
-                color_inds[i] = self.colors[color]
-            except KeyError:
-                try:
-                    if 0 <= color <= 255:
-                        color_inds[i] = color
-                    else:
-                        raise ValueError('you must provide an integer between 0 and 255')
-                except TypeError:  # not an int
-                    raise ValueError('you must provide an existing named color')
-        return color_inds
+        :param color: a single color name or index, or a sequence of n of them
+        :param n: number of colors needed
+        :param what: what the colors are for -- used in the error message
+        """
+        cdef cnp.ndarray[int, ndim=1, mode='c'] colors
 
+        if isinstance(color, (str, int, np.integer)):  # it is a single color
+            colors = np.empty((n,), dtype=np.intc)
+            colors[:] = self.get_color_index(color)
+        else:  # a sequence of colors:
+            if len(color) != n:
+                raise ValueError("number of colors must match number of {}, "
+                                 "or be only one color".format(what))
+            colors = self.get_color_indices(color).astype(np.intc)
+        return colors
 
     def get_pixel_color(self, point):
         """
@@ -671,11 +2353,19 @@ cdef class Image:
 
         c = gdImageGetPixel(self._image, point[0], point[1])
 
-        return self.color_names[c]
+        # usually the palette index is the position in the list of names
+        if c < len(self.color_names) and self.colors[self.color_names[c]] == c:
+            return self.color_names[c]
+
+        for name in self.color_names:
+            if self.colors[name] == c:
+                return name
+        raise ValueError('the pixel value: {} is not a named color'.format(c))
 
     def get_pixel_value(self, point):
         """
-        returns the value (index into palette) of the pixel at a point
+        returns the value (index into palette, or ARGB value for a
+        truecolor image) of the pixel at a point
 
         :param point: the (x,y) coord you want the value of
 
@@ -684,11 +2374,17 @@ cdef class Image:
 
     def set_pixel_value(self, point, value):
         """
-        sets the value of a pixel (index into palette).
+        sets the value of a pixel (index into palette, or ARGB value for a
+        truecolor image).
 
         :param point: the (x, y) coord of the pixel to set.
         """
-        gdImageSetPixel(self._image, point[0], point[1], value)
+        cdef int x = point[0]
+        cdef int y = point[1]
+        cdef int c = value
+
+        with nogil:
+            gdImageSetPixel(self._image, x, y, c)
 
     # The drawing functions:
     def draw_pixel(self, point, color='black'):
@@ -698,9 +2394,13 @@ cdef class Image:
         :param point: (x, y coordinate of the pixel of interest)
         :type point: 2-tuple of integers (or other sequence)
         """
-        gdImageSetPixel(self._image,
-                        point[0], point[1],
-                        self.get_color_index(color))
+        cdef int x, y
+        cdef int c = self.get_color_index(color)
+
+        x, y = self._get_pixel(point)
+
+        with nogil:
+            gdImageSetPixel(self._image, x, y, c)
 
 
     def draw_dot(self, point, color='black', int diameter=1):
@@ -719,16 +2419,19 @@ cdef class Image:
         if diameter < 1:
             raise NotImplementedError("only diameters >= 1 are supported.")
 
-        cdef cnp.uint8_t c
+        cdef int c
+        cdef int x, y
 
-        cdef int x = point[0]
-        cdef int y = point[1]
+        x, y = self._get_pixel(point)
 
         c = self.get_color_index(color)
 
-        draw_single_dot(self._image, x, y, diameter, c)
+        with nogil:
+            draw_single_dot(self._image, x, y, diameter, c)
 
-    def draw_dots(self, points, color='black', int diameter=1):
+    @cython.boundscheck(False)
+    def draw_dots(self, points, color='black', int diameter=1,
+                  values=None, ramp=None):
         """
         Draws a set of individual dots all in the same color
 
@@ -740,104 +2443,146 @@ cdef class Image:
         :type diameter: integer
 
         :param color='black': color of points
-        :type  color: color name or index
+        :type  color: color name or index, or a sequence of them,
+                      one for each point
+
+        :param values=None: a value for each point (concentration, depth, ...),
+                            to color the points with the ramp, instead of color.
+                            NaN, and masked values of a masked array, get the
+                            ramp's nodata_index.
+        :type values: length N array of numbers
+
+        :param ramp=None: The ColorRamp to color the values with -- see
+                          draw_field() for the colors it needs.
+        :type ramp: ColorRamp
         """
-        cdef cnp.uint8_t c
-        cdef cnp.uint32_t i, n
-        cdef cnp.ndarray[int, ndim=2, mode='c'] points_arr
-        cdef cnp.ndarray[cnp.uint8_t, ndim=1, mode='c'] colors
+        cdef Py_ssize_t i, n, start, end
+        cdef Points pts
+        cdef PointColors colors
+        cdef RampParams params
+        cdef int color_buffer[POINT_BLOCK]
+        cdef int xy_buffer[2 * POINT_BLOCK]
+        cdef const int *block_colors
+        cdef const int *xy
 
         if diameter < 1:
             raise NotImplementedError("only diameters >= 1 are supported.")
 
-        points_arr = asn2array(points, dtype=np.intc)
+        points_arr = self._get_points(&pts, points)
         n = points_arr.shape[0]
 
-        if isinstance(color, (str, int)):  # it is a single color
-            colors = np.zeros((points_arr.shape[0],), dtype=np.uint8)
-            colors[:] = self.get_color_index(color)
-        else:  # a sequence of colors:
-            if len(color) != len(points):
-                raise ValueError("number of colors must match number of points, "
-                                 "or be only one color")
-            try:
-                colors = np.asarray(color, dtype=np.uint8)
-            except ValueError:  # it's not integers
-                colors = self.get_color_indices(color)
+        color_arrays = self._get_point_colors(&colors, &params, color, values, ramp,
+                                              n, "points")
+
+        if n == 0:
+            return
+
+        if diameter <= MAX_STAMP_DIAMETER:
+            with nogil:
+                stamp_pixels(self._image, &pts, &colors, n,
+                             &DOT_STAMP_DX[DOT_STAMP_START[diameter]],
+                             &DOT_STAMP_DY[DOT_STAMP_START[diameter]],
+                             DOT_STAMP_LEN[diameter])
+            return
 
-        for i in range(n):
-            c = colors[i]
-            draw_single_dot(self._image, points_arr[i, 0], points_arr[i, 1], diameter, c)
+        with nogil:
+            start = 0
+            while start < n:
+                end = min(start + POINT_BLOCK, n)
+                block_colors = point_colors_block(&colors, start, end, color_buffer)
+                xy = points_block(&pts, start, end, xy_buffer)
+                for i in range(end - start):
+                    draw_single_dot(self._image, xy[2 * i], xy[2 * i + 1], diameter, block_colors[i])
+                start = end
 
 
+    @cython.boundscheck(False)
     def draw_xes(self, points, color='black',
-                 int diameter=2, int line_width=1):
+                 int diameter=2, int line_width=1,
+                 values=None, ramp=None):
         """
-        Draws a set of individual Xs all in the same color
+        Draws a set of individual Xs
 
         :param points: the (x,y) coordinates of the center of the dots
         :type points: a Nx2 numpy array of integers, or something that can be
                       turned in to one
 
         :param color='black': color of X
-        :type  color: color name or index
+        :type  color: color name or index, or a sequence of them,
+                      one for each point
 
         :param diameter=2: diameter of the X in pixels.
         :type diameter: integer
 
         :param line_width=1: width of line in pixels.
         :type diameter: integer
+
+        :param values=None: a value for each point, to color the Xs with
+                            the ramp, instead of color -- see draw_dots()
+
+        :param ramp=None: The ColorRamp to color the values with.
+        :type ramp: ColorRamp
         """
         cdef int r
-        cdef cnp.uint8_t c
-        cdef cnp.uint32_t i, n
-        cdef cnp.ndarray[int, ndim=2, mode='c'] points_arr
-        cdef cnp.ndarray[cnp.uint8_t, ndim=1, mode='c'] colors
+        cdef Py_ssize_t i, n, start, end
+        cdef Points pts
+        cdef PointColors colors
+        cdef RampParams params
+        cdef int color_buffer[POINT_BLOCK]
+        cdef int xy_buffer[2 * POINT_BLOCK]
+        cdef const int *block_colors
+        cdef const int *xy
+        cdef cnp.ndarray[int, ndim=1, mode='c'] stamp_dx
+        cdef cnp.ndarray[int, ndim=1, mode='c'] stamp_dy
+
+        if diameter < 2:
+            raise NotImplementedError("only diameters >= 2 are supported.")
 
-        points_arr = asn2array(points, dtype=np.intc)
+        points_arr = self._get_points(&pts, points)
         n = points_arr.shape[0]
 
-        if isinstance(color, (str, int)) or len(color) == 1:
-            colors = np.zeros((points_arr.shape[0],), dtype=np.uint8)
-            colors[:] = self.get_color_index(color)
-        else:
-            colors = self.get_color_indices(color)
+        if not isinstance(color, (str, int, np.integer)) and len(color) == 1:
+            color = color[0]
+        color_arrays = self._get_point_colors(&colors, &params, color, values, ramp,
+                                              n, "points")
 
-        if diameter == 2:  # draw five pixels
-            for i in range(n):
-                gdImageSetPixel(self._image,
-                                points_arr[i, 0], points_arr[i, 1],
-                                colors[i])
-                gdImageSetPixel(self._image,
-                                points_arr[i, 0] + 1, points_arr[i, 1] + 1,
-                                colors[i])
-                gdImageSetPixel(self._image,
-                                points_arr[i, 0] - 1, points_arr[i, 1] - 1,
-                                colors[i])
-                gdImageSetPixel(self._image,
-                                points_arr[i, 0] + 1, points_arr[i, 1] - 1,
-                                colors[i])
-                gdImageSetPixel(self._image,
-                                points_arr[i, 0] - 1, points_arr[i, 1] + 1,
-                                colors[i])
-        elif diameter > 2:
-            gdImageSetThickness(self._image, line_width)
+        if n == 0:
+            return
 
-            r = diameter // 2
+        r = diameter // 2
 
-            for i in range(n):
-                gdImageLine(self._image,
-                            points_arr[i, 0] - r, points_arr[i, 1] - r,
-                            points_arr[i, 0] + r, points_arr[i, 1] + r,
-                            colors[i])
-                gdImageLine(self._image,
-                            points_arr[i, 0] - r, points_arr[i, 1] + r,
-                            points_arr[i, 0] + r, points_arr[i, 1] - r,
-                            colors[i])
+        if diameter == 2 or line_width == 1:
+            # one pixel wide lines at 45 degrees -- the X is just the
+            # diagonal pixels, so it can be drawn as a stamp
+            # (diameter 2 is always the five pixel X)
+            k = np.arange(-r, r + 1, dtype=np.intc)
+            stamp_dx = np.concatenate((k, k[k != 0]))
+            stamp_dy = np.concatenate((k, -k[k != 0]))
 
-            gdImageSetThickness(self._image, 1)
+            with nogil:
+                stamp_pixels(self._image, &pts, &colors, n,
+                             &stamp_dx[0], &stamp_dy[0], stamp_dx.shape[0])
         else:
-            raise NotImplementedError("only diameters >= 2 are supported.")
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
+
+                start = 0
+                while start < n:
+                    end = min(start + POINT_BLOCK, n)
+                    block_colors = point_colors_block(&colors, start, end, color_buffer)
+                    xy = points_block(&pts, start, end, xy_buffer)
+                    for i in range(end - start):
+                        gdImageLine(self._image,
+                                    xy[2 * i] - r, xy[2 * i + 1] - r,
+                                    xy[2 * i] + r, xy[2 * i + 1] + r,
+                                    block_colors[i])
+                        gdImageLine(self._image,
+                                    xy[2 * i] - r, xy[2 * i + 1] + r,
+                                    xy[2 * i] + r, xy[2 * i + 1] - r,
+                                    block_colors[i])
+                    start = end
+
+                gdImageSetThickness(self._image, 1)
 
     def draw_line(self, pt1, pt2, color, int line_width=1):
         """
@@ -854,13 +2599,90 @@ cdef class Image:
         :param line_width=1: width of line
         :type line_width: integer
         """
-        gdImageSetThickness(self._image, line_width)
+        cdef int x1, y1, x2, y2
+        cdef int c = self.get_color_index(color)
+
+        x1, y1 = self._get_pixel(pt1)
+        x2, y2 = self._get_pixel(pt2)
+
+        with nogil:
+            gdImageSetThickness(self._image, line_width)
+
+            gdImageLine(self._image, x1, y1, x2, y2, c)
+
+            gdImageSetThickness(self._image, 1)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def draw_lines(self, starts, ends=None, color='black', line_width=1):
+        """
+        draw a set of line segments in one call
+
+        The result is the same as calling draw_line() on each one in turn.
+
+        :param starts: (x,y) coordinates of the start points -- or, if ends
+                       is None, an Nx4 array of segments: (x1, y1, x2, y2)
+        :type starts: Nx2 (or Nx4) array of integers (or something that can
+                      be turned into one)
+
+        :param ends=None: (x,y) coordinates of the end points
+        :type ends: Nx2 array of integers (or something that can be turned
+                    into one)
+
+        :param color='black': color to draw the lines
+        :type color: color name or index, or a sequence of N of them
+
+        :param line_width=1: width of the lines
+        :type line_width: integer, or a sequence of N of them
+        """
+        cdef Py_ssize_t i, n, start, end
+        cdef int thickness = 1
+        cdef Points starts_pts, ends_pts
+        cdef int starts_buffer[2 * POINT_BLOCK]
+        cdef int ends_buffer[2 * POINT_BLOCK]
+        cdef const int *xy1
+        cdef const int *xy2
+        cdef int[::1] widths
+        cdef int[::1] colors
+
+        if ends is None:
+            segments = np.asarray(starts)
+            if segments.ndim != 2 or segments.shape[1] != 4:
+                raise ValueError("segments must be convertible to a Nx4 array")
+            starts = segments[:, :2]
+            ends = segments[:, 2:]
+        starts_arr = self._get_points(&starts_pts, starts)
+        ends_arr = self._get_points(&ends_pts, ends)
+        if starts_arr.shape[0] != ends_arr.shape[0]:
+            raise ValueError("there must be the same number of start and end points")
+
+        n = starts_arr.shape[0]
+        if n == 0:
+            return
 
-        gdImageLine(self._image,
-                    pt1[0], pt1[1], pt2[0], pt2[1],
-                    self.get_color_index(color))
+        colors = self._get_color_array(color, n, "lines")
+        widths = get_width_array(line_width, n, "lines")
+
+        with nogil:
+            # only change the thickness when it needs to be
+            start = 0
+            while start < n:
+                end = min(start + POINT_BLOCK, n)
+                xy1 = points_block(&starts_pts, start, end, starts_buffer)
+                xy2 = points_block(&ends_pts, start, end, ends_buffer)
+                for i in range(start, end):
+                    if widths[i] != thickness:
+                        thickness = widths[i]
+                        gdImageSetThickness(self._image, thickness)
+
+                    gdImageLine(self._image,
+                                xy1[2 * (i - start)], xy1[2 * (i - start) + 1],
+                                xy2[2 * (i - start)], xy2[2 * (i - start) + 1],
+                                colors[i])
+                start = end
 
-        gdImageSetThickness(self._image, 1)
+            if thickness != 1:
+                gdImageSetThickness(self._image, 1)
 
     def draw_polygon(self, points, line_color=None, fill_color=None,
                      int line_width=1):
@@ -881,10 +2703,11 @@ cdef class Image:
         :type line_width: integer
 
         """
-        cdef int n
-        cdef cnp.ndarray[int, ndim=2, mode='c'] points_arr
+        cdef int n, c
+        cdef gdPointPtr pts
+        cdef Points vertices
 
-        points_arr = asn2array(points, dtype=np.intc)
+        points_arr = self._get_points(&vertices, points)
 
         n = points_arr.shape[0]
 
@@ -892,21 +2715,100 @@ cdef class Image:
             raise ValueError('There must be at least three points specified '
                              'for a polygon')
 
+        scratch = points_scratch(&vertices, n)
+        pts = <gdPointPtr> points_block(&vertices, 0, n, scratch_ptr(scratch))
+
         if fill_color is not None:
-            gdImageFilledPolygon(self._image,
-                                 <gdPointPtr> &points_arr[0, 0],
-                                 n,
-                                 self.get_color_index(fill_color))
+            c = self.get_color_index(fill_color)
+            with nogil:
+                gdImageFilledPolygon(self._image, pts, n, c)
 
         if line_color is not None:
-            gdImageSetThickness(self._image, line_width)
+            c = self.get_color_index(line_color)
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
 
-            gdImagePolygon(self._image,
-                           <gdPointPtr> &points_arr[0, 0],
-                           n,
-                           self.get_color_index(line_color))
+                gdImagePolygon(self._image, pts, n, c)
 
-            gdImageSetThickness(self._image, 1)
+                gdImageSetThickness(self._image, 1)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def draw_polygons(self, points, offsets, line_color=None, fill_color=None,
+                      int line_width=1):
+        """
+        Draw a batch of polygons in one call
+
+        The vertices of all the polygons are in one array: polygon ``i`` is
+        ``points[offsets[i]:offsets[i + 1]]``. So for N polygons, offsets
+        has N + 1 elements.
+
+        The result is the same as calling draw_polygon() on each one in turn.
+
+        :param points: vertices of all the polygons
+        :type points: Mx2 array of integers (or something that can be turned
+                      into one)
+
+        :param offsets: index of the start of each polygon in points, plus
+                        the end of the last one.
+        :type offsets: sequence of N + 1 integers
+
+        :param line_color=None: the color of the outlines
+        :type line_color=None:  color name or index, or a sequence of
+                                N of them
+
+        :param fill_color=None: the color of the filled polygons
+        :type  fill_color=None: color name or index, or a sequence of
+                                N of them
+
+        :param line_width=1: width of line
+        :type line_width: integer
+        """
+        cdef Py_ssize_t i, n
+        cdef int do_fill = fill_color is not None
+        cdef int do_line = line_color is not None
+        cdef gdPointPtr pts
+        cdef Points vertices
+        cdef int *buffer
+        cdef cnp.intp_t[::1] offsets_arr
+        cdef int[::1] fill_colors
+        cdef int[::1] line_colors
+
+        points_arr = self._get_points(&vertices, points)
+        offsets_arr = check_offsets(offsets, points_arr.shape[0], 3, "polygon")
+        n = offsets_arr.shape[0] - 1
+
+        if n == 0 or not (do_fill or do_line):
+            return
+
+        # (room for the biggest polygon)
+        scratch = None
+        if vertices.pixels is NULL:
+            scratch = points_scratch(&vertices, np.diff(offsets_arr).max())
+        buffer = scratch_ptr(scratch)
+
+        if do_fill:
+            fill_colors = self._get_color_array(fill_color, n, "polygons")
+        if do_line:
+            line_colors = self._get_color_array(line_color, n, "polygons")
+
+        with nogil:
+            for i in range(n):
+                pts = <gdPointPtr> points_block(&vertices, offsets_arr[i], offsets_arr[i + 1], buffer)
+                if do_fill:
+                    gdImageFilledPolygon(self._image,
+                                         pts,
+                                         offsets_arr[i + 1] - offsets_arr[i],
+                                         fill_colors[i])
+                if do_line:
+                    gdImageSetThickness(self._image, line_width)
+
+                    gdImagePolygon(self._image,
+                                   pts,
+                                   offsets_arr[i + 1] - offsets_arr[i],
+                                   line_colors[i])
+
+                    gdImageSetThickness(self._image, 1)
 
     def draw_spline_polygon(self, points,
                             line_color=None, fill_color=None,
@@ -943,16 +2845,33 @@ cdef class Image:
             raise ValueError('There must be at least three points specified '
                              'for a polygon')
 
+        cdef Viewport viewport = self._viewport
+        if viewport is not None:
+            points_arr = self._spline_pixels(points_arr)
+
         cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] ctrl_points
         cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] poly_points
 
+        from py_gd.spline import find_control_points, polygon_from_ctrl_points
+
         ctrl_points = find_control_points(points_arr, smoothness=smoothness)
         poly_points = polygon_from_ctrl_points(points_arr, ctrl_points)
 
-        self.draw_polygon(poly_points,
-                          line_color=line_color,
-                          fill_color=fill_color,
-                          line_width=line_width)
+        if viewport is None:
+            self.draw_polygon(poly_points,
+                              line_color=line_color,
+                              fill_color=fill_color,
+                              line_width=line_width)
+            return
+        # it is in pixels already
+        self._viewport = None
+        try:
+            self.draw_polygon(self._spline_to_pixels(poly_points),
+                              line_color=line_color,
+                              fill_color=fill_color,
+                              line_width=line_width)
+        finally:
+            self._viewport = viewport
 
 
     def draw_polyline(self, points, line_color, int line_width=1):
@@ -972,10 +2891,11 @@ cdef class Image:
         :param line_width: width of the line to be drawn, in pixels
         :type line_width: integer
         """
-        cdef int n
-        cdef cnp.ndarray[int, ndim=2, mode='c'] points_arr
+        cdef int n, c
+        cdef gdPointPtr pts
+        cdef Points vertices
 
-        points_arr = asn2array(points, dtype=np.intc)
+        points_arr = self._get_points(&vertices, points)
         n = points_arr.shape[0]
 
         if n < 2:
@@ -983,15 +2903,84 @@ cdef class Image:
                              'for a polyline')
 
         if line_color is not None:
-            gdImageSetThickness(self._image, line_width)
+            scratch = points_scratch(&vertices, n)
+            pts = <gdPointPtr> points_block(&vertices, 0, n, scratch_ptr(scratch))
+            c = self.get_color_index(line_color)
 
-            gdImageOpenPolygon(self._image,
-                               <gdPointPtr> &points_arr[0,0],
-                               n,
-                               self.get_color_index(line_color))
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
 
-            gdImageSetThickness(self._image, 1)
+                gdImageOpenPolygon(self._image, pts, n, c)
+
+                gdImageSetThickness(self._image, 1)
+
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def draw_polylines(self, points, offsets, line_color='black', line_width=1):
+        """
+        Draw a batch of polylines in one call
+
+        The vertices of all the polylines are in one array: polyline ``i``
+        is ``points[offsets[i]:offsets[i + 1]]``. So for N polylines,
+        offsets has N + 1 elements.
+
+        The result is the same as calling draw_polyline() on each one in turn.
+
+        :param points: vertices of all the polylines
+        :type points: Mx2 array of integers (or something that can be turned
+                      into one)
+
+        :param offsets: index of the start of each polyline in points, plus
+                        the end of the last one.
+        :type offsets: sequence of N + 1 integers
+
+        :param line_color='black': the color of the lines
+        :type line_color:  color name or index, or a sequence of N of them
+
+        :param line_width=1: width of the lines to be drawn, in pixels
+        :type line_width: integer, or a sequence of N of them
+        """
+        cdef Py_ssize_t i, n
+        cdef int thickness = 1
+        cdef gdPointPtr pts
+        cdef Points vertices
+        cdef int *buffer
+        cdef cnp.intp_t[::1] offsets_arr
+        cdef int[::1] colors
+        cdef int[::1] widths
+
+        points_arr = self._get_points(&vertices, points)
+        offsets_arr = check_offsets(offsets, points_arr.shape[0], 2, "polyline")
+        n = offsets_arr.shape[0] - 1
+
+        if n == 0:
+            return
 
+        # (room for the biggest polyline)
+        scratch = None
+        if vertices.pixels is NULL:
+            scratch = points_scratch(&vertices, np.diff(offsets_arr).max())
+        buffer = scratch_ptr(scratch)
+
+        colors = self._get_color_array(line_color, n, "polylines")
+        widths = get_width_array(line_width, n, "polylines")
+
+        with nogil:
+            # only change the thickness when it needs to be
+            for i in range(n):
+                if widths[i] != thickness:
+                    thickness = widths[i]
+                    gdImageSetThickness(self._image, thickness)
+
+                pts = <gdPointPtr> points_block(&vertices, offsets_arr[i], offsets_arr[i + 1], buffer)
+                gdImageOpenPolygon(self._image,
+                                   pts,
+                                   offsets_arr[i + 1] - offsets_arr[i],
+                                   colors[i])
+
+            if thickness != 1:
+                gdImageSetThickness(self._image, 1)
 
     def draw_spline_polyline(self, points,
                              line_color=None,
@@ -1025,9 +3014,15 @@ cdef class Image:
             raise ValueError('There must be at least three points specified '
                              'for a spline polyline')
 
+        cdef Viewport viewport = self._viewport
+        if viewport is not None:
+            points_arr = self._spline_pixels(points_arr)
+
         cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] ctrl_points
         cdef cnp.ndarray[cnp.float64_t, ndim=2, mode='c'] poly_points
 
+        from py_gd.spline import find_control_points, polyline_from_ctrl_points
+
         ctrl_points = find_control_points(points_arr, smoothness=smoothness)
         # remove the extras
         ctrl_points = ctrl_points[:-2, :]
@@ -1036,9 +3031,19 @@ cdef class Image:
         ctrl_points[-1, :] = ctrl_points[-2, :]
         poly_points = polyline_from_ctrl_points(points_arr, ctrl_points)
 
-        self.draw_polyline(poly_points,
-                           line_color=line_color,
-                           line_width=line_width)
+        if viewport is None:
+            self.draw_polyline(poly_points,
+                               line_color=line_color,
+                               line_width=line_width)
+            return
+        # it is in pixels already
+        self._viewport = None
+        try:
+            self.draw_polyline(self._spline_to_pixels(poly_points),
+                               line_color=line_color,
+                               line_width=line_width)
+        finally:
+            self._viewport = viewport
 
 
     def draw_rectangle(self, pt1, pt2, line_color=None, fill_color=None,
@@ -1058,21 +3063,25 @@ cdef class Image:
         :param line_width=1: width of line
         :type line_width: integer
         """
+        cdef int x1, y1, x2, y2
+        cdef int c
+
+        x1, y1 = self._get_pixel(pt1)
+        x2, y2 = self._get_pixel(pt2)
+
         if fill_color is not None:
-            gdImageFilledRectangle(self._image,
-                                   pt1[0], pt1[1],
-                                   pt2[0], pt2[1],
-                                   self.get_color_index(fill_color))
+            c = self.get_color_index(fill_color)
+            with nogil:
+                gdImageFilledRectangle(self._image, x1, y1, x2, y2, c)
 
         if line_color is not None:
-            gdImageSetThickness(self._image, line_width)
+            c = self.get_color_index(line_color)
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
 
-            gdImageRectangle(self._image,
-                             pt1[0], pt1[1],
-                             pt2[0], pt2[1],
-                             self.get_color_index(line_color))
+                gdImageRectangle(self._image, x1, y1, x2, y2, c)
 
-            gdImageSetThickness(self._image, 1)
+                gdImageSetThickness(self._image, 1)
 
     def draw_arc(self, center, width, height,
                  start=0, end=0,
@@ -1127,6 +3136,15 @@ cdef class Image:
         End must be greater than start.
         Values greater than 360 are interpreted modulo 360.
         """
+        cdef int flag, c
+        cdef int cx, cy
+        cdef int w = width
+        cdef int h = height
+        cdef int s = start
+        cdef int e = end
+
+        cx, cy = self._get_pixel(center)
+
         # set up the style flag:
         if style == 'chord':
             flag = gdChord
@@ -1137,12 +3155,9 @@ cdef class Image:
 
         # filled arc:
         if fill_color is not None:
-            gdImageFilledArc(self._image,
-                             center[0], center[1],
-                             width, height,
-                             start, end,
-                             self.get_color_index(fill_color),
-                             flag)
+            c = self.get_color_index(fill_color)
+            with nogil:
+                gdImageFilledArc(self._image, cx, cy, w, h, s, e, c, flag)
 
         if line_color is not None:
             flag |= gdNoFill
@@ -1150,27 +3165,19 @@ cdef class Image:
             if draw_wedge:
                 flag |= gdEdged
 
-            gdImageSetThickness(self._image, line_width)
+            c = self.get_color_index(line_color)
 
-            # gdImageFilledArc(self._image,
-            #    void gdImageArc(gdImagePtr im, int cx, int cy, int w, int h, int s, int e, int color)
-            # using gdFilledArc, because the gdEdged flag works
-            # but using gdImageArc only works for the outer circle
-            gdImageFilledArc(self._image,
-                             center[0], center[1],
-                             width, height,
-                             start, end,
-                             self.get_color_index(line_color),
-                             flag
-                             )
-            # gdImageArc(self._image,
-            #                  center[0], center[1],
-            #                  width, height,
-            #                  start, end,
-            #                  self.get_color_index(line_color),
-            #                  )
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
 
-            gdImageSetThickness(self._image, 1)
+                # gdImageFilledArc(self._image,
+                #    void gdImageArc(gdImagePtr im, int cx, int cy, int w, int h, int s, int e, int color)
+                # using gdFilledArc, because the gdEdged flag works
+                # but using gdImageArc only works for the outer circle
+                gdImageFilledArc(self._image, cx, cy, w, h, s, e, c, flag)
+                # gdImageArc(self._image, cx, cy, w, h, s, e, c)
+
+                gdImageSetThickness(self._image, 1)
 
     def draw_ellipse(self,
                      center,
@@ -1207,27 +3214,31 @@ cdef class Image:
 
         A circle can be drawn by setting the width and height the same
         """
+        cdef int c
+        cdef int cx, cy
+        cdef int w = width
+        cdef int h = height
+
+        cx, cy = self._get_pixel(center)
+
         # filled ellipse
         if fill_color is not None:
-            gdImageFilledEllipse(self._image,
-                                 center[0], center[1],
-                                 width, height,
-                                 self.get_color_index(fill_color),
-                                 )
+            c = self.get_color_index(fill_color)
+            with nogil:
+                gdImageFilledEllipse(self._image, cx, cy, w, h, c)
 
         # FIXME: line thickness appears to be broken.
         if line_color is not None:
             if line_width != 1:
                 print("WARNING: setting line width for Ellipse may be broken")
 
-            gdImageSetThickness(self._image, line_width)
+            c = self.get_color_index(line_color)
+            with nogil:
+                gdImageSetThickness(self._image, line_width)
 
-            gdImageEllipse(self._image,
-                           center[0], center[1],
-                           width, height,
-                           self.get_color_index(line_color),
-                           )
-            gdImageSetThickness(self._image, 1)
+                gdImageEllipse(self._image, cx, cy, w, h, c)
+
+                gdImageSetThickness(self._image, 1)
 
 
     def draw_circle(self,
@@ -1345,20 +3356,33 @@ cdef class Image:
             raise ValueError('invalid text alignment indicator. '
                              'Valid ones are: {}'.format(offsets.keys()))
 
+        # (only the point is transformed by a viewport -- the text is
+        #  laid out in pixels)
+        px, py = self._get_pixel(point)
+        px = px - offsets[align][0]
+        py = py - offsets[align][1]
+
+        cdef int bx1, by1, bx2, by2, bc
         if background != 'none':
-            pt1 = (point[0] - offsets[align][0], point[1] - offsets[align][1])
-            pt2 = (pt1[0] + text_width, pt1[1] + text_height)
+            bx1, by1 = px, py
+            bx2, by2 = px + text_width, py + text_height
+            bc = self.get_color_index(background)
 
-            self.draw_rectangle(pt1, pt2, fill_color=background)
+            with nogil:
+                gdImageFilledRectangle(self._image, bx1, by1, bx2, by2, bc)
 
-        gdImageString(self._image, gdfont,
-                      point[0] - offsets[align][0],
-                      point[1] - offsets[align][1],
-                      text_bytes,
-                      self.get_color_index(color))
+        cdef int x = px
+        cdef int y = py
+        cdef int c = self.get_color_index(color)
+        cdef unsigned char *s = text_bytes
 
+        with nogil:
+            gdImageString(self._image, gdfont, x, y, s, c)
 
-def from_array(char[:, :] arr not None, *args, **kwargs):
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def from_array(object arr not None, *args, **kwargs):
     """
     Create an Image from a numpy array, or other object that exposed
     the PEP 3118 buffer interface.
@@ -1367,17 +3391,323 @@ def from_array(char[:, :] arr not None, *args, **kwargs):
 
     :param arr: The input array, shape (width, height)
     :type arr: An array, or other PEP 3118 buffer compliant object.
-               Should be 2-d, and of type np.unit8 ('B')
+               Should be 2-d, and of type np.unit8 ('B'), or np.uint32 ('I')
+               for a truecolor image.
 
     Other parameters are passed on to the Image() constructor.
 
     """
-    img = Image(arr.shape[0], arr.shape[1], *args, **kwargs)
+    cdef const unsigned char[:, :] arr8
+    cdef const unsigned int[:, :] arr32
+
+    if np.asarray(arr).dtype in (np.uint32, np.int32):
+        kwargs.setdefault('truecolor', True)
+
+    if kwargs.get('truecolor', False):
+        arr = np.asarray(arr)
+        if arr.dtype == np.int32:
+            arr = arr.view(np.uint32)
+        arr32 = arr
+        img = Image(arr32.shape[0], arr32.shape[1], *args, **kwargs)
+    else:
+        if isinstance(arr, np.ndarray) and arr.dtype == np.int8:
+            arr = arr.view(np.uint8)
+        arr8 = arr
+        img = Image(arr8.shape[0], arr8.shape[1], *args, **kwargs)
     img.set_data(arr)
 
     return img
 
 
+cdef class ImagePool:
+    """
+    A pool of Images to reuse, rather than creating a new one for every frame
+
+    Images are taken from the pool with ``get()``, and handed back with
+    ``release()`` when they are no longer needed. A reused Image is the same
+    as a new one: cleared to the background, with only the preset colors,
+    and no clipping.
+
+    Only up to max_images are kept -- when there are more, the least
+    recently released one is dropped.
+    """
+    cdef int _max_images
+    # the released images, by (width, height, preset_colors, truecolor),
+    # and all of them by id, in the order they were released
+    cdef dict _free
+    cdef object _lru
+    cdef readonly Py_ssize_t hits
+    cdef readonly Py_ssize_t misses
+    cdef readonly Py_ssize_t evictions
+
+    def __init__(self, int max_images=16):
+        """
+        :param max_images=16: The maximum number of images kept in the pool
+        :type max_images: integer
+        """
+        if max_images < 0:
+            raise ValueError("max_images can not be negative")
+
+        self._max_images = max_images
+        self._free = {}
+        self._lru = _OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def __repr__(self):
+        return ('ImagePool(max_images={}): {} images, {} hits, {} misses, {} evictions'
+                .format(self._max_images, len(self._lru), self.hits, self.misses,
+                        self.evictions))
+
+    property max_images:
+        def __get__(self):
+            """
+            The maximum number of images kept in the pool
+            """
+            return self._max_images
+
+    def get(self, int width, int height, preset_colors='web', truecolor=False):
+        """
+        Get an Image from the pool, or a new one if there is none of that
+        size and preset colors.
+
+        The parameters are the same as for Image()
+
+        :returns image: a cleared Image
+        """
+        cdef Image img
+        key = (width, height, preset_colors, bool(truecolor))
+
+        images = self._free.get(key)
+        if not images:
+            self.misses += 1
+            return Image(width, height, preset_colors, truecolor)
+
+        img = images.pop()
+        if not images:
+            del self._free[key]
+        del self._lru[id(img)]
+        self.hits += 1
+
+        img._recycle()
+
+        return img
+
+    def release(self, Image image not None):
+        """
+        Hand an image back to the pool to be reused.
+
+        The image should not be used after it is released.
+
+        :param image: An Image (usually one from get())
+        """
+        if id(image) in self._lru:
+            raise ValueError("image has already been released to the pool")
+        if self._max_images == 0:
+            return
+
+        key = (image.width, image.height, image._preset_colors, image.truecolor)
+        self._free.setdefault(key, []).append(image)
+        self._lru[id(image)] = key
+
+        while len(self._lru) > self._max_images:
+            image_id, key = self._lru.popitem(last=False)
+            images = self._free[key]
+            for i, img in enumerate(images):
+                if id(img) == image_id:
+                    del images[i]
+                    break
+            if not images:
+                del self._free[key]
+            self.evictions += 1
+
+    def clear(self):
+        """
+        drop all the images in the pool (the statistics are kept)
+        """
+        self._free.clear()
+        self._lru.clear()
+
+
+cdef bint same_palette(gdImagePtr im1, gdImagePtr im2) noexcept nogil:
+    """
+    True if two palette images have exactly the same colors
+    (so the same index means the same color in both)
+    """
+    cdef int i
+
+    if im1.colorsTotal != im2.colorsTotal or im1.transparent != im2.transparent:
+        return False
+    for i in range(im1.colorsTotal):
+        if (im1.red[i] != im2.red[i] or im1.green[i] != im2.green[i]
+                or im1.blue[i] != im2.blue[i] or im1.alpha[i] != im2.alpha[i]):
+            return False
+    return True
+
+
+cdef bint find_changed_rect(gdImagePtr im1, gdImagePtr im2,
+                            int *x1, int *y1, int *x2, int *y2) noexcept nogil:
+    """
+    finds the bounding box of the pixels that differ between two palette
+    images of the same size
+
+    Whole rows are compared with memcmp: only the rows that differ are
+    scanned for the left and right edges.
+
+    returns False if the images are identical
+    """
+    cdef int width = gdImageSX(im1)
+    cdef int height = gdImageSY(im1)
+    cdef int top, bottom, left, right, row, col
+    cdef unsigned char *r1
+    cdef unsigned char *r2
+
+    top = 0
+    while top < height and memcmp(im1.pixels[top], im2.pixels[top], width) == 0:
+        top += 1
+    if top == height:
+        return False
+
+    bottom = height - 1
+    while memcmp(im1.pixels[bottom], im2.pixels[bottom], width) == 0:
+        bottom -= 1
+
+    left = width
+    right = -1
+    for row in range(top, bottom + 1):
+        r1 = im1.pixels[row]
+        r2 = im2.pixels[row]
+        for col in range(left):
+            if r1[col] != r2[col]:
+                left = col
+                break
+        for col in range(width - 1, right, -1):
+            if r1[col] != r2[col]:
+                right = col
+                break
+
+    x1[0] = left
+    y1[0] = top
+    x2[0] = right
+    y2[0] = bottom
+    return True
+
+
+cdef bint copy_same_palette(gdImagePtr dst, gdImagePtr src) noexcept nogil:
+    """
+    copies the pixels of one palette image to another a row at a time,
+    if they are the same size and have the same palette (with no
+    transparent color, which gdImageCopy would skip).
+
+    returns False (and copies nothing) if they can't be copied that way.
+    """
+    cdef int row
+    cdef int width = gdImageSX(src)
+
+    if (gdImageTrueColor(dst) or gdImageTrueColor(src)
+            or gdImageSX(dst) != width or gdImageSY(dst) != gdImageSY(src)
+            or src.transparent != -1 or not same_palette(dst, src)):
+        return False
+
+    for row in range(gdImageSY(src)):
+        memcpy(dst.pixels[row], src.pixels[row], width)
+    return True
+
+
+cdef gdImagePtr crop_palette_image(gdImagePtr im, int x1, int y1, int x2, int y2) noexcept nogil:
+    """
+    creates a new palette image from a rectangle of a palette image,
+    with the same palette -- the pixels are copied a row at a time.
+
+    The caller is responsible for destroying the new image.
+    returns NULL if it could not be created.
+    """
+    cdef int width = x2 - x1 + 1
+    cdef int row
+    cdef gdImagePtr cropped = gdImageCreatePalette(width, y2 - y1 + 1)
+
+    if cropped is NULL:
+        return NULL
+
+    cropped.colorsTotal = im.colorsTotal
+    cropped.transparent = im.transparent
+    memcpy(cropped.red, im.red, sizeof(im.red))
+    memcpy(cropped.green, im.green, sizeof(im.green))
+    memcpy(cropped.blue, im.blue, sizeof(im.blue))
+    memcpy(cropped.alpha, im.alpha, sizeof(im.alpha))
+    memcpy(cropped.open, im.open, sizeof(im.open))
+
+    for row in range(y2 - y1 + 1):
+        memcpy(cropped.pixels[row], im.pixels[y1 + row] + x1, width)
+
+    return cropped
+
+
+cdef void *encode_gif_frame(gdImagePtr frame, gdImagePtr prev,
+                            int local_colormap, int delay, int *size) noexcept nogil:
+    """
+    encodes a frame of an animated GIF, following the frame prev
+    (which may be NULL)
+
+    If the previous frame has the same palette, only the rectangle that
+    has changed is encoded (at its offset in the frame), found by
+    comparing the pixel rows directly. Otherwise, libgd compares the
+    frames itself.
+
+    returns the encoded frame, which must be freed with gdFree,
+    or NULL on failure.
+    """
+    cdef gdImagePtr cropped = NULL
+    cdef int x1 = 0, y1 = 0, x2 = 0, y2 = 0
+    cdef void *data
+
+    if (prev is not NULL
+            and not gdImageTrueColor(frame) and not gdImageTrueColor(prev)
+            and gdImageSX(prev) == gdImageSX(frame)
+            and gdImageSY(prev) == gdImageSY(frame)
+            and same_palette(prev, frame)):
+        # if nothing has changed, this leaves a single pixel
+        find_changed_rect(prev, frame, &x1, &y1, &x2, &y2)
+        cropped = crop_palette_image(frame, x1, y1, x2, y2)
+    if cropped is not NULL:
+        frame = cropped
+        prev = NULL
+    else:
+        x1 = y1 = 0
+
+    data = gdImageGifAnimAddPtr(frame, size, local_colormap,
+                                x1, y1, delay, 1, prev)
+
+    if cropped is not NULL:
+        gdImageDestroy(cropped)
+    return data
+
+
+def _encode_gif_frame(Image frame, Image prev, int local_colormap, int delay):
+    """
+    encodes a frame of an animated GIF to bytes -- see encode_gif_frame
+
+    This is what the worker threads of an Animation run: the GIL is
+    released while encoding.
+    """
+    cdef gdImagePtr prev_image = NULL if prev is None else prev._image
+    cdef void *data
+    cdef int size = 0
+
+    with nogil:
+        data = encode_gif_frame(frame._image, prev_image, local_colormap, delay, &size)
+    if data is NULL:
+        raise MemoryError("could not encode the animation frame")
+    try:
+        return PyBytes_FromStringAndSize(<char *> data, size)
+    finally:
+        gdFree(data)
+
+
 cdef class Animation:
     """
     Animation class -- creates an animated GIF
@@ -1385,16 +3715,37 @@ cdef class Animation:
     cdef Image cur_frame
     cdef int _cur_delay
     cdef Image prev_frame
+    # digest of the image the current frame was copied from
+    cdef unsigned long long _cur_digest
     cdef int base_delay
     cdef FILE *_fp
+    # when streaming, each encoded chunk is passed to _write as bytes
+    # (and _flush called)
+    cdef object _write
+    cdef object _flush
+    # for encoding in parallel: the thread pool, and the frames being
+    # encoded, as (future, previous frame) in the order they are written
+    cdef int _threads
+    cdef object _executor
+    cdef object _pending
+    # frame Images that are no longer needed, to be reused
+    cdef list _spare_frames
+    # an Image with the palette new frames start with
+    cdef Image _blank_frame
     cdef int _has_begun
     cdef int _has_closed
     cdef int _frames_written
     cdef int _global_colormap
     cdef object _file_path
 
-    def __cinit__(self, file_name, int delay=50, int global_colormap=1):
+    def __cinit__(self, file_name, int delay=50, int global_colormap=1,
+                  threads=1):
         self._fp = NULL
+        self._write = None
+        self._flush = None
+        self._executor = None
+        self._pending = _deque()
+        self._spare_frames = []
         self.base_delay = delay
         self._has_begun = 0
         self._has_closed = 0
@@ -1402,11 +3753,21 @@ cdef class Animation:
         self._cur_delay = delay
         self._global_colormap = global_colormap
 
-    def __init__(self, file_name, delay=50, global_colormap=1):
+    def __init__(self, file_name, delay=50, global_colormap=1, threads=1):
         """
         :param file_name: The name/file path of the animation that will be
-                          saved
-        :type file_name: path_like e.g. str or pathlib.Path
+                          saved, or where to stream it to: a writable binary
+                          file-like object (anything with a ``write()``
+                          method), or a callable that will be passed
+                          each chunk of the GIF as bytes.
+        :type file_name: path_like e.g. str or pathlib.Path, file-like,
+                         or callable
+
+        When streaming, each frame is passed on (and the stream flushed, if it
+        has a ``flush()`` method) as soon as it is encoded, so nothing
+        accumulates in memory. Note that a frame is encoded when the
+        *next* one is added (or the animation closed), as identical frames
+        are merged into one longer one.
 
         :param delay: the default delay between frames in 1/100 sec.
         :type delay: int
@@ -1415,8 +3776,20 @@ cdef class Animation:
                                   If 1, the same colormap is used for
                                   all images in the animation. If 0,
                                   a new colormap is used for each frame.
+
+        :param threads=1: Number of threads to encode the frames with.
+                          With more than one, frames are encoded in
+                          parallel, and written in order as they are done
+                          -- the output is the same. None means one per CPU.
+        :type threads: int or None
         """
+        if threads is None:
+            threads = os.cpu_count() or 1
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+
         self._file_path = file_name
+        self._threads = threads
         self.cur_frame = None
         self.prev_frame = None
 
@@ -1434,6 +3807,114 @@ cdef class Animation:
             fclose(self._fp)
             self._fp = NULL
 
+    cdef _open(self):
+        """
+        opens the file, or sets up the stream or callback, to write to
+        """
+        target = self._file_path
+        if hasattr(target, "write"):
+            self._write = target.write
+            self._flush = getattr(target, "flush", None)
+        elif callable(target):
+            self._write = target
+            self._flush = None
+        else:
+            self._fp = open_file(target, "wb")
+
+        if self._threads > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=self._threads)
+
+    cdef _shutdown(self):
+        """
+        stops the worker threads (if any), and drops any frames not written
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending.clear()
+        self._spare_frames.clear()
+
+    cdef _emit(self, void *data, int size):
+        """
+        writes a chunk of encoded GIF to the file, or passes it on to
+        the stream or callback, then frees it
+        """
+        if data is NULL:
+            raise MemoryError("could not encode the animation frame")
+        try:
+            if size > 0:
+                if self._fp is not NULL:
+                    fwrite(data, 1, size, self._fp)
+                else:
+                    # a copy -- the stream or callback may hold on to it,
+                    # and the libgd buffer is freed here
+                    self._write(PyBytes_FromStringAndSize(<char *> data, size))
+                if self._flush is not None:
+                    self._flush()
+        finally:
+            gdFree(data)
+
+    cdef _emit_bytes(self, bytes chunk):
+        """
+        writes a chunk of encoded GIF to the file, or passes it on to
+        the stream or callback
+        """
+        if self._fp is not NULL:
+            fwrite(<char *> chunk, 1, len(chunk), self._fp)
+        else:
+            self._write(chunk)
+            if self._flush is not None:
+                self._flush()
+
+    cdef _write_cur_frame(self, int local_colormap):
+        """
+        encodes the current frame, and writes it to the file or stream
+
+        When encoding in parallel, it is passed to the thread pool,
+        and written when it (and all the frames before it) are done.
+        """
+        cdef gdImagePtr prev = NULL
+        cdef void *data = NULL
+        cdef int size = 0
+        cdef int delay = self._cur_delay
+
+        if self._executor is not None:
+            self._pending.append((self._executor.submit(_encode_gif_frame,
+                                                        self.cur_frame,
+                                                        self.prev_frame,
+                                                        local_colormap,
+                                                        delay),
+                                  self.prev_frame))
+            # limit how many frames are held in memory
+            self._write_encoded(2 * self._threads)
+            return
+
+        if self.prev_frame is not None:
+            prev = self.prev_frame._image
+
+        with nogil:
+            data = encode_gif_frame(self.cur_frame._image, prev,
+                                    local_colormap, delay, &size)
+        self._emit(data, size)
+        if self.prev_frame is not None:
+            self._spare_frames.append(self.prev_frame)
+
+    cdef _write_encoded(self, Py_ssize_t max_pending):
+        """
+        writes the frames that have been encoded in parallel, in order
+
+        Waits for frames to be done until no more than max_pending are left.
+        """
+        while self._pending and (len(self._pending) > max_pending
+                                 or self._pending[0][0].done()):
+            future, prev = self._pending.popleft()
+            self._emit_bytes(future.result())
+            # the frame before this one is no longer needed
+            if prev is not None:
+                self._spare_frames.append(prev)
+
     def begin(self, Image first, int loops=0):
         """
         Begins the animation. This creates the file pointer and infers size and
@@ -1453,15 +3934,23 @@ cdef class Animation:
 
         if self._has_closed == 1:
             raise RuntimeError('Cannot re-begin closed animation')
-        self._fp = open_file(self._file_path, "wb")
+
+        cdef void *data = NULL
+        cdef int size = 0
+
+        self._open()
 
         self.cur_frame = Image(first.width, first.height)
         self.cur_frame.copy(first)
+        self._cur_digest = first.digest()
+        self._blank_frame = Image(1, 1)
 
-        gdImageGifAnimBegin(self.cur_frame._image,
-                            self._fp,
-                            self._global_colormap,
-                            loops)
+        with nogil:
+            data = gdImageGifAnimBeginPtr(self.cur_frame._image,
+                                          &size,
+                                          self._global_colormap,
+                                          loops)
+        self._emit(data, size)
 
         self._has_begun = 1
 
@@ -1491,33 +3980,42 @@ cdef class Animation:
         if delay < 1:
             delay = self.base_delay
 
-        cdef gdImagePtr prev
-        prev = NULL
+        cdef int local_colormap
+        cdef Image frame = None
+        cdef bint copied = False
+        cdef unsigned long long digest = image.digest()
 
-        if self.cur_frame == image:
+        if digest == self._cur_digest:
             # if next image is the same as the image in the queue,
             # just add to the delay and leave
             self._cur_delay += delay
 
             return
         else:
-            if self.prev_frame is not None:
-                prev = self.prev_frame._image
             # really weird gd flag values!
             local_colormap = 0 if self._global_colormap == 1 else 1
-            gdImageGifAnimAdd(self.cur_frame._image,
-                              self._fp,
-                              local_colormap,
-                              0,
-                              0,
-                              self._cur_delay,
-                              1,
-                              prev)
+            self._write_cur_frame(local_colormap)
 
             self.prev_frame = self.cur_frame
 
-            self.cur_frame = Image(self.cur_frame.width, self.cur_frame.height)
-            self.cur_frame.copy(image)
+            # Images with the same palette as a new frame are copied row by
+            # row, reusing the Image of a frame that is no longer needed.
+            # (this only depends on the palette -- not on which frames are
+            # free -- so that encoding in parallel gives the same result)
+            if same_palette(self._blank_frame._image, image._image):
+                while self._spare_frames and frame is None:
+                    frame = self._spare_frames.pop()
+                    if not same_palette(frame._image, image._image):
+                        frame = None
+                if frame is None:
+                    frame = Image(self.cur_frame.width, self.cur_frame.height)
+                with nogil:
+                    copied = copy_same_palette(frame._image, image._image)
+            if not copied:
+                frame = Image(self.cur_frame.width, self.cur_frame.height)
+                frame.copy(image)
+            self.cur_frame = frame
+            self._cur_digest = digest
 
             self._cur_delay = delay
 
@@ -1528,26 +4026,30 @@ cdef class Animation:
         close the current animation
 
         finalizes animation, and closed gif file
+        (a stream is flushed, but not closed)
         """
         if self._has_begun == 0:
             raise RuntimeError("Cannot close animation that hasn't been "
                                "opened (begun)")
 
-        cdef gdImagePtr prev
+        cdef void *data = NULL
+        cdef int size = 0
 
-        if self._fp is not NULL:
-            prev = NULL
-
-            if self.prev_frame is not None:
-                prev = self.prev_frame._image
-
-            gdImageGifAnimAdd(self.cur_frame._image, self._fp,
-                              0, 0, 0, self._cur_delay, 1, prev)
-
-            gdImageGifAnimEnd(self._fp)
-
-            fclose(self._fp)
-            self._fp = NULL
+        if self._has_closed == 0 and (self._fp is not NULL or self._write is not None):
+            try:
+                self._write_cur_frame(0)
+                self._write_encoded(0)
+
+                with nogil:
+                    data = gdImageGifAnimEndPtr(&size)
+                self._emit(data, size)
+            finally:
+                self._shutdown()
+                if self._fp is not NULL:
+                    fclose(self._fp)
+                    self._fp = NULL
+                self._write = None
+                self._flush = None
 
         self._has_closed = 1
 
@@ -1563,9 +4065,12 @@ cdef class Animation:
 
         :param file_path=None: filename of new animation. Will reuse existing
                                name if not specified
-        :param file_path: pathlike
+        :param file_path: pathlike, or a stream or callable (see __init__)
         """
+        self._shutdown()
         self.prev_frame = None
+        self._write = None
+        self._flush = None
 
         if file_path is not None:
             self._file_path = file_path
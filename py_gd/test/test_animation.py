@@ -5,9 +5,12 @@ unit tests for Animation features of py_gd
 designed to be run with pytest:
 """
 
+import io
+import struct
 from pathlib import Path
 
 import numpy as np
+import pytest
 
 
 from py_gd import Image, Animation  # noqa: F821
@@ -358,3 +361,260 @@ def test_animation_delete_one_frame():
     assert filename.exists()
 
     assert check_file("one_frame_delete.gif")
+
+
+def write_rotating_line(anim):
+    img = Image(200, 200)
+    anim.begin_anim(img, 0)
+    for points in rotating_line(200):
+        img.draw_line(points[0], points[1], 'red')
+        anim.add_frame(img)
+    anim.close_anim()
+
+
+def test_animation_stream():
+    """
+    streaming to a file-like object should give the same result as a file
+    """
+    filename = outfile("test_animation_stream.gif")
+    write_rotating_line(Animation(filename))
+
+    stream = io.BytesIO()
+    write_rotating_line(Animation(stream))
+
+    assert stream.getvalue() == filename.read_bytes()
+    assert not stream.closed
+
+
+class KeepChunks:
+    """
+    a stream that holds on to what it was given
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+def test_animation_stream_keeps_chunks():
+    """
+    the encoded chunks are freed after they are written -- so the stream
+    must be given copies
+    """
+    filename = outfile("test_animation_stream_keeps_chunks.gif")
+    write_rotating_line(Animation(filename))
+
+    stream = KeepChunks()
+    write_rotating_line(Animation(stream))
+
+    assert all(isinstance(chunk, bytes) for chunk in stream.chunks)
+    assert b"".join(stream.chunks) == filename.read_bytes()
+
+
+def test_animation_callback():
+    """
+    each frame should be passed on as soon as it's encoded
+    """
+    chunks = []
+    anim = Animation(chunks.append)
+
+    img = Image(200, 200)
+    anim.begin_anim(img, 0)
+    assert len(chunks) == 1
+    assert chunks[0].startswith(b'GIF89a')
+
+    for points in rotating_line(200):
+        img.draw_line(points[0], points[1], 'red')
+        anim.add_frame(img)
+        # the previous frame is encoded when the next one is added
+        assert len(chunks) == anim.frames_written + 1
+
+    anim.close_anim()
+    assert chunks[-1] == b';'
+
+    stream = io.BytesIO()
+    write_rotating_line(Animation(stream))
+    assert b''.join(chunks) == stream.getvalue()
+
+
+def test_animation_stream_flush():
+    class Stream(io.BytesIO):
+        flushes = 0
+
+        def flush(self):
+            self.flushes += 1
+
+    stream = Stream()
+    anim = Animation(stream)
+    write_rotating_line(anim)
+
+    # begin, one per frame, and the end
+    assert stream.flushes == anim.frames_written + 3
+
+
+def test_animation_stream_reset():
+    stream1 = io.BytesIO()
+    anim = Animation(stream1)
+    write_rotating_line(anim)
+
+    result1 = stream1.getvalue()
+
+    stream2 = io.BytesIO()
+    anim.reset(stream2)
+    write_rotating_line(anim)
+
+    # the first one is not touched by the second
+    assert stream1.getvalue() == result1
+    assert stream2.getvalue().startswith(b'GIF89a')
+    assert stream2.getvalue().endswith(b';')
+
+
+def test_animation_changed_rect():
+    """
+    only the part of the frame that changed should be encoded
+    """
+    chunks = []
+    anim = Animation(chunks.append)
+
+    img = Image(200, 100)
+    anim.begin_anim(img, 0)
+    img.draw_rectangle((50, 20), (60, 40), fill_color='red')
+    anim.add_frame(img)
+    img.draw_rectangle((52, 22), (70, 30), fill_color='blue')
+    anim.add_frame(img)
+    anim.close_anim()
+
+    # chunks: header, first frame, the two changed frames, end
+    frame = chunks[3]
+    # graphic control extension, then the image descriptor
+    assert frame[8:9] == b','
+    left, top, width, height = struct.unpack('<4H', frame[9:17])
+    assert (left, top, width, height) == (52, 22, 19, 9)
+
+
+def test_animation_same_frame_merged():
+    chunks = []
+    anim = Animation(chunks.append)
+
+    img = Image(200, 100)
+    anim.begin_anim(img, 0)
+    img.draw_dot((10, 10), 'red')
+    anim.add_frame(img)
+    anim.add_frame(img)
+    img.draw_dot((20, 10), 'red')
+    anim.add_frame(img)
+
+    assert anim.frames_written == 2
+
+
+def test_animation_mixed_palettes():
+    """
+    frames with a different palette can't be copied directly
+    """
+    stream = io.BytesIO()
+    anim = Animation(stream, global_colormap=0)
+
+    anim.begin_anim(Image(100, 100), 0)
+    for i in range(6):
+        img = Image(100, 100, preset_colors='BW' if i % 3 else 'web')
+        img.draw_line((0, i * 10), (99, i * 10), 'black', line_width=3)
+        anim.add_frame(img)
+    anim.close_anim()
+
+    assert anim.frames_written == 6
+    assert stream.getvalue().endswith(b';')
+
+
+def test_animation_frames_are_copies():
+    """
+    changing an image after it is added shouldn't change the animation
+    """
+    stream1 = io.BytesIO()
+    anim = Animation(stream1)
+    img = Image(100, 100)
+    anim.begin_anim(img, 0)
+    for i in range(5):
+        img.draw_dot((i * 10, i * 10), 'red', diameter=5)
+        anim.add_frame(img)
+    img.clear()
+    anim.close_anim()
+
+    stream2 = io.BytesIO()
+    anim = Animation(stream2)
+    anim.begin_anim(Image(100, 100), 0)
+    for i in range(5):
+        img = Image(100, 100)
+        for j in range(i + 1):
+            img.draw_dot((j * 10, j * 10), 'red', diameter=5)
+        anim.add_frame(img)
+    anim.close_anim()
+
+    assert stream1.getvalue() == stream2.getvalue()
+
+
+def write_changing_frames(anim):
+    """
+    frames with different palettes, sizes of changes, and repeats
+    """
+    rng = np.random.default_rng(0)
+    img = Image(150, 100)
+    anim.begin_anim(img, 0)
+    for i in range(30):
+        if i % 7 == 3:
+            img = Image(150, 100, preset_colors='BW')
+        elif i % 7 == 4:
+            img = Image(150, 100)
+        if i % 5 != 2:  # some repeated frames
+            points = rng.integers(0, 150, (50, 2))
+            img.draw_dots(points, color='white' if i % 2 else 'black', diameter=3)
+        if i % 11 == 5:
+            # raw palette indices -- including colors that are in the
+            # palette more than once
+            img.set_data(rng.integers(0, len(img.get_color_names()), (150, 100)).astype(np.uint8))
+        anim.add_frame(img, delay=i % 3 * 10)
+    anim.close_anim()
+
+
+@pytest.mark.parametrize("threads", [2, 3, 8])
+def test_animation_threads(threads):
+    """
+    encoding in parallel should give exactly the same result
+    """
+    serial = io.BytesIO()
+    write_changing_frames(Animation(serial))
+
+    parallel = io.BytesIO()
+    anim = Animation(parallel, threads=threads)
+    write_changing_frames(anim)
+
+    assert anim.frames_written > 20
+    assert parallel.getvalue() == serial.getvalue()
+
+
+def test_animation_threads_file():
+    filename = outfile("test_animation_threads.gif")
+    write_rotating_line(Animation(filename, threads=4))
+
+    stream = io.BytesIO()
+    write_rotating_line(Animation(stream))
+
+    assert filename.read_bytes() == stream.getvalue()
+
+
+def test_animation_threads_reset():
+    stream1 = io.BytesIO()
+    anim = Animation(stream1, threads=2)
+    write_rotating_line(anim)
+
+    stream2 = io.BytesIO()
+    anim.reset(stream2)
+    write_rotating_line(anim)
+
+    assert stream2.getvalue().endswith(b';')
+
+
+def test_animation_bad_threads():
+    with pytest.raises(ValueError):
+        Animation(io.BytesIO(), threads=0)
@@ -3,13 +3,14 @@
 """
 tests for buffer access to py_gd Image
 """
+import gc
+
+import numpy as np
 import pytest
 
 from py_gd import Image
 
 
-# skip this until we get it working...
-@pytest.mark.skipif('True')
 def test_mem_view():
     img = Image(5, 10)
 
@@ -17,15 +18,71 @@ def test_mem_view():
 
     # get a memory view of it:
     m = memoryview(img)
-    print(m)
-    print(m.format)
-    print(m.ndim)
-    print(m.shape)
-    print(m.suboffsets)
-    print(m.itemsize)
-    print(m.readonly)
-    print(m.strides)
-    print(m.tobytes())
-    print(m.tolist())
-
-    assert False
+
+    assert m.format == 'B'
+    assert m.ndim == 2
+    assert m.shape == (5, 10)
+    assert m.itemsize == 1
+    assert not m.readonly
+    assert m.strides == (1, 5)
+    assert m.f_contiguous
+    assert m.tobytes() == bytes(50)
+
+
+def test_asarray_is_view():
+    img = Image(20, 10)
+    arr = np.asarray(img)
+
+    assert arr.shape == (20, 10)
+    assert arr.dtype == np.uint8
+
+    img.draw_line((0, 0), (19, 9), 'red')
+
+    assert np.array_equal(arr, np.array(img))
+    assert arr[0, 0] == img.get_color_index('red')
+
+
+def test_write_through_view():
+    img = Image(20, 10)
+    arr = np.asarray(img)
+
+    arr[3, 4] = img.get_color_index('blue')
+
+    assert img.get_pixel_color((3, 4)) == 'blue'
+
+
+def test_transposed_view():
+    """
+    the transpose is a C-contiguous (height, width) array
+    """
+    img = Image(20, 10)
+    arr = np.asarray(img).T
+
+    assert arr.shape == (10, 20)
+    assert arr.flags.c_contiguous
+
+    img.draw_pixel((15, 2), 'white')
+    assert arr[2, 15] == img.get_color_index('white')
+
+
+def test_view_outlives_image():
+    img = Image(20, 10)
+    img.draw_pixel((1, 1), 'white')
+    arr = np.asarray(img)
+
+    del img
+    gc.collect()
+
+    assert arr[1, 1] == 2  # 'white' in the web colors
+    assert arr.sum() == 2
+
+
+def test_simple_buffer_request_fails():
+    """
+    the buffer is Fortran ordered, so a consumer that can't handle
+    strides should get an error
+    """
+    img = Image(20, 10)
+
+    with pytest.raises(BufferError):
+        np.frombuffer(img, dtype=np.uint8)
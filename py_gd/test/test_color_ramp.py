@@ -83,6 +83,32 @@ def test_get_colors():
                              ])
 
 
+def test_get_colors_nodata():
+    cr = ColorRamp('inferno', 0, 1, num_colors=100, base_colorscheme='BW')
+
+    colors = cr.get_colors([0.1, np.nan, 1.0])
+    assert np.array_equal(colors.mask.any(axis=1), [False, True, False])
+    assert np.array_equal(colors[0], cr.color_index[10])
+    assert np.array_equal(colors[2], cr.color_index[99])
+
+    colors = cr.get_colors(np.ma.masked_greater([0.1, 2.0, 1.0], 1.5))
+    assert np.array_equal(colors.mask.any(axis=1), [False, True, False])
+
+
+@pytest.mark.parametrize("index", [-1, 256, 300])
+def test_bad_nodata_index(index):
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', 0, 1, nodata_index=index)
+
+    cr = ColorRamp('viridis', 0, 1)
+    with pytest.raises(ValueError):
+        cr.nodata_index = index
+    assert cr.nodata_index == 0
+
+    with pytest.raises(TypeError):
+        cr.nodata_index = 1.5
+
+
 def test_colorlist():
     """
     colorlist is supposed to return a list of colors compatible with
@@ -163,3 +189,384 @@ def test_image_with_all_colorramps(scheme):
     img.save(outfile("test_image_with_all_colorramps.png"), 'png')
 
     assert Path(outfile("test_image_with_all_colorramps.png")).is_file()
+
+
+def reference_indices(cr, values):
+    """
+    the original, all numpy, version of get_color_indices
+    """
+    values = np.asarray(values, dtype=np.float64)
+    inds = np.round((values - cr.min_value) / cr._delta) + cr.start_index
+    inds = np.clip(inds, cr.start_index, cr._num_colors + cr.start_index - 1)
+    return inds.astype(np.uint8)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32, np.int32, np.int64])
+def test_get_color_indices_dtypes(dtype):
+    cr = ColorRamp('viridis', -3.0, 7.5, base_colorscheme='web')
+    rng = np.random.default_rng(0)
+    values = (rng.normal(2, 4, 10000)).astype(dtype)
+
+    inds = cr.get_color_indices(values)
+
+    assert inds.dtype == np.uint8
+    assert np.array_equal(inds, reference_indices(cr, values))
+
+
+def test_get_color_indices_rounding():
+    """
+    halfway values round to even, as np.round does
+    """
+    cr = ColorRamp('viridis', 0, 100, num_colors=100)
+    values = np.arange(0, 100, 0.5)
+
+    assert np.array_equal(cr.get_color_indices(values), reference_indices(cr, values))
+
+
+def test_get_color_indices_2d():
+    cr = ColorRamp('viridis', 0, 1, num_colors=100)
+    values = np.linspace(0, 1, 60).reshape((6, 10))
+
+    inds = cr.get_color_indices(values)
+
+    assert inds.shape == (6, 10)
+    assert np.array_equal(inds, reference_indices(cr, values))
+    # non-contiguous
+    assert np.array_equal(cr.get_color_indices(values.T), reference_indices(cr, values.T))
+
+
+def test_get_color_indices_out():
+    cr = ColorRamp('viridis', 0, 1, num_colors=100)
+    values = np.linspace(0, 1, 60, dtype=np.float32)
+    out = np.zeros(60, dtype=np.uint8)
+
+    inds = cr.get_color_indices(values, out=out)
+
+    assert inds is out
+    assert np.array_equal(out, reference_indices(cr, values))
+
+
+@pytest.mark.parametrize("out", [np.zeros(60, dtype=np.int32),
+                                 np.zeros(59, dtype=np.uint8),
+                                 np.zeros(120, dtype=np.uint8)[::2],
+                                 ])
+def test_get_color_indices_bad_out(out):
+    cr = ColorRamp('viridis', 0, 1, num_colors=100)
+
+    with pytest.raises(ValueError):
+        cr.get_color_indices(np.linspace(0, 1, 60), out=out)
+
+
+def test_get_color_indices_nan():
+    cr = ColorRamp('viridis', 0, 1, num_colors=100, base_colorscheme=5)
+    values = np.array([0.0, np.nan, np.inf, -np.inf, 1.0], dtype=np.float32)
+
+    assert np.array_equal(cr.get_color_indices(values), [5, 0, 104, 5, 104])
+
+    cr.nodata_index = 2
+    assert cr.get_color_indices(values)[1] == 2
+
+
+def test_get_color_indices_masked():
+    cr = ColorRamp('viridis', 0, 1, num_colors=100, base_colorscheme=5, nodata_index=1)
+    values = np.ma.masked_greater(np.array([0.0, 0.5, 2.0, 1.0]), 1.5)
+
+    assert np.array_equal(cr.get_color_indices(values), [5, 55, 1, 104])
+
+
+@pytest.mark.parametrize("min_value, max_value", [(1, 1), (np.nan, 1), (0, np.nan)])
+def test_bad_range(min_value, max_value):
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', min_value, max_value)
+
+
+def test_inverted_range():
+    cr = ColorRamp('viridis', 10, 0, num_colors=11, base_colorscheme=5)
+
+    assert np.array_equal(cr.get_color_indices([10, 11, 7.2, 0, -1, np.nan]),
+                          [5, 5, 8, 15, 15, 0])
+
+    for norm in ('log', 'power'):
+        with pytest.raises(ValueError):
+            ColorRamp('viridis', 10, 1, norm=norm)
+
+
+def field_image(truecolor=False):
+    img = Image(40, 30, preset_colors='BW', truecolor=truecolor)
+    cr = ColorRamp('viridis', 0, 1, base_colorscheme='BW')
+    img.add_colors(cr.colorlist)
+    return img, cr
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32, np.int16])
+def test_draw_field(dtype):
+    img, cr = field_image()
+    values = (np.random.default_rng(0).random((40, 30)) * 100).astype(dtype) / 100
+
+    img.draw_field(values, cr)
+
+    assert np.array_equal(np.asarray(img), cr.get_color_indices(values))
+
+
+def test_draw_field_transposed():
+    img, cr = field_image()
+    rows = np.random.default_rng(0).random((30, 40))
+
+    img.draw_field(rows.T, cr)
+
+    assert np.array_equal(np.asarray(img), cr.get_color_indices(rows.T))
+
+
+def test_draw_field_resampled():
+    img, cr = field_image()
+    values = np.random.default_rng(0).random((4, 3))
+
+    img.draw_field(values, cr)
+
+    # each value covers a 10x10 block
+    expected = np.repeat(np.repeat(cr.get_color_indices(values), 10, axis=0), 10, axis=1)
+    assert np.array_equal(np.asarray(img), expected)
+
+    # and down-sampled: every other value, the ones at the pixel centers
+    values = np.random.default_rng(0).random((80, 60))
+    img.draw_field(values, cr)
+    assert np.array_equal(np.asarray(img), cr.get_color_indices(values[1::2, 1::2]))
+
+
+def test_draw_field_extent():
+    img, cr = field_image()
+    values = np.ones((2, 2))
+
+    img.draw_field(values, cr, extent=((35, 5), (5, 14)))
+
+    arr = np.asarray(img)
+    assert np.all(arr[5:36, 5:15] == cr.get_color_indices(1.0))
+    assert np.sum(arr != 0) == 31 * 10
+
+
+def test_draw_field_clipped():
+    img, cr = field_image()
+    values = np.random.default_rng(0).random((4, 3))
+    img.clip_rect = ((10, 10), (19, 29))
+
+    img.draw_field(values, cr, extent=((-10, -10), (49, 49)))
+
+    arr = np.asarray(img)
+    expected = np.repeat(np.repeat(cr.get_color_indices(values), 15, axis=0), 20, axis=1)
+    assert np.array_equal(arr[10:20, 10:30], expected[20:30, 20:40])
+    assert np.sum(arr != 0) == 10 * 20
+
+    # entirely outside
+    img.draw_field(values, cr, extent=((50, 50), (60, 60)))
+
+
+def test_draw_field_nodata():
+    img, cr = field_image()
+    cr.nodata_index = 1
+    values = np.ma.masked_greater(np.linspace(0, 1, 40 * 30).reshape((40, 30)), 0.5)
+    values[0, 0] = np.nan
+
+    img.draw_field(values, cr)
+
+    arr = np.asarray(img)
+    assert arr[0, 0] == 1
+    assert np.all(arr[values.mask] == 1)
+    assert np.array_equal(arr, cr.get_color_indices(values))
+
+
+def test_draw_field_truecolor():
+    img, cr = field_image(truecolor=True)
+    pal_img, _ = field_image()
+    values = np.random.default_rng(0).random((4, 3))
+    values[0, 0] = np.nan
+
+    img.draw_field(values, cr)
+    pal_img.draw_field(values, cr)
+
+    arr = np.asarray(img)
+    for point in [(0, 0), (15, 5), (39, 29)]:
+        name = pal_img.get_pixel_color(point)
+        assert arr[point] == img.get_color_index(name)
+
+
+def test_draw_field_bad_values():
+    img, cr = field_image()
+
+    with pytest.raises(ValueError):
+        img.draw_field(np.ones(10), cr)
+    with pytest.raises(ValueError):
+        img.draw_field(np.ones((0, 10)), cr)
+
+
+def test_draw_field_bad_ramp_indices():
+    img, cr = field_image()
+    values = np.zeros((3, 4))
+    # (bypassing the check when it is set)
+    cr._nodata_index = 300
+    with pytest.raises(ValueError):
+        img.draw_field(values, cr)
+    with pytest.raises(ValueError):
+        cr.get_color_indices(values)
+
+    too_many = ColorRamp('viridis', 0, 1, num_colors=250, base_colorscheme='web')
+    with pytest.raises(ValueError):
+        img.draw_field(values, too_many)
+    with pytest.raises(ValueError):
+        img.draw_dots([(1, 1)], values=[0.5], ramp=too_many)
+
+
+def test_log_norm():
+    cr = ColorRamp('viridis', 0.01, 1000, num_colors=100, base_colorscheme=5, norm='log')
+    values = 10 ** np.random.default_rng(0).uniform(-3, 4, 10000)
+
+    # the same as linear in log(value)
+    log_cr = ColorRamp('viridis', -2, 3, num_colors=100, base_colorscheme=5)
+    assert np.array_equal(cr.get_color_indices(values),
+                          log_cr.get_color_indices(np.log10(values)))
+
+    assert np.array_equal(cr.get_color_indices([0.0, -1.0, np.nan, np.inf]), [5, 5, 0, 104])
+
+
+def test_log_norm_bad_range():
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', 0, 1000, norm='log')
+
+
+def test_power_norm():
+    cr = ColorRamp('viridis', 10, 20, num_colors=50, base_colorscheme=5, norm='power', gamma=0.5)
+    values = np.random.default_rng(0).uniform(5, 25, 10000)
+
+    # the same as linear in the normalized value ** gamma
+    unit_cr = ColorRamp('viridis', 0, 1, num_colors=50, base_colorscheme=5)
+    normed = np.clip((values - 10) / 10, 0, 1) ** 0.5
+    assert np.array_equal(cr.get_color_indices(values), unit_cr.get_color_indices(normed))
+
+
+def test_power_norm_one_is_linear():
+    cr = ColorRamp('viridis', 0, 100, num_colors=200, norm='power', gamma=1.0)
+    linear_cr = ColorRamp('viridis', 0, 100, num_colors=200)
+    # (away from the edges, where rounding can differ)
+    values = np.arange(-10, 110, 0.5) + 0.1
+
+    assert np.array_equal(cr.get_color_indices(values), linear_cr.get_color_indices(values))
+
+
+def test_bad_norm():
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', 0, 100, norm='sqrt')
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', 0, 100, norm='power', gamma=0)
+
+
+@pytest.mark.parametrize("boundaries", [[0, 0.01, 0.1, 1, 10, 100, 1000],
+                                        [-5, -1, -0.5, 0, 0.5, 2, 5],
+                                        [-1e6, -2, 1e-9, 3, 1e6],
+                                        np.sort(np.random.default_rng(1).normal(0, 10, 200)),
+                                        [1, 2],
+                                        ])
+def test_boundary_norm(boundaries):
+    boundaries = np.asarray(boundaries, dtype=np.float64)
+    cr = ColorRamp('viridis', None, None, base_colorscheme=5, boundaries=boundaries)
+    rng = np.random.default_rng(0)
+    values = np.concatenate((rng.uniform(boundaries[0] - 1, boundaries[-1] + 1, 10000),
+                             boundaries, np.nextafter(boundaries, -np.inf),
+                             [np.inf, -np.inf, 0.0, -0.0]))
+
+    expected = np.clip(np.searchsorted(boundaries, values, side='right') - 1,
+                       0, len(boundaries) - 2) + 5
+
+    assert cr.min_value == boundaries[0]
+    assert cr.max_value == boundaries[-1]
+    assert cr._num_colors == len(boundaries) - 1
+    assert np.array_equal(cr.get_color_indices(values), expected)
+    assert np.array_equal(cr.get_color_indices(values.astype(np.float32)),
+                          np.clip(np.searchsorted(boundaries, values.astype(np.float32), side='right') - 1,
+                                  0, len(boundaries) - 2) + 5)
+
+
+def test_bad_boundaries():
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', None, None, boundaries=[1])
+    with pytest.raises(ValueError):
+        ColorRamp('viridis', None, None, boundaries=[1, 3, 2])
+
+
+def test_draw_field_log_norm():
+    img = Image(40, 30, preset_colors='BW')
+    cr = ColorRamp('viridis', 0.1, 100, base_colorscheme='BW', norm='log')
+    img.add_colors(cr.colorlist)
+    values = 10 ** np.random.default_rng(0).uniform(-2, 3, (40, 30))
+
+    img.draw_field(values, cr)
+
+    assert np.array_equal(np.asarray(img), cr.get_color_indices(values))
+
+
+@pytest.mark.parametrize("diameter", [1, 2, 5])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32, np.int16])
+def test_draw_dots_values(diameter, dtype):
+    img, cr = field_image()
+    ref_img, _ = field_image()
+    rng = np.random.default_rng(0)
+    points = rng.integers(-2, 42, (200, 2))
+    values = (rng.random(200) * 100).astype(dtype) / 100
+
+    img.draw_dots(points, diameter=diameter, values=values, ramp=cr)
+    ref_img.draw_dots(points, diameter=diameter, color=cr.get_color_indices(values))
+
+    assert img == ref_img
+
+
+def test_draw_dots_values_strided_masked():
+    img, cr = field_image()
+    ref_img, _ = field_image()
+    cr.nodata_index = 1
+    points = np.random.default_rng(0).integers(0, 30, (100, 2))
+    values = np.ma.masked_greater(np.linspace(0, 1, 200)[::2], 0.7)
+    values[3] = np.nan
+
+    img.draw_dots(points, diameter=2, values=values, ramp=cr)
+    ref_img.draw_dots(points, diameter=2, color=cr.get_color_indices(values))
+
+    assert img == ref_img
+
+
+def test_draw_dots_values_truecolor():
+    img, cr = field_image(truecolor=True)
+    pal_img, _ = field_image()
+    points = [(5, 5), (20, 10), (35, 25)]
+    values = [0.0, 0.5, np.nan]
+
+    img.draw_dots(points, values=values, ramp=cr)
+    pal_img.draw_dots(points, values=values, ramp=cr)
+
+    for point in points:
+        assert img.get_pixel_value(point) == img.get_color_index(pal_img.get_pixel_color(point))
+
+
+@pytest.mark.parametrize("line_width", [1, 3])
+def test_draw_xes_values(line_width):
+    img, cr = field_image()
+    ref_img, _ = field_image()
+    rng = np.random.default_rng(0)
+    points = rng.integers(0, 40, (50, 2))
+    values = rng.random(50)
+
+    img.draw_xes(points, diameter=6, line_width=line_width, values=values, ramp=cr)
+    ref_img.draw_xes(points, diameter=6, line_width=line_width, color=cr.get_color_indices(values))
+
+    assert img == ref_img
+
+
+def test_draw_dots_values_bad():
+    img, cr = field_image()
+    points = [(5, 5), (20, 10)]
+
+    with pytest.raises(ValueError):
+        img.draw_dots(points, values=[0.5, 0.6])
+    with pytest.raises(ValueError):
+        img.draw_dots(points, ramp=cr)
+    with pytest.raises(ValueError):
+        img.draw_dots(points, values=[0.5], ramp=cr)
+    with pytest.raises(ValueError):
+        img.draw_xes(points, values=np.ones((2, 2)), ramp=cr)
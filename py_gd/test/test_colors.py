@@ -67,3 +67,140 @@ def test_colornames():
     for name in names:
         assert name[0] in all_names
         assert name[1] in {'discrete', 'continuous'}
+
+
+@pytest.mark.parametrize("color_name", all_color_schemes)
+@pytest.mark.parametrize("truecolor", [False, True])
+def test_preset_palette(color_name, truecolor):
+    """
+    the cached palette gives the same Image as adding the colors one by one
+    """
+    im = py_gd.Image(10, 10, preset_colors=color_name, truecolor=truecolor)
+    im2 = py_gd.Image(10, 10, preset_colors=None, truecolor=truecolor)
+    im2.add_colors(colorschemes[color_name])
+    im2.clear()
+
+    assert im.digest() == im2.digest()
+    assert im.get_color_names() == im2.get_color_names()
+    assert im.get_colors() == im2.get_colors()
+    for name in im.get_color_names():
+        assert im.get_color_index(name) == im2.get_color_index(name)
+
+
+def test_palette_is_cached():
+    assert py_gd.get_palette('web') is py_gd.get_palette('web')
+    assert len(py_gd.get_palette('web')) == len(colorschemes['web'])
+
+    with pytest.raises(KeyError):
+        py_gd.get_palette('not_a_colorscheme')
+
+
+def test_custom_palette():
+    palette = py_gd.Palette([('background', (255, 255, 255)),
+                             ('half_red', (255, 0, 0, 63))])
+    im = py_gd.Image(10, 10, preset_colors=palette)
+
+    assert palette.names == ['background', 'half_red']
+    assert im.get_color_names() == palette.names
+    assert im.get_color_index('half_red') == 1
+    assert py_gd.Image(10, 10, preset_colors=palette,
+                       truecolor=True).get_color_index('half_red') == 0x3FFF0000
+
+
+def test_bad_palette():
+    with pytest.raises(ValueError):
+        py_gd.Palette([('red', (255, 0, 0)), ('red', (255, 0, 0))])
+    with pytest.raises(ValueError):
+        py_gd.Palette([('red', (255, 0))])
+    with pytest.raises(ValueError):
+        py_gd.Palette([(str(i), (i, i, i)) for i in range(257)])
+
+
+def test_adding_colors_does_not_change_palette():
+    im = py_gd.Image(10, 10, preset_colors='BW')
+    im.add_color('red', (255, 0, 0))
+    im.get_color_names().append('blue')
+
+    im2 = py_gd.Image(10, 10, preset_colors='BW')
+
+    assert im2.get_color_names() == ['transparent', 'black', 'white']
+    with pytest.raises(ValueError):
+        im2.get_color_index('red')
+    assert im2.add_color('red', (255, 0, 0)) == 3
+
+
+def test_continuous_schemes_in_data():
+    from py_gd import _cm_listed
+
+    data_names = sorted(name[:-5].lstrip("_") for name in dir(_cm_listed)
+                        if name.endswith("_data"))
+    assert data_names == sorted(py_gd.colors.CONTINUOUS_SCHEMES)
+
+
+def test_colorschemes_built_lazily():
+    schemes = py_gd.colors.Colorschemes()
+    built = []
+    schemes['base'] = [('transparent', (0, 0, 0, 127))]
+    schemes.add_builder('lazy', lambda: built.append(1) or [('red', (255, 0, 0))])
+
+    assert list(schemes) == ['base', 'lazy']
+    assert 'lazy' in schemes
+    assert built == []
+
+    assert schemes['lazy'] == [('red', (255, 0, 0))]
+    assert schemes['lazy'] is schemes['lazy']
+    assert built == [1]
+
+
+def test_colorschemes_replace():
+    schemes = py_gd.colors.Colorschemes()
+    schemes.add_builder('lazy', lambda: [('red', (255, 0, 0))])
+
+    schemes['lazy'] = [('blue', (0, 0, 255))]
+    assert schemes['lazy'] == [('blue', (0, 0, 255))]
+
+    del schemes['lazy']
+    assert len(schemes) == 0
+    with pytest.raises(KeyError):
+        schemes['lazy']
+
+
+def test_colorschemes_built_once_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+    import time
+
+    schemes = py_gd.colors.Colorschemes()
+    built = []
+    start = threading.Barrier(8)
+
+    def build_slowly():
+        built.append(1)
+        time.sleep(0.05)
+        return [('red', (255, 0, 0))]
+
+    def lookup(_):
+        start.wait()
+        return schemes['lazy']
+
+    schemes.add_builder('lazy', build_slowly)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lookup, range(8)))
+
+    assert built == [1]
+    assert all(scheme is results[0] for scheme in results)
+    assert results[0] == [('red', (255, 0, 0))]
+
+
+def test_colorschemes_builder_uses_another():
+    schemes = py_gd.colors.Colorschemes()
+    schemes.add_builder('base', lambda: [('red', (255, 0, 0))])
+    schemes.add_builder('derived', lambda: schemes['base'] + [('blue', (0, 0, 255))])
+
+    assert schemes['derived'] == [('red', (255, 0, 0)), ('blue', (0, 0, 255))]
+    assert schemes['base'] == [('red', (255, 0, 0))]
+
+
+def test_xkcd():
+    assert len(py_gd.colors.XKCD) == 255
+    assert list(py_gd.colors.XKCD)[0] == colorschemes['xkcd'][1][0]
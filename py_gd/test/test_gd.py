@@ -8,6 +8,7 @@ py.test test_gd.py
 
 """
 
+import io
 import sys
 import hashlib
 from pathlib import Path
@@ -207,6 +208,50 @@ def test_get_color_indices():
     assert np.array_equal(colors, np.array([1, 22, 54], dtype=np.uint8))
 
 
+def test_get_color_indices_mixed():
+    img = Image(10, 10, preset_colors='web')
+
+    colors = img.get_color_indices(['white', 3, 'black', np.uint8(5)])
+
+    assert np.array_equal(colors, np.array([2, 3, 1, 5], dtype=np.uint8))
+
+
+def test_get_color_indices_numbers():
+    img = Image(10, 10, preset_colors='web')
+
+    colors = img.get_color_indices(np.array([0, 10, 255], dtype=np.int64))
+
+    assert colors.dtype == np.uint8
+    assert np.array_equal(colors, [0, 10, 255])
+
+
+@pytest.mark.parametrize("colors", [['white', 'not_a_color'],
+                                    ['white', 256],
+                                    np.array([1, -1]),
+                                    np.array([1.0, np.nan]),
+                                    np.array([1.7, 2.2]),
+                                    [1.0, 2.0],
+                                    ])
+def test_get_color_indices_bad(colors):
+    img = Image(10, 10, preset_colors='web')
+
+    with pytest.raises(ValueError):
+        img.get_color_indices(colors)
+
+
+def test_get_color_indices_new_color():
+    """
+    names looked up in bulk should include colors added later
+    """
+    img = Image(10, 10, preset_colors='BW')
+    img.get_color_indices(['white', 'black'])
+    img.add_color('grey', (128, 128, 128))
+
+    colors = img.get_color_indices(['grey', 'white'])
+
+    assert np.array_equal(colors, [3, 2])
+
+
 def test_add_colors():
     img = Image(10, 10, preset_colors='BW')
 
@@ -271,6 +316,79 @@ def test_save_image(filetype):
         img.save(outfile("test_image1.something"), "random_string")
 
 
+@pytest.mark.parametrize("filetype", ["bmp", "gif", "png"])
+def test_to_bytes(filetype):
+    """
+    in-memory encoding should give the same result as saving to a file
+    """
+    img = Image(400, 300)
+
+    img.draw_line((0, 0), (399, 299), 'white', line_width=4)
+    img.draw_line((0, 299), (399, 0), 'green', line_width=4)
+
+    fname = "test_image_to_bytes." + filetype
+    img.save(outfile(fname), filetype)
+
+    assert img.to_bytes(filetype) == outfile(fname).read_bytes()
+
+
+def test_to_bytes_jpeg():
+    img = Image(400, 300)
+    img.draw_line((0, 0), (399, 299), 'white', line_width=4)
+
+    data = img.to_bytes('jpeg', compression=90)
+
+    assert data[:2] == b'\xff\xd8'  # jpeg magic number
+
+
+def test_to_bytes_bad_type():
+    img = Image(10, 10)
+
+    with pytest.raises(ValueError):
+        img.to_bytes("random_string")
+
+
+@pytest.mark.parametrize("filetype", ["bmp", "gif", "png"])
+def test_save_file_like(filetype):
+    img = Image(400, 300)
+
+    img.draw_line((0, 0), (399, 299), 'white', line_width=4)
+    img.draw_line((0, 299), (399, 0), 'green', line_width=4)
+
+    buf = io.BytesIO()
+    img.save(buf, filetype)
+
+    assert buf.getvalue() == img.to_bytes(filetype)
+
+
+class KeepChunks:
+    """
+    a writer that holds on to what it was given
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+def test_save_file_like_keeps_chunks():
+    img = Image(400, 300)
+    img.draw_line((0, 0), (399, 299), 'white', line_width=4)
+
+    writer = KeepChunks()
+    img.save(writer, "png")
+    expected = img.to_bytes("png")
+    # the encoded data is freed after saving -- so what was written must
+    # be a copy, not changed by encoding something else
+    img.draw_line((0, 299), (399, 0), 'green', line_width=4)
+    img.to_bytes("png")
+
+    assert all(isinstance(chunk, bytes) for chunk in writer.chunks)
+    assert b"".join(writer.chunks) == expected
+
+
 def test_clear():
     img = Image(100, 200)
 
@@ -301,6 +419,43 @@ def test_clear_color():
     assert np.all(np.asarray(img).flat == img.get_color_index('white'))
 
 
+def test_clear_rect():
+    img = Image(100, 200)
+    img.draw_rectangle((0, 0), (99, 199), fill_color='red')
+
+    img.clear(rect=((10, 20), (30, 40)))
+
+    arr = np.asarray(img)
+    assert np.all(arr[10:31, 20:41] == 0)
+    arr[10:31, 20:41] = img.get_color_index('red')
+    assert np.all(arr == img.get_color_index('red'))
+
+
+def test_clear_rect_corners():
+    img = Image(100, 200)
+
+    # corners in any order, and partly off the image
+    img.clear('white', rect=((150, 20), (90, -10)))
+
+    arr = np.asarray(img)
+    assert np.all(arr[90:, :21] == img.get_color_index('white'))
+    assert np.sum(arr != 0) == 10 * 21
+
+    # entirely off the image
+    img.clear('blue', rect=((200, 0), (300, 10)))
+    assert np.sum(arr != 0) == 10 * 21
+
+
+def test_clear_respects_clip_rect():
+    img = Image(100, 200)
+    img.clip_rect = ((10, 10), (19, 29))
+
+    img.clear('white')
+
+    assert np.sum(np.asarray(img) != 0) == 10 * 20
+    assert np.all(np.asarray(img)[10:20, 10:30] == img.get_color_index('white'))
+
+
 def test_line():
     img = Image(100, 200)
 
@@ -323,6 +478,70 @@ def test_line_clip():
     img.save(outfile("test_image_line_clip.bmp"))
 
 
+def test_draw_lines():
+    """
+    should be the same as drawing them one by one
+    """
+    rng = np.random.default_rng(1)
+    starts = rng.integers(-10, 110, (100, 2))
+    ends = rng.integers(-10, 110, (100, 2))
+    colors = rng.integers(1, 16, 100).astype(np.uint8)
+    widths = rng.integers(1, 4, 100)
+
+    img1 = Image(100, 100)
+    img1.draw_lines(starts, ends, color=colors, line_width=widths)
+
+    img2 = Image(100, 100)
+    for pt1, pt2, c, w in zip(starts, ends, colors, widths):
+        img2.draw_line(pt1, pt2, c, line_width=w)
+
+    img1.save(outfile("test_image_lines.png"), "png")
+
+    assert img1 == img2
+
+
+def test_draw_lines_segments():
+    """
+    an Nx4 array of segments, and a single color and width
+    """
+    rng = np.random.default_rng(2)
+    segments = rng.integers(0, 100, (50, 4))
+
+    img1 = Image(100, 100)
+    img1.draw_lines(segments, color='red', line_width=3)
+
+    img2 = Image(100, 100)
+    for seg in segments:
+        img2.draw_line(seg[:2], seg[2:], 'red', line_width=3)
+
+    assert img1 == img2
+
+
+def test_draw_lines_resets_thickness():
+    img1 = Image(100, 100)
+    img1.draw_lines([(0, 0, 99, 99)], color='red', line_width=5)
+    img1.draw_polygon([(10, 50), (50, 10), (90, 50)], line_color='blue')
+
+    img2 = Image(100, 100)
+    img2.draw_line((0, 0), (99, 99), 'red', line_width=5)
+    img2.draw_polygon([(10, 50), (50, 10), (90, 50)], line_color='blue')
+
+    assert img1 == img2
+
+
+def test_draw_lines_bad_input():
+    img = Image(100, 100)
+
+    with pytest.raises(ValueError):
+        img.draw_lines([(0, 0, 10)])
+
+    with pytest.raises(ValueError):
+        img.draw_lines([(0, 0), (1, 1)], [(10, 10)])
+
+    with pytest.raises(ValueError):
+        img.draw_lines([(0, 0, 10, 10)] * 3, line_width=[1, 2])
+
+
 def test_SetPixel():
     img = Image(5, 5)
 
@@ -398,6 +617,92 @@ def test_polygon_clip():
     img.save(outfile("test_image_polygon_clip.bmp"))
 
 
+def random_polygons(num, size, seed=0):
+    """
+    a set of random polygons in the ragged points + offsets layout
+    """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(3, 10, num)
+    offsets = np.r_[0, np.cumsum(lengths)]
+    points = rng.integers(-10, size + 10, (offsets[-1], 2))
+    return points, offsets
+
+
+def test_draw_polygons():
+    """
+    should be the same as drawing them one by one
+    """
+    points, offsets = random_polygons(50, 200)
+    colors = ['red', 'blue', 'green', 'purple', 'navy'] * 10
+    fills = np.arange(50, dtype=np.uint8) % 15 + 1
+
+    img1 = Image(200, 200)
+    img1.draw_polygons(points, offsets, line_color=colors, fill_color=fills,
+                       line_width=2)
+
+    img2 = Image(200, 200)
+    for i in range(50):
+        img2.draw_polygon(points[offsets[i]:offsets[i + 1]],
+                          line_color=colors[i],
+                          fill_color=fills[i],
+                          line_width=2)
+
+    img1.save(outfile("test_image_polygons.png"), "png")
+
+    assert img1 == img2
+
+
+@pytest.mark.parametrize("line_color, fill_color", [('red', None),
+                                                    (None, 'blue'),
+                                                    ('black', 'white'),
+                                                    (None, None)])
+def test_draw_polygons_single_color(line_color, fill_color):
+    points, offsets = random_polygons(20, 100)
+
+    img1 = Image(100, 100)
+    img1.draw_polygons(points, offsets,
+                       line_color=line_color, fill_color=fill_color)
+
+    img2 = Image(100, 100)
+    for i in range(20):
+        img2.draw_polygon(points[offsets[i]:offsets[i + 1]],
+                          line_color=line_color,
+                          fill_color=fill_color)
+
+    assert img1 == img2
+
+
+def test_draw_polygons_empty():
+    img = Image(10, 10)
+    img.draw_polygons(np.zeros((0, 2)), [0], fill_color='red')
+
+    assert np.all(np.asarray(img) == 0)
+
+
+@pytest.mark.parametrize("offsets", [[0, 2, 5],  # too few points
+                                     [0, 3, 7],  # past the end
+                                     [5, 3, 6],  # not increasing
+                                     [],
+                                     [0, 3.5, 6],
+                                     np.array([0.0, 3.0, 6.0]),
+                                     ])
+def test_draw_polygons_bad_offsets(offsets):
+    points, _ = random_polygons(2, 100)
+    points = points[:6]
+    img = Image(100, 100)
+
+    with pytest.raises(ValueError):
+        img.draw_polygons(points, offsets, fill_color='red')
+
+
+def test_draw_polygons_wrong_number_of_colors():
+    points, offsets = random_polygons(5, 100)
+    img = Image(100, 100)
+
+    with pytest.raises(ValueError):
+        img.draw_polygons(points, offsets, fill_color=['red', 'blue'])
+
+
 def test_polyline():
     img = Image(100, 200)
 
@@ -421,6 +726,52 @@ def test_polyline():
     img.save(outfile("test_image_polyline.bmp"))
 
 
+def test_draw_polylines():
+    """
+    should be the same as drawing them one by one
+    """
+    rng = np.random.default_rng(3)
+    lengths = rng.integers(2, 8, 40)
+    offsets = np.r_[0, np.cumsum(lengths)]
+    points = rng.integers(-10, 110, (offsets[-1], 2))
+    colors = rng.integers(1, 16, 40).astype(np.uint8)
+    widths = rng.integers(1, 4, 40)
+
+    img1 = Image(100, 100)
+    img1.draw_polylines(points, offsets, line_color=colors, line_width=widths)
+
+    img2 = Image(100, 100)
+    for i in range(40):
+        img2.draw_polyline(points[offsets[i]:offsets[i + 1]],
+                           line_color=colors[i],
+                           line_width=widths[i])
+
+    img1.save(outfile("test_image_polylines.png"), "png")
+
+    assert img1 == img2
+
+
+def test_draw_polylines_single_color():
+    points = [(10, 10), (50, 50), (90, 10),
+              (10, 90), (90, 90)]
+
+    img1 = Image(100, 100)
+    img1.draw_polylines(points, [0, 3, 5], line_color='red', line_width=2)
+
+    img2 = Image(100, 100)
+    img2.draw_polyline(points[:3], 'red', line_width=2)
+    img2.draw_polyline(points[3:], 'red', line_width=2)
+
+    assert img1 == img2
+
+
+def test_draw_polylines_too_short():
+    img = Image(100, 100)
+
+    with pytest.raises(ValueError):
+        img.draw_polylines([(10, 10), (50, 50), (90, 10)], [0, 1, 3])
+
+
 def test_draw_spline_polygon():
 
     img = Image(600, 600)
@@ -823,6 +1174,37 @@ def test_draw_dots_multi_color_indices():
     assert check_file("test_draw_dots_multi_color_indices.png")
 
 
+@pytest.mark.parametrize("diameter", [1, 2, 3, 4])
+@pytest.mark.parametrize("clip", [None, ((10, 5), (40, 30))])
+def test_draw_dots_matches_draw_dot(diameter, clip):
+    """
+    the fast path for small dots should give the same results
+    as drawing them one at a time -- including at the edges
+    """
+    rng = np.random.default_rng(4)
+    points = rng.integers(-3, 53, (500, 2))
+    colors = rng.integers(1, 16, 500).astype(np.uint8)
+
+    img1 = Image(50, 40)
+    img2 = Image(50, 40)
+    if clip is not None:
+        img1.clip_rect = clip
+        img2.clip_rect = clip
+
+    img1.draw_dots(points, color=colors, diameter=diameter)
+    for pt, c in zip(points, colors):
+        img2.draw_dot(pt, color=c, diameter=diameter)
+
+    assert img1 == img2
+
+
+def test_draw_dots_empty():
+    img = Image(10, 10)
+    img.draw_dots(np.zeros((0, 2)), diameter=1)
+
+    assert np.all(np.asarray(img) == 0)
+
+
 def test_draw_dots_wrong_shape():
     """
     test passing in a wrong-shaped points
@@ -857,6 +1239,66 @@ def test_draw_x_lots():
     img.save(outfile("test_image_x_lots.png"), 'png')
 
 
+@pytest.mark.parametrize("diameter", [2, 3, 6, 9])
+@pytest.mark.parametrize("clip", [None, ((10, 5), (40, 30))])
+def test_draw_xes_matches_draw_line(diameter, clip):
+    """
+    the stamped Xes should be the same as drawing the two lines
+    """
+    rng = np.random.default_rng(5)
+    points = rng.integers(-5, 55, (300, 2))
+    colors = rng.integers(1, 16, 300).astype(np.uint8)
+    r = diameter // 2
+
+    img1 = Image(50, 40)
+    img2 = Image(50, 40)
+    if clip is not None:
+        img1.clip_rect = clip
+        img2.clip_rect = clip
+
+    img1.draw_xes(points, color=colors, diameter=diameter)
+    for (x, y), c in zip(points, colors):
+        img2.draw_line((x - r, y - r), (x + r, y + r), color=c)
+        img2.draw_line((x - r, y + r), (x + r, y - r), color=c)
+
+    assert img1 == img2
+
+
+def test_draw_xes_color_names():
+    img1 = Image(20, 20)
+    img2 = Image(20, 20)
+    points = [(5, 5), (10, 10), (15, 15)]
+
+    img1.draw_xes(points, color=['red', 'blue', 'green'], diameter=4)
+    for pt, c in zip(points, ['red', 'blue', 'green']):
+        img2.draw_xes([pt], color=c, diameter=4)
+
+    assert img1 == img2
+
+
+@pytest.mark.parametrize("diameter, line_width", [(2, 1), (6, 1), (6, 3)])
+@pytest.mark.parametrize("colors", [['red', 'blue'], ['red', 'blue', 'green', 'red']])
+def test_draw_xes_wrong_number_of_colors(diameter, line_width, colors):
+    """
+    the colors are read without bounds checking, so too few must be
+    rejected up front
+    """
+    img = Image(20, 20)
+    points = [(5, 5), (10, 10), (15, 15)]
+
+    with pytest.raises(ValueError):
+        img.draw_xes(points, color=colors, diameter=diameter, line_width=line_width)
+    with pytest.raises(ValueError):
+        img.draw_dots(points, color=colors, diameter=diameter)
+
+
+def test_draw_dots_float_colors():
+    img = Image(20, 20)
+
+    with pytest.raises(ValueError):
+        img.draw_dots([(1, 1), (2, 2)], color=[1.7, 2.2])
+
+
 def test_draw_x_large():
     img = Image(200, 200)
 
@@ -945,19 +1387,30 @@ def test_colors():
 
 def test__array__no_copy():
     """
-    an Image can't be made into an array without copying
-
-    trying to do so should raise an error
+    copy=False should give a view on the image data
     """
     img = Image(10, 5)
 
     img.draw_line((0, 0), (9, 4), 'black', line_width=1)
 
-    # copy == True should work
-    arr = img.__array__(copy=True)
+    # copy == True should give an independent array
+    arr_copy = img.__array__(copy=True)
+    arr_view = img.__array__(copy=False)
+
+    img.draw_pixel((9, 0), 'red')
+
+    assert arr_view[9, 0] == img.get_color_index('red')
+    assert arr_copy[9, 0] == 0
+
+
+def test__array__no_copy_dtype():
+    """
+    can't get a view as anything other than uint8
+    """
+    img = Image(10, 5)
 
     with pytest.raises(ValueError):
-        arr = img.__array__(copy=False) # noqa
+        img.__array__(dtype=np.int16, copy=False)
 
 
 def test__array__dtype():
@@ -1040,6 +1493,54 @@ def test_array_set():
             assert arr[x, y] == img.get_pixel_value((x, y))
 
 
+@pytest.mark.parametrize("order", ['C', 'F'])
+def test_array_set_large(order):
+    """
+    big enough to go through more than one transpose block
+    """
+    arr = np.random.default_rng(0).integers(0, 256, (300, 200), dtype=np.uint8)
+    arr = np.asarray(arr, order=order)
+
+    img = Image(300, 200)
+    img.set_data(arr)
+
+    assert np.array_equal(np.array(img), arr)
+
+
+def test_array_set_strided():
+    arr = np.random.default_rng(0).integers(0, 256, (600, 400), dtype=np.uint8)
+    arr = arr[::2, ::2]
+
+    img = Image(300, 200)
+    img.set_data(arr)
+
+    assert np.array_equal(np.array(img), arr)
+
+    # columns contiguous, but not the whole array
+    arr = np.asfortranarray(arr)[:150, :]
+    img = Image(150, 200)
+    img.set_data(arr)
+
+    assert np.array_equal(np.array(img), arr)
+
+
+def test_array_set_int8():
+    arr = np.random.default_rng(0).integers(-128, 128, (30, 20), dtype=np.int8)
+
+    img = Image(30, 20)
+    img.set_data(arr)
+    assert np.array_equal(np.array(img), arr.view(np.uint8))
+
+    assert from_array(arr) == img
+
+
+def test_array_set_wrong_size():
+    img = Image(30, 20)
+
+    with pytest.raises(ValueError):
+        img.set_data(np.zeros((20, 30), dtype=np.uint8))
+
+
 def test_array_creation():
     arr = np.array([[0, 1, 2],
                     [3, 4, 5],
@@ -1142,6 +1643,46 @@ def test_equality():
     assert (img1 == img3) is False
 
 
+def test_digest():
+    img1 = Image(100, 100)
+    img2 = Image(100, 100)
+
+    assert img1.digest() == img2.digest()
+
+    img1.draw_pixel((99, 99), 'red')
+    assert img1.digest() != img2.digest()
+
+    img2.draw_pixel((99, 99), 'red')
+    assert img1.digest() == img2.digest()
+
+
+@pytest.mark.parametrize("img2", [Image(100, 101),
+                                  Image(101, 100),
+                                  Image(100, 100, preset_colors='BW'),
+                                  Image(100, 100, preset_colors=None),
+                                  Image(100, 100, truecolor=True),
+                                  ])
+def test_digest_different(img2):
+    """
+    size, palette and type are all part of the digest
+    """
+    img1 = Image(100, 100)
+    if img2.truecolor:
+        # all zero pixels, as in the palette image
+        img2.clear(0)
+
+    assert img1.digest() != img2.digest()
+
+
+def test_digest_palette():
+    img1 = Image(10, 10, preset_colors=None)
+    img2 = Image(10, 10, preset_colors=None)
+    img1.add_color('red', (255, 0, 0))
+    img2.add_color('red', (255, 0, 1))
+
+    assert img1.digest() != img2.digest()
+
+
 def test_size():
     """
     test the size property
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""
+tests for the ImagePool
+"""
+
+import numpy as np
+import pytest
+
+from py_gd import Image, ImagePool
+
+
+def test_miss_then_hit():
+    pool = ImagePool()
+
+    img = pool.get(20, 10)
+    assert (pool.hits, pool.misses) == (0, 1)
+
+    pool.release(img)
+    assert len(pool) == 1
+
+    assert pool.get(20, 10) is img
+    assert (pool.hits, pool.misses) == (1, 1)
+    assert len(pool) == 0
+
+
+def test_keyed_by_size_and_colors():
+    pool = ImagePool()
+    img = pool.get(20, 10)
+    pool.release(img)
+
+    assert pool.get(10, 20) is not img
+    assert pool.get(20, 10, preset_colors='BW') is not img
+    assert pool.get(20, 10, truecolor=True) is not img
+    assert pool.misses == 4
+    assert pool.get(20, 10) is img
+
+
+@pytest.mark.parametrize("truecolor", [False, True])
+def test_reused_image_is_like_new(truecolor):
+    pool = ImagePool()
+    img = pool.get(20, 10, truecolor=truecolor)
+
+    img.add_color('my_color', (10, 20, 30))
+    img.draw_rectangle((2, 2), (8, 8), fill_color='my_color')
+    img.clip_rect = ((1, 1), (5, 5))
+    pool.release(img)
+
+    img = pool.get(20, 10, truecolor=truecolor)
+    new = Image(20, 10, truecolor=truecolor)
+
+    assert img.digest() == new.digest()
+    assert img.get_color_names() == new.get_color_names()
+    assert img.clip_rect == new.clip_rect
+    with pytest.raises(ValueError):
+        img.get_color_index('my_color')
+
+    # colors can be added again
+    assert img.add_color('my_color', (10, 20, 30)) == new.add_color('my_color', (10, 20, 30))
+
+
+def test_no_preset_colors():
+    pool = ImagePool()
+    img = pool.get(20, 10, preset_colors=None)
+    img.add_colors([('background', (255, 255, 255)), ('red', (255, 0, 0))])
+    img.draw_dot((5, 5), 'red')
+    pool.release(img)
+
+    img = pool.get(20, 10, preset_colors=None)
+
+    assert img.get_color_names() == []
+    assert img.digest() == Image(20, 10, preset_colors=None).digest()
+
+
+def test_lru_eviction():
+    pool = ImagePool(max_images=2)
+    images = [Image(20, 10) for _ in range(3)]
+
+    for img in images:
+        pool.release(img)
+
+    assert len(pool) == 2
+    assert pool.evictions == 1
+    # the first one released is gone
+    assert pool.get(20, 10) is images[2]
+    assert pool.get(20, 10) is images[1]
+    assert pool.get(20, 10) is not images[0]
+
+
+def test_eviction_across_sizes():
+    pool = ImagePool(max_images=2)
+    small, big = Image(5, 5), Image(50, 50)
+
+    pool.release(small)
+    pool.release(big)
+    pool.release(Image(50, 50))
+
+    assert pool.get(5, 5) is not small
+    assert pool.misses == 1
+    assert pool.get(50, 50) is not big
+
+
+def test_max_images_zero():
+    pool = ImagePool(max_images=0)
+    pool.release(pool.get(20, 10))
+
+    assert len(pool) == 0
+    assert pool.max_images == 0
+
+
+def test_bad_max_images():
+    with pytest.raises(ValueError):
+        ImagePool(max_images=-1)
+
+
+def test_release_twice():
+    pool = ImagePool()
+    img = pool.get(20, 10)
+    pool.release(img)
+
+    with pytest.raises(ValueError):
+        pool.release(img)
+
+
+def test_clear():
+    pool = ImagePool()
+    pool.release(pool.get(20, 10))
+
+    pool.clear()
+
+    assert len(pool) == 0
+    pool.get(20, 10)
+    assert pool.misses == 2
+
+
+def test_from_array_image():
+    pool = ImagePool()
+    arr = np.ones((20, 10), dtype=np.uint8)
+    pool.release(Image(20, 10))
+    img = pool.get(20, 10)
+    img.set_data(arr)
+    pool.release(img)
+
+    assert np.all(np.asarray(pool.get(20, 10)) == 0)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+"""
+tests of what gets imported, to keep start up fast
+
+Each test runs in a new python process, with ``-X importtime``, so the
+imports that have already been done by the tests don't count.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import py_gd
+
+# modules that should only be imported when they are needed
+LAZY_MODULES = ('py_gd._cm_listed', 'py_gd._color_data', 'py_gd.spline',
+                'py_gd.color_ramp', 'concurrent.futures')
+
+
+def imported_modules(code):
+    """
+    runs the code in a new python process
+
+    :returns: dict of the modules imported: {name: cumulative import time in us}
+    """
+    env = dict(os.environ)
+    # make sure it imports the same py_gd
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(py_gd.__file__)),
+                                         env.get('PYTHONPATH', '')])
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            env=env, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_import():
+    modules = imported_modules("import py_gd")
+
+    assert 'py_gd.py_gd' in modules
+    for name in LAZY_MODULES:
+        assert name not in modules
+
+
+def test_basic_image():
+    modules = imported_modules("import py_gd\n"
+                               "img = py_gd.Image(100, 100)\n"
+                               "img.draw_line((0, 0), (99, 99), 'red')\n"
+                               "img.to_bytes('png')\n")
+    for name in LAZY_MODULES:
+        assert name not in modules
+
+
+@pytest.mark.parametrize("code, module",
+                         [("py_gd.Image(10, 10).draw_spline_polyline([(0, 0), (5, 9), (9, 0)], 'red')",
+                           'py_gd.spline'),
+                          ("py_gd.Image(10, 10, preset_colors='css4')", 'py_gd._color_data'),
+                          ("py_gd.Image(10, 10, preset_colors='viridis')", 'py_gd._cm_listed'),
+                          ])
+def test_imported_when_used(code, module):
+    assert module in imported_modules("import py_gd\n" + code)
+
+
+def test_no_helpers_exported():
+    """
+    "from .py_gd import *" exports every public name of the extension --
+    modules it uses should not show up in the py_gd namespace
+    """
+    for name in ('deque', 'OrderedDict'):
+        assert not hasattr(py_gd, name)
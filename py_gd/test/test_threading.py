@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+tests for rendering Images from multiple threads
+
+The GIL is released while libgd is working, so these make sure that
+drawing separate Images in parallel gives the same results as drawing
+them one after another.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from py_gd import Image
+
+
+def render_frame(seed, size=200):
+    """
+    draw a bunch of stuff in an image -- different for each seed
+    """
+    rng = np.random.default_rng(seed)
+    img = Image(size, size)
+
+    img.draw_polygon(rng.integers(0, size, (8, 2)),
+                     line_color='black', fill_color='red', line_width=2)
+    img.draw_polyline(rng.integers(0, size, (10, 2)), 'blue', line_width=3)
+    img.draw_line((0, 0), (size, size), 'green', line_width=2)
+    img.draw_dots(rng.integers(0, size, (100, 2)), color='purple', diameter=4)
+    img.draw_xes(rng.integers(0, size, (50, 2)), color='navy', diameter=6)
+    img.draw_rectangle((10, 10), (50, 50), line_color='olive')
+    img.draw_circle((100, 100), 40, line_color='teal', line_width=2)
+    img.draw_text("thread", (20, 150), color='black')
+
+    return img
+
+
+def test_threaded_matches_serial():
+    seeds = range(16)
+
+    serial = [np.array(render_frame(s)) for s in seeds]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = [np.array(img) for img in pool.map(render_frame, seeds)]
+
+    for s, t in zip(serial, threaded):
+        assert np.array_equal(s, t)
+
+
+def test_threaded_save(tmp_path):
+    def save(seed):
+        fname = tmp_path / f"frame_{seed}.png"
+        render_frame(seed).save(fname, 'png')
+        return fname.read_bytes()
+
+    seeds = range(8)
+    serial = [save(s) for s in seeds]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = list(pool.map(save, seeds))
+
+    assert serial == threaded
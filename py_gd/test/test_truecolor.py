@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+"""
+tests for truecolor (32 bit ARGB) py_gd Images
+"""
+
+import numpy as np
+import pytest
+
+from py_gd import Image, from_array
+
+
+def test_init():
+    img = Image(20, 10, truecolor=True)
+
+    assert img.truecolor
+    assert not Image(20, 10).truecolor
+    assert repr(img) == "Image(width=20, height=10, truecolor=True)"
+
+
+def test_background_is_first_color():
+    img = Image(20, 10, truecolor=True)
+
+    # 'transparent' is (0, 0, 0, 127)
+    assert np.all(np.asarray(img) == 0x7F000000)
+
+    img = Image(20, 10, preset_colors=None, truecolor=True)
+    assert np.all(np.asarray(img) == 0)
+
+
+def test_too_big():
+    with pytest.raises(MemoryError):
+        Image(2 ** 15, 2 ** 14, truecolor=True)
+
+
+def test_buffer():
+    img = Image(5, 10, truecolor=True)
+    m = memoryview(img)
+
+    assert m.format == 'I'
+    assert m.itemsize == 4
+    assert m.shape == (5, 10)
+    assert m.strides == (4, 20)
+    assert m.f_contiguous
+
+
+def test_asarray_is_view():
+    img = Image(20, 10, truecolor=True)
+    arr = np.asarray(img)
+
+    assert arr.dtype == np.uint32
+    assert arr.shape == (20, 10)
+
+    img.draw_pixel((3, 4), 'red')
+    assert arr[3, 4] == 0xFF0000
+
+    arr[5, 6] = 0x0000FF
+    assert img.get_pixel_color((5, 6)) == 'blue'
+
+
+def test_array_copy():
+    img = Image(20, 10, truecolor=True)
+    arr = np.array(img)
+
+    assert arr.dtype == np.uint32
+    assert arr.flags.f_contiguous
+
+    with pytest.raises(ValueError):
+        img.__array__(dtype=np.uint8, copy=False)
+
+
+def test_color_values():
+    img = Image(20, 10, truecolor=True)
+
+    assert img.get_color_index('red') == 0xFF0000
+    assert img.add_color('half_green', (0, 255, 0, 64)) == 0x4000FF00
+    assert img.get_color_index(0x123456) == 0x123456
+
+    with pytest.raises(ValueError):
+        img.get_color_index(0x80000000)
+
+    colors = img.get_color_indices(['red', 'half_green', 255])
+    assert colors.dtype == np.uint32
+    assert np.array_equal(colors, [0xFF0000, 0x4000FF00, 255])
+
+
+def test_draw_shapes():
+    img = Image(100, 100, truecolor=True)
+
+    img.draw_rectangle((10, 10), (30, 30), fill_color='red')
+    img.draw_dots([(50, 50), (60, 60)], color=['blue', 'green'], diameter=3)
+    img.draw_xes([(70, 70)], color=0x123456, diameter=5)
+    img.draw_lines([(0, 99, 99, 99)], color='navy')
+
+    assert img.get_pixel_value((20, 20)) == 0xFF0000
+    assert img.get_pixel_color((50, 49)) == 'blue'
+    assert img.get_pixel_color((60, 61)) == 'green'
+    assert img.get_pixel_value((72, 72)) == 0x123456
+    assert img.get_pixel_color((50, 99)) == 'navy'
+
+
+def test_alpha_blending():
+    img = Image(10, 10, truecolor=True)
+    img.add_color('half_blue', (0, 0, 255, 63))
+
+    img.draw_rectangle((0, 0), (9, 9), fill_color='red')
+    img.draw_dot((5, 5), 'half_blue')
+
+    r, g, b = (int(img.get_pixel_value((5, 5))) >> shift & 0xFF for shift in (16, 8, 0))
+    assert 0 < r < 255
+    assert 0 < b < 255
+    assert g == 0
+
+
+def test_clear_does_not_blend():
+    img = Image(10, 10, truecolor=True)
+    img.draw_rectangle((0, 0), (9, 9), fill_color='red')
+
+    img.clear()
+
+    assert np.all(np.asarray(img) == 0x7F000000)
+
+
+def test_clear_rect():
+    img = Image(10, 10, truecolor=True)
+    img.add_color('half_blue', (0, 0, 255, 63))
+
+    img.clear('half_blue', rect=((2, 3), (5, 7)))
+
+    arr = np.asarray(img)
+    assert np.all(arr[2:6, 3:8] == 0x3F0000FF)
+    assert np.sum(arr != 0x7F000000) == 4 * 5
+
+
+def test_set_data():
+    img = Image(20, 10, truecolor=True)
+    arr = np.arange(200, dtype=np.uint32).reshape((20, 10))
+
+    img.set_data(arr)
+    assert np.array_equal(np.asarray(img), arr)
+
+    img.set_data(np.asfortranarray(arr[::-1]))
+    assert np.array_equal(np.asarray(img), arr[::-1])
+
+    img.set_data(arr.astype(np.int32))
+    assert np.array_equal(np.asarray(img), arr)
+
+    with pytest.raises(ValueError):
+        img.set_data(arr.astype(np.uint8))
+
+
+def test_from_array():
+    arr = np.arange(200, dtype=np.uint32).reshape((20, 10))
+
+    img = from_array(arr)
+
+    assert img.truecolor
+    assert np.array_equal(np.asarray(img), arr)
+    assert not from_array(arr.astype(np.uint8)).truecolor
+
+
+def test_to_palette():
+    img = Image(40, 20, truecolor=True)
+    img.draw_rectangle((2, 2), (18, 18), fill_color='red')
+    img.draw_rectangle((22, 2), (38, 18), fill_color='blue')
+
+    pal = img.to_palette()
+
+    assert not pal.truecolor
+    assert np.asarray(pal).dtype == np.uint8
+    assert pal.get_pixel_color((10, 10)) == 'red'
+    assert pal.get_pixel_color((30, 10)) == 'blue'
+
+    # the named colors can still be drawn with
+    pal.draw_dot((10, 10), 'blue')
+    assert pal.get_pixel_color((10, 10)) == 'blue'
+
+
+def test_to_palette_colors_wanted():
+    img = Image(256, 4, preset_colors=None, truecolor=True)
+    img.set_data(np.repeat(np.arange(256, dtype=np.uint32)[:, None] * 0x010101, 4, axis=1))
+
+    pal = img.to_palette(colors_wanted=16)
+
+    assert len(np.unique(np.asarray(pal))) <= 16
+
+    with pytest.raises(ValueError):
+        img.to_palette(colors_wanted=300)
+
+    with pytest.raises(ValueError):
+        pal.to_palette()
+
+
+@pytest.mark.parametrize("file_type", ["png", "gif", "bmp", "jpeg"])
+def test_save(file_type):
+    img = Image(20, 10, truecolor=True)
+    img.draw_rectangle((2, 2), (8, 8), fill_color='red')
+
+    assert len(img.to_bytes(file_type)) > 0
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+
+"""
+tests for drawing in world coordinates with a Viewport
+"""
+
+import numpy as np
+import pytest
+
+from py_gd import Image, ImagePool, Viewport
+from py_gd.color_ramp import ColorRamp
+
+BOUNDS = ((-125.0, 30.0), (-115.0, 40.0))
+
+
+def world_points(num, seed=0):
+    rng = np.random.default_rng(seed)
+    # some off the edges, to exercise the clipping
+    return np.c_[rng.uniform(-126, -114, num), rng.uniform(29, 41, num)]
+
+
+def image_pair(size=(100, 80)):
+    """
+    an image drawn in world coordinates, and one to draw the same thing
+    on in pixels
+    """
+    img = Image(*size)
+    img.viewport = Viewport.from_bounds(BOUNDS, size)
+    return img, Image(*size)
+
+
+def test_transform():
+    vp = Viewport(scale=(2.0, -4.0), offset=(10.0, 20.0))
+
+    assert vp.scale == (2.0, -4.0)
+    assert vp.offset == (10.0, 20.0)
+    # floor, not truncation, for negative pixels
+    assert np.array_equal(vp.to_pixels([(0, 0), (1.2, 1.2), (-5.2, 5.6), (-6, 2.5)]),
+                          [(10, 20), (12, 15), (-1, -3), (-2, 10)])
+    assert vp.to_pixels(np.zeros((0, 2))).shape == (0, 2)
+
+
+def test_scale_scalar():
+    vp = Viewport(3.0)
+
+    assert vp.scale == (3.0, 3.0)
+    assert vp.offset == (0.0, 0.0)
+    assert "Viewport" in repr(vp)
+
+
+def test_from_bounds():
+    vp = Viewport.from_bounds(((0.0, 0.0), (10.0, 20.0)), (100, 200))
+
+    corners = [(0, 20), (9.999, 0.001), (0, 0), (10, 20)]
+    assert np.array_equal(vp.to_pixels(corners), [(0, 0), (99, 199), (0, 200), (100, 0)])
+
+
+def test_from_bounds_no_flip():
+    vp = Viewport.from_bounds(((0.0, 0.0), (10.0, 20.0)), (100, 200), flip_y=False)
+
+    assert np.array_equal(vp.to_pixels([(0, 0), (9.999, 19.999)]), [(0, 0), (99, 199)])
+
+
+def test_from_bounds_bad():
+    with pytest.raises(ValueError):
+        Viewport.from_bounds(((0, 0), (0, 10)), (100, 100))
+    with pytest.raises(ValueError):
+        Viewport.from_bounds(((0, 10), (10, 0)), (100, 100))
+
+
+def test_float32_strided():
+    vp = Viewport.from_bounds(BOUNDS, (100, 80))
+    points = world_points(50)
+    # every other column of a wider float32 array -- used in place
+    wide = np.zeros((50, 4), dtype=np.float32)
+    wide[:, ::2] = points
+
+    assert np.array_equal(vp.to_pixels(wide[:, ::2]), vp.to_pixels(points.astype(np.float32)))
+
+
+def test_huge_and_nan():
+    vp = Viewport(1.0)
+
+    pixels = vp.to_pixels([(1e300, -1e300), (np.nan, np.inf)])
+
+    assert np.array_equal(pixels, [(2 ** 29, -2 ** 29), (-2 ** 29, 2 ** 29)])
+
+    # and nothing is drawn for them
+    img = Image(10, 10)
+    img.viewport = vp
+    img.draw_dots([(1e300, -1e300), (np.nan, np.inf)], diameter=3)
+    img.draw_line((-1e300, 5), (1e300, 5), 'white')
+    assert np.sum(np.asarray(img)) == 10 * img.get_color_index('white')
+
+
+def test_image_viewport():
+    img = Image(10, 10)
+    assert img.viewport is None
+
+    vp = Viewport(2.0)
+    img.viewport = vp
+    assert img.viewport is vp
+
+    del img.viewport
+    assert img.viewport is None
+
+    img.viewport = vp
+    img.viewport = None
+    assert img.viewport is None
+
+    with pytest.raises(TypeError):
+        img.viewport = (2.0, 2.0)
+
+
+def test_recycled_image_has_no_viewport():
+    pool = ImagePool()
+    img = pool.get(10, 10)
+    img.viewport = Viewport(2.0)
+    pool.release(img)
+
+    assert pool.get(10, 10).viewport is None
+
+
+@pytest.mark.parametrize("diameter", [1, 2, 3, 5])
+def test_draw_dots(diameter):
+    img, pix_img = image_pair()
+    points = world_points(500)
+
+    img.draw_dots(points, color='red', diameter=diameter)
+    pix_img.draw_dots(img.viewport.to_pixels(points), color='red', diameter=diameter)
+
+    assert img == pix_img
+
+
+def test_draw_dots_values_float32():
+    img, pix_img = image_pair()
+    ramp = ColorRamp('viridis', 0, 1, base_colorscheme='web')
+    img.add_colors(ramp.colorlist)
+    pix_img.add_colors(ramp.colorlist)
+    points = world_points(3000).astype(np.float32)
+    values = np.random.default_rng(0).random(3000)
+
+    img.draw_dots(points, diameter=2, values=values, ramp=ramp)
+    pix_img.draw_dots(img.viewport.to_pixels(points), diameter=2, values=values, ramp=ramp)
+
+    assert img == pix_img
+
+
+def test_draw_dots_truecolor():
+    img = Image(100, 80, truecolor=True)
+    img.viewport = Viewport.from_bounds(BOUNDS, img.size)
+    pix_img = Image(100, 80, truecolor=True)
+    points = world_points(500)
+
+    img.draw_dots(points, color='red', diameter=2)
+    pix_img.draw_dots(img.viewport.to_pixels(points), color='red', diameter=2)
+
+    assert img == pix_img
+
+
+@pytest.mark.parametrize("line_width", [1, 3])
+def test_draw_xes(line_width):
+    img, pix_img = image_pair()
+    points = world_points(200)
+
+    img.draw_xes(points, color='red', diameter=6, line_width=line_width)
+    pix_img.draw_xes(img.viewport.to_pixels(points), color='red', diameter=6, line_width=line_width)
+
+    assert img == pix_img
+
+
+def test_draw_lines():
+    img, pix_img = image_pair()
+    starts = world_points(2000, seed=1)
+    ends = world_points(2000, seed=2)
+    to_pixels = img.viewport.to_pixels
+
+    img.draw_lines(starts, ends, color='red')
+    pix_img.draw_lines(to_pixels(starts), to_pixels(ends), color='red')
+    assert img == pix_img
+
+    img.draw_lines(np.c_[ends, starts], color='blue', line_width=2)
+    pix_img.draw_lines(to_pixels(ends), to_pixels(starts), color='blue', line_width=2)
+    assert img == pix_img
+
+
+def test_draw_polygon_and_polyline():
+    img, pix_img = image_pair()
+    points = world_points(6)
+    pixels = img.viewport.to_pixels(points)
+
+    img.draw_polygon(points, line_color='red', fill_color='blue', line_width=2)
+    pix_img.draw_polygon(pixels, line_color='red', fill_color='blue', line_width=2)
+    assert img == pix_img
+
+    img.draw_polyline(points[::-1], line_color='green')
+    pix_img.draw_polyline(pixels[::-1], line_color='green')
+    assert img == pix_img
+
+
+def test_draw_polygons_and_polylines():
+    img, pix_img = image_pair()
+    points = world_points(40)
+    pixels = img.viewport.to_pixels(points)
+    offsets = [0, 3, 10, 14, 40]
+    colors = ['red', 'blue', 'green', 'purple']
+
+    img.draw_polygons(points, offsets, line_color=colors, fill_color=colors[::-1])
+    pix_img.draw_polygons(pixels, offsets, line_color=colors, fill_color=colors[::-1])
+    assert img == pix_img
+
+    img.draw_polylines(points, offsets, line_color=colors, line_width=[1, 2, 3, 1])
+    pix_img.draw_polylines(pixels, offsets, line_color=colors, line_width=[1, 2, 3, 1])
+    assert img == pix_img
+
+
+def test_draw_splines():
+    """
+    the spline is built in pixels -- as smooth as it is drawn without
+    a viewport
+    """
+    img, pix_img = image_pair()
+    rng = np.random.default_rng(3)
+    # (inside the image, so the pixels are truncated the same as floored)
+    points = np.c_[rng.uniform(-124, -116, 6), rng.uniform(31, 39, 6)]
+    pixels = points * img.viewport.scale + img.viewport.offset
+
+    img.draw_spline_polygon(points, line_color='red', fill_color='blue')
+    pix_img.draw_spline_polygon(pixels, line_color='red', fill_color='blue')
+    assert img == pix_img
+
+    img.draw_spline_polyline(points[::-1], line_color='green', line_width=2)
+    pix_img.draw_spline_polyline(pixels[::-1], line_color='green', line_width=2)
+    assert img == pix_img
+    assert img.viewport is not None
+
+
+def test_draw_single_points():
+    img, pix_img = image_pair()
+    (p1, p2, p3) = [tuple(p) for p in world_points(3)]
+    (q1, q2, q3) = [tuple(int(v) for v in p) for p in img.viewport.to_pixels([p1, p2, p3])]
+
+    img.draw_pixel(p1, 'red')
+    pix_img.draw_pixel(q1, 'red')
+    img.draw_dot(p2, 'red', diameter=4)
+    pix_img.draw_dot(q2, 'red', diameter=4)
+    img.draw_line(p1, p3, 'blue', line_width=2)
+    pix_img.draw_line(q1, q3, 'blue', line_width=2)
+    img.draw_arc(p3, 20, 10, start=0, end=90, line_color='green')
+    pix_img.draw_arc(q3, 20, 10, start=0, end=90, line_color='green')
+    img.draw_circle(p2, 10, fill_color='purple')
+    pix_img.draw_circle(q2, 10, fill_color='purple')
+    img.draw_ellipse(p1, 10, 6, line_color='yellow')
+    pix_img.draw_ellipse(q1, 10, 6, line_color='yellow')
+    img.draw_text("text", p3, align='ct', background='white')
+    pix_img.draw_text("text", q3, align='ct', background='white')
+
+    assert img == pix_img
+
+
+def test_draw_rectangle_flipped():
+    img = Image(10, 10)
+    img.viewport = Viewport.from_bounds(((0, 0), (10, 10)), img.size)
+
+    img.draw_rectangle((2, 2), (5.5, 5.5), fill_color='white')
+
+    # y increases up: world y from 2 to 5.5 is rows 4 to 8
+    arr = np.asarray(img)
+    assert np.all(arr[2:6, 4:9] == img.get_color_index('white'))
+    assert np.sum(arr != 0) == 4 * 5